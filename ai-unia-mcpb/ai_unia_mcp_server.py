@@ -1,8 +1,29 @@
 import asyncio
 import sys
 import os
-import subprocess
-from contextlib import asynccontextmanager
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from unia_bridge.blobs import BLOB_DIR_NAME, BlobSpool
+from unia_bridge.daemon import DaemonState, heartbeat, launch_daemon_host, try_attach
+from unia_bridge.capture import HOST_IN, HOST_OUT, UNITY_IN, UNITY_OUT, CaptureWriter
+from unia_bridge.deadlines import REQUEST_TIMEOUT, RequestDeadlines, parse_timeouts
+from unia_bridge.flow import FrameQueue, busy_frame
+from unia_bridge.framing import JSON_BACKEND, FrameValidator, error_frame
+from unia_bridge.handshake import CatalogCache, InitializeCache, dumps_line
+from unia_bridge.http_upstream import HttpUpstream
+from unia_bridge.local_socket import default_endpoint, describe
+from unia_bridge.logger import error, log, set_dump_dir, trace_frame
+from unia_bridge.metrics import RequestTracker, peek_frame
+from unia_bridge.pool import Avatar, UnityPool, parse_sizes
+from unia_bridge.process import ChildProcess, spawn
+from unia_bridge.relay import FrameReader
+from unia_bridge.readiness import LogMarkerWatcher, StartupStats, UnityStartupError, connect_when_ready
+from unia_bridge.scheduler import ActionScheduler, Lane
+from unia_bridge.speech import SpeechChunker
+from unia_bridge.stdio import LineTooLong, ThreadStdoutWriter, open_stdin
+from unia_bridge.supervisor import UnitySupervisor, kill_process
+from unia_bridge.voicevox_proxy import unity_args, voicevox_proxy_context
 
 #
 # global setting.
@@ -13,7 +34,7 @@ sys.stderr.reconfigure(line_buffering=False, write_through=True)
 
 # --- Settings ---
 WORK_DIR = "C:\\work\\lambda-tuber\\ai-unity-avatar\\unity-project\\build"
-if len(sys.argv) >= 2:
+if len(sys.argv) >= 2 and not sys.argv[1].startswith("--"):
     WORK_DIR = sys.argv[1]
 
 UNITY_EXE_PATH = os.path.join(WORK_DIR, "ai-unity-avatar.exe")
@@ -22,130 +43,809 @@ LOG_FILE = os.path.join(WORK_DIR, "ai-unity-avatar.log")
 # 3. TCP configuration
 TCP_HOST = "127.0.0.1"
 TCP_PORT = 8080
-STARTUP_WAIT_SEC = 10  # Wait time for Unity startup
-# ---
+STARTUP_TIMEOUT_SEC = 60  # Give up if Unity is not reachable by then
+STARTUP_STATS_FILE = os.path.join(WORK_DIR, "ai-unity-avatar.startup.json")
+# Tried before TCP, same framing: a named pipe on Windows, an AF_UNIX socket
+# elsewhere. Unity opens it when launched with -mcpPipe; an older build (or
+# the multiplexer) stays on TCP. UNIA_LOCAL_ENDPOINT="" for TCP only.
+UNITY_LOCAL_ENDPOINT = os.environ.get("UNIA_LOCAL_ENDPOINT", default_endpoint(WORK_DIR))
 
-def log(msg):
-    """
-    Output debug log to stderr.
-    Important: stdout must not be used for debug messages,
-    because stdout is used for the MCP protocol.
-    """
-    sys.stderr.write(f"[Bridge] {msg}\n")
-    sys.stderr.flush()
+# 4. Startup buffering
+STDIN_QUEUE_MAX = 1024  # Host messages buffered while Unity boots (high watermark)
+ANSWER_INITIALIZE_LOCALLY = True  # Reply to initialize from the cached snapshot
+INITIALIZE_SNAPSHOT_FILE = os.path.join(WORK_DIR, "ai-unia-initialize.json")
+ANSWER_CATALOG_LOCALLY = True  # tools/list, prompts/list, prompts/get from the cache
+CATALOG_CACHE_FILE = os.path.join(WORK_DIR, "ai-unia-catalog.json")
+
+# 5. Unity -> host relay
+UPSTREAM_READ_CHUNK = 256 * 1024  # Bytes taken from the socket per read (one stdout write)
+MAX_FRAME_BYTES = 256 * 1024 * 1024  # A larger response is answered with an error instead
+
+# 6. Warm daemon (opt-in, UNIA_DAEMON=1): attach to a running Unity, keep it alive between sessions
+DAEMON_MODE = os.environ.get("UNIA_DAEMON", "0") == "1"
+DAEMON_IDLE_TIMEOUT_SEC = 600  # Stop Unity after this long without any bridge
+
+# 7. Multiplexer: many bridges share a few Unity connections (daemon mode only)
+MUX_MODE = os.environ.get("UNIA_MUX", "0") == "1"
+MUX_HOST = "127.0.0.1"
+MUX_PORT = 8081
+
+# 8. Metrics: per-method / per-tool latency summary on stderr (never stdout)
+METRICS_INTERVAL_SEC = 60
+STATS_FILE = os.path.join(WORK_DIR, "ai-unia-stats.json")
+
+# 9. Recovery when the Unity connection drops
+RECONNECT_ENABLED = True
+RELAUNCH_ON_LOSS = True  # Launch Unity again if it is gone
+RECONNECT_ATTEMPTS = 5
+RECONNECT_BACKOFF_SEC = 1.0  # Doubles per failed attempt
+
+# 10. Flow control: one bounded queue per direction, so a slow peer
+#     cannot stall the other direction or grow memory without limit
+STDIN_QUEUE_LOW = 256  # host -> Unity: a blocked stdin reader resumes at this depth
+STDOUT_QUEUE_MAX = 1024  # Unity -> host frames waiting for the host to read stdout
+STDOUT_QUEUE_LOW = 256
+QUEUE_MAX_BYTES = 64 * 1024 * 1024  # Per direction, on top of the frame count
+OVERFLOW_POLICY = os.environ.get("UNIA_OVERFLOW", "block")  # Host requests when full: "block" or "reject" (server busy)
+DROP_NOTIFICATIONS = True  # When full, progress/log notifications replace the oldest queued one
+
+# 11. Caching VOICEVOX proxy, started and stopped together with Unity
+VOICEVOX_PROXY = os.environ.get("UNIA_VOICEVOX_PROXY", "1") != "0"
+VOICEVOX_URL = "http://127.0.0.1:50021"  # The real engine
+VOICEVOX_PROXY_LISTEN = "127.0.0.1:50022"  # Unity is pointed here with -voicevoxUrl once it listens
+
+# 12. Speak long ai-unia-speak texts sentence by sentence, so the first one plays
+#     while the rest is synthesized (needs a Unity build with chunked speech)
+SPEAK_CHUNKING = os.environ.get("UNIA_SPEAK_CHUNKS", "0") == "1"
+
+# 13. Logging (unia_bridge.logger; stderr is written by a background thread)
+#     UNIA_LOG_LEVEL or --log-level=debug: trace every frame, truncated
+#     UNIA_LOG_SAMPLE or --log-sample=notifications/progress=100: 1 in N of a type
+#     On errors the last frames are written to WORK_DIR/ai-unia-frames-*.log
+
+# 14. Host message validation: parse errors / invalid requests are answered
+#     here, batch arrays are split for Unity and their responses re-joined
+VALIDATE_FRAMES = True  # Uses orjson when installed (UNIA_JSON=json for the stdlib)
+
+# 15. Supervisor: restart a Unity that stops answering or leaks memory
+#     (only a Unity this bridge owns: off with UNIA_DAEMON and UNIA_POOL)
+SUPERVISE_UNITY = True
+SUPERVISOR_SAMPLE_SEC = 5  # CPU time / RSS / threads (psutil, /proc or the Win32 API)
+PING_INTERVAL_SEC = 15  # MCP ping sent to Unity this often
+PING_TIMEOUT_SEC = 5
+PING_MISSES = 3  # Unanswered pings in a row before Unity is restarted
+UNITY_RSS_LIMIT_MB = int(os.environ.get("UNIA_RSS_LIMIT_MB", "4096"))  # 0: no limit
+
+# 16. Shutdown, in order and under one deadline: stdin closed -> in-flight
+#     responses reach the host -> TCP closed -> stdout flushed -> Unity stopped
+SHUTDOWN_TIMEOUT_SEC = 10
+SHUTDOWN_FLUSH_RESERVE_SEC = 2  # Part of it kept for writing stdout after the in-flight wait
+
+# 17. Traffic capture for offline replay (test_py/replay_capture.py)
+CAPTURE = os.environ.get("UNIA_CAPTURE", "0") == "1"
+CAPTURE_DIR = os.path.join(WORK_DIR, "captures")
+CAPTURE_MAX_BYTES = 64 * 1024 * 1024  # Per file; then the next file is started
+CAPTURE_KEEP_FILES = 8  # Older files of the same capture are deleted
+CAPTURE_COMPRESS = True  # gzip
+
+# 18. Request deadlines: a request Unity has not answered in time gets an
+#     error here, and Unity is sent notifications/cancelled so it stops
+#     working on it. Keys are "method" or "tools/call:<tool>"; 0 = no deadline.
+#     UNIA_TIMEOUTS="tools/call:ai-unia-speak=30,tools/list=5" overrides them.
+REQUEST_TIMEOUT_SEC = 120  # Anything not listed below
+REQUEST_TIMEOUTS_SEC = {
+    "tools/call:ai-unia-speak": 60,  # VOICEVOX synthesis of a long text
+    "tools/call:ai-unia-smile": 10,
+    "tools/call:echo": 10,
+    "tools/list": 30,
+    "prompts/list": 30,
+    "prompts/get": 30,
+}
+REQUEST_TIMEOUTS_SEC.update(parse_timeouts(os.environ.get("UNIA_TIMEOUTS", "")))
+
+# 19. Avatar action scheduler: avatar tool calls wait in per-lane queues, so
+#     speech does not overlap and expressions do not pile up. A lane sends one
+#     call at a time and stays busy while the avatar acts it out (Unity answers
+#     as soon as the action starts). ai-unia-speak with "interrupt": true drops
+#     the speech still queued. With UNIA_POOL every avatar has its own lanes.
+#     Off by default (UNIA_SCHEDULE=1): it changes when the host's calls run.
+SCHEDULE_ACTIONS = os.environ.get("UNIA_SCHEDULE", "0") == "1"
+ACTION_LANES = {
+    # priority: lower is sent first; coalesce: keep only the latest queued call
+    "speech": {"tools": ["ai-unia-speak"], "priority": 0,
+               "hold_sec_per_char": 0.12},  # VOICEVOX speaking time, roughly
+    "expression": {"tools": ["ai-unia-smile"], "priority": 1, "coalesce": True,
+                   "hold_sec": 1.2},  # Smile fade in + hold + fade out
+    "motion": {"tools": [], "priority": 2},  # No motion tools yet
+}
+
+# 20. Upstream transport: "tcp" (newline-delimited JSON-RPC on TCP_PORT) or
+#     "http" (MCP Streamable HTTP on the same port: POST per message, JSON or
+#     SSE responses, Mcp-Session-Id). Ignored with the multiplexer.
+#     "http" is experimental: the Unity player only listens for TCP (and the
+#     local endpoint); TestMcpTcpServer.cs has no HTTP listener yet, so it is
+#     tested against mock_unity_server.py --transport http only.
+UPSTREAM_TRANSPORT = os.environ.get("UNIA_TRANSPORT", "tcp")
+HTTP_MCP_PATH = "/mcp"
+HTTP_POOL_SIZE = 8  # Keep-alive connections to Unity
+
+# 21. Avatar pool: several Unity processes behind this bridge (different
+#     avatars, or warm replicas of one), each with its own port, log file and
+#     work dir (WORK_DIR/pool/<avatar>-<n>, state in WORK_DIR/pool/pool.json).
+#     A call goes to the avatar in params._meta.avatar, else POOL_DEFAULT_AVATAR,
+#     and to its least busy replica ("least") or always the same one ("sticky").
+#     Replicas are restarted when they stop answering pings; busy avatars get
+#     more (up to max), idle ones shrink back to min. Unity lives as long as
+#     this bridge (no daemon / multiplexer). UNIA_POOL_AVATARS="mikuru=1-3,asuka=1"
+#     sets the sizes (new names run UNITY_EXE_PATH).
+POOL_MODE = os.environ.get("UNIA_POOL", "0") == "1"
+POOL_AVATARS = {
+    "mikuru": {"exe": UNITY_EXE_PATH, "args": [], "min": 1, "max": 2},
+}
+POOL_DEFAULT_AVATAR = os.environ.get("UNIA_AVATAR", "mikuru")
+POOL_ROUTING = os.environ.get("UNIA_POOL_ROUTING", "least")  # "least" or "sticky"
+POOL_BASE_PORT = 8100  # Replica ports are the free ones from here
+# Run test_py/mock_unity_server.py instead of Unity, to try the pool on Linux
+POOL_MOCK = os.environ.get("UNIA_POOL_MOCK", "0") == "1"
+MOCK_UNITY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "..", "unity-project", "test_py", "mock_unity_server.py")
+for _name, (_low, _high) in parse_sizes(os.environ.get("UNIA_POOL_AVATARS", "")).items():
+    POOL_AVATARS.setdefault(_name, {"exe": UNITY_EXE_PATH, "args": []}).update(min=_low, max=_high)
+
+# 22. Binary side channel: Unity writes large results (audio, screenshots, motion
+#     data) to files in BLOB_DIR (-blobDir) and returns a resource_link
+#     "unia-blob:<file>?offset=..&length=..&sha256=.." instead of inline base64
+#     (ai-unia-speak with returnAudio). The bridge turns the link back into
+#     base64 content on the way to stdout. Files unused for BLOB_TTL_SEC,
+#     then the least recently used above BLOB_SPOOL_MAX_BYTES, are removed.
+BLOB_SPOOL = True
+BLOB_DIR = os.path.join(WORK_DIR, BLOB_DIR_NAME)
+BLOB_SPOOL_MAX_BYTES = 512 * 1024 * 1024
+BLOB_TTL_SEC = 600
+BLOB_SWEEP_SEC = 30
+# ---
 
 # ------------------------------------------------------------------------------
 # 1. Process management: Launch Unity
 # ------------------------------------------------------------------------------
 @asynccontextmanager
-async def unity_process_context(exe_path: str, args: list):
-    process: subprocess.Popen | None = None
+async def unity_process_context(exe_path: str, args: list, stop_timeout: float = 5.0):
+    process: ChildProcess | None = None
     try:
         log(f"Launching Unity: {os.path.basename(exe_path)}")
 
         # Launch Unity as an independent process
+        # (stdin/stdout must not inherit the MCP pipe)
         cmd = [exe_path] + args
-        process = subprocess.Popen(cmd)
-
-        log(f"Waiting {STARTUP_WAIT_SEC} seconds for TCP server to be ready...")
-        await asyncio.sleep(STARTUP_WAIT_SEC)
+        process = await spawn(cmd, stdin=asyncio.subprocess.DEVNULL,
+                              stdout=asyncio.subprocess.DEVNULL)
 
         yield process
 
     finally:
-        if process:
+        if process and process.returncode is None:
             log(f"Terminating Unity process (PID: {process.pid})")
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
+            await process.stop(stop_timeout)
+            log("Process terminated")
+
+class UnityConnector:
+    """
+    Opens (and re-opens after a loss) the TCP connection to Unity.
+    DAEMON_MODE: attach to the warm Unity, or launch it detached so it
+    outlives this bridge. Otherwise Unity is launched through
+    unity_process_context and lives only as long as this bridge;
+    a dead process is relaunched on the next connect().
+    The local endpoint (pipe / AF_UNIX socket) is tried before TCP.
+    With the http transport the connection becomes the first one of an
+    HttpUpstream pool, which stands in for the (reader, writer) pair.
+    """
+
+    def __init__(self, args: list):
+        self.args = args
+        self.stats = StartupStats(STARTUP_STATS_FILE)
+        self.connects = 0
+        self._process = None
+        self._process_stack = AsyncExitStack()
+        self._state = DaemonState(WORK_DIR) if DAEMON_MODE else None
+        self._task_beat = None
+        # the local listener speaks the newline-delimited TCP framing only
+        self.local = UNITY_LOCAL_ENDPOINT if UPSTREAM_TRANSPORT == "tcp" else None
+
+    async def connect(self):
+        if DAEMON_MODE:
+            conn = await self._connect_daemon()
+        else:
+            conn = await self._connect_owned()
+        self.connects += 1
+        if UPSTREAM_TRANSPORT == "http" and not (DAEMON_MODE and MUX_MODE):
+            upstream = HttpUpstream(TCP_HOST, TCP_PORT, HTTP_MCP_PATH, HTTP_POOL_SIZE, first=conn)
+            return upstream.reader, upstream.writer
+        return conn
+
+    async def _wait_ready(self, process, host: str = TCP_HOST, port: int = TCP_PORT,
+                          local: str | None = None, watcher: LogMarkerWatcher | None = None):
+        where = f"{local} or {host}:{port}" if local else f"{host}:{port}"
+        log(f"Waiting for Unity server {where} "
+            f"(expected ~{self.stats.estimate():.1f}s)")
+        return await connect_when_ready(
+            host, port,
+            process=process,
+            log_file=LOG_FILE,
+            watcher=watcher,
+            stats=self.stats,
+            timeout=STARTUP_TIMEOUT_SEC,
+            started_at=process.started_at if process else None,
+            limit=UPSTREAM_READ_CHUNK,
+            local=local)
+
+    async def _connect_owned(self):
+        if self._process is not None and self._process.returncode is None:
+            # Unity still running: just reconnect
+            conn = await try_attach(TCP_HOST, TCP_PORT, limit=UPSTREAM_READ_CHUNK, local=self.local)
+            if conn:
+                return conn
+        if self._process is not None:
+            if not RELAUNCH_ON_LOSS:
+                raise UnityStartupError("Unity connection lost (relaunch disabled)")
+            await self._process_stack.aclose()
+            self._process_stack = AsyncExitStack()
+        args = self.args
+        if VOICEVOX_PROXY:
+            proxy = await self._process_stack.enter_async_context(
+                voicevox_proxy_context(WORK_DIR, VOICEVOX_PROXY_LISTEN, VOICEVOX_URL))
+            args = args + unity_args(proxy, VOICEVOX_PROXY_LISTEN, VOICEVOX_URL)
+        # the log offset is taken before the spawn, so an early marker is not missed
+        watcher = LogMarkerWatcher(LOG_FILE)
+        self._process = await self._process_stack.enter_async_context(
+            unity_process_context(UNITY_EXE_PATH, args))
+        return await self._wait_ready(self._process, local=self.local, watcher=watcher)
+
+    async def _connect_daemon(self):
+        if self._task_beat is None:
+            self._task_beat = asyncio.create_task(heartbeat(self._state))
+
+        # with the multiplexer, bridges talk to it instead of Unity's own port
+        host, port = (MUX_HOST, MUX_PORT) if MUX_MODE else (TCP_HOST, TCP_PORT)
+        local = None if MUX_MODE else self.local
+        conn = await try_attach(host, port, limit=UPSTREAM_READ_CHUNK, local=local)
+        if conn:
+            log(f"Attached to running Unity on {describe(conn[1])}")
+            return conn
+        if self.connects and not RELAUNCH_ON_LOSS:
+            raise UnityStartupError("Unity connection lost (relaunch disabled)")
+
+        if not self._state.try_lock(STARTUP_TIMEOUT_SEC):
+            log("Another bridge is launching Unity; waiting for it")
+            return await self._wait_ready(None, host, port, local)
+        try:
+            # another bridge may have finished launching in the meantime
+            conn = await try_attach(host, port, limit=UPSTREAM_READ_CHUNK, local=local)
+            if conn:
+                return conn
+            log(f"Launching Unity daemon: {os.path.basename(UNITY_EXE_PATH)}")
+            started_at = time.monotonic()
+            watcher = LogMarkerWatcher(LOG_FILE)
+            process = launch_daemon_host(
+                WORK_DIR, DAEMON_IDLE_TIMEOUT_SEC, [UNITY_EXE_PATH] + self.args,
+                mux_listen=f"{MUX_HOST}:{MUX_PORT}" if MUX_MODE else None,
+                upstream=f"{TCP_HOST}:{TCP_PORT}",
+                voicevox_listen=VOICEVOX_PROXY_LISTEN if VOICEVOX_PROXY else None,
+                voicevox_upstream=VOICEVOX_URL)
+            process.started_at = started_at
+            return await self._wait_ready(process, host, port, local, watcher)
+        finally:
+            self._state.unlock()
+
+    def unity_pid(self) -> int | None:
+        if DAEMON_MODE:
+            return (self._state.read_pid() or {}).get("unity_pid")
+        return self._process.pid if self._process is not None else None
+
+    async def restart_unity(self):
+        """Kill a hung Unity; the next connect() launches a new one. A daemon's Unity is shared: left alone."""
+        pid = None if DAEMON_MODE else self.unity_pid()
+        if pid:
+            await kill_process(pid)
+
+    async def close(self, timeout: float = 5.0):
+        """Stop the Unity this bridge owns (a daemon's Unity is left running)."""
+        if self._task_beat is not None:
+            self._task_beat.cancel()
+            await asyncio.gather(self._task_beat, return_exceptions=True)
+        if self._process is not None and self._process.returncode is None:
+            log(f"Terminating Unity process (PID: {self._process.pid})")
+            await self._process.stop(timeout)
             log("Process terminated")
+        await self._process_stack.aclose()
 
 # ------------------------------------------------------------------------------
 # 2. Bridge: Stdin <-> TCP <-> Stdout
 # ------------------------------------------------------------------------------
-async def pipe_stdin_to_tcp(writer: asyncio.StreamWriter):
+async def read_stdin_to_queue(queue: FrameQueue, handshake: InitializeCache,
+                              catalog: CatalogCache | None, out_queue: FrameQueue,
+                              speech: SpeechChunker | None, validator: FrameValidator | None,
+                              scheduler: ActionScheduler | None, shutdown: "Deadline",
+                              capture: CaptureWriter | None):
     """
-    Read from stdin (MCP client request) and forward to TCP (Unity)
+    Read from stdin (MCP client request) into a bounded queue.
+    Runs from bridge start, so requests sent while Unity boots are kept
+    in order instead of waiting in the OS pipe. None marks EOF.
+    Lines stay raw bytes all the way to the TCP writer.
+    A request refused by the queue (reject policy) is answered "server busy".
+    Replies made here wait for room in out_queue like Unity's own.
+    A line over the stdin limit is skipped and its request answered.
+    The validator answers malformed lines and splits batch arrays first.
+    Cached tools/list, prompts/list and prompts/get are answered here;
+    avatar actions wait in the scheduler's lanes, and long ai-unia-speak
+    calls are handed to the speech chunker instead.
     """
-    loop = asyncio.get_running_loop()
     try:
+        stdin = await open_stdin()
         while True:
-            # Use executor for cross-platform blocking readline
-            line = await loop.run_in_executor(None, sys.stdin.readline)
+            try:
+                line = await stdin.readline()
+            except LineTooLong as e:
+                log(f"{e}; skipped")
+                reply = e.reply()
+                if reply is not None:
+                    await out_queue.put(reply)
+                continue
 
             if not line:  # EOF detected
+                if validator:
+                    for reply in validator.flush():
+                        await out_queue.put(reply)
+                if scheduler:
+                    await scheduler.drain(shutdown.remaining() - SHUTDOWN_FLUSH_RESERVE_SEC)
                 break
 
-            writer.write(line.encode('utf-8'))
-            await writer.drain()
+            if capture:
+                capture.record(HOST_IN, line)
+            if validator:
+                lines, replies = validator.on_line(line)
+                for reply in replies:
+                    await out_queue.put(reply)
+            else:
+                lines = [line]
+
+            for line in lines:
+                frame, response = handshake.on_request(line)
+                if response is not None:
+                    await out_queue.put(response)
+
+                if catalog:
+                    cached = catalog.on_request(frame)
+                    if cached is not None:
+                        await out_queue.put(cached)
+                        continue
+                if scheduler and scheduler.intercept(frame):
+                    await out_queue.wait_room()   # skipped or merged calls were answered
+                    continue
+                if speech and speech.intercept(frame):
+                    continue
+                if not await queue.put(frame) and response is None:
+                    await out_queue.put(busy_frame(peek_frame(frame).id))
 
     except Exception as e:
-        log(f"Stdin->TCP Error: {e}")
+        error(f"Stdin read Error: {e}")
     finally:
-        log("Stdin closed -> closing TCP writer")
-        if not writer.is_closing():
-            writer.close()
+        queue.put_nowait(None)
+
+async def forward_action(frame: bytes, queue: FrameQueue, out_queue: FrameQueue,
+                         speech: SpeechChunker | None):
+    """An avatar action released by the scheduler goes on like any host request."""
+    if speech and speech.intercept(frame):
+        return
+    if not await queue.put(frame):
+        await out_queue.put(busy_frame(peek_frame(frame).id))
+
+async def pipe_stdin_to_tcp(queue: FrameQueue, writer: asyncio.StreamWriter,
+                            tracker: RequestTracker, deadlines: RequestDeadlines,
+                            capture: CaptureWriter | None) -> bool:
+    """
+    Forward queued stdin frames (MCP client request) to TCP (Unity).
+    Each batch is written at once and drained once.
+    A host's notifications/cancelled is forwarded, and the request it
+    names is no longer waited for.
+    Returns True when stdin reached EOF; the connection is then left open
+    for the responses still on their way.
+    """
+    try:
+        if len(queue):
+            log(f"Flushing {len(queue)} buffered message(s) to Unity")
+        while True:
+            frames = await queue.get_batch()
+            eof = frames[-1] is None
+            if eof:
+                frames.pop()
+
+            # tracked before the write: if it fails, the host gets an error
+            for frame in frames:
+                method = tracker.on_request(frame).method
+                trace_frame("host->unity", frame, method)
+                if method == "notifications/cancelled":
+                    deadlines.on_host_cancel(frame)
+                if capture:
+                    capture.record(UNITY_OUT, frame)
+            if frames:
+                writer.write(b"".join(frames))
+                await writer.drain()
+
+            if eof:  # EOF detected
+                log("Stdin closed")
+                return True
+
+    except Exception as e:
+        error(f"Stdin->TCP Error: {e}")
+        writer.close()
+        return False
 
-async def pipe_tcp_to_stdout(reader: asyncio.StreamReader):
+async def pipe_tcp_to_stdout(reader: asyncio.StreamReader, handshake: InitializeCache,
+                             catalog: CatalogCache | None, out_queue: FrameQueue,
+                             tracker: RequestTracker, deadlines: RequestDeadlines,
+                             speech: SpeechChunker | None, supervisor: UnitySupervisor | None,
+                             capture: CaptureWriter | None):
     """
-    Read from TCP (Unity response) and write to stdout (MCP client)
+    Read from TCP (Unity response) into the stdout queue.
+    Frames stay bytes. While the queue is full, reading stops, so a host
+    that does not read stdout pushes back on Unity's socket only.
+    Responses to requests already timed out or cancelled are dropped.
     """
+    frames_in = FrameReader(reader, max_frame=MAX_FRAME_BYTES,
+                            chunk_size=UPSTREAM_READ_CHUNK)
     try:
         while True:
-            line = await reader.readline()
-            if not line:  # TCP closed
+            frames = await frames_in.read_frames()
+            if not frames:  # TCP closed
                 break
 
-            sys.stdout.write(line.decode('utf-8'))
-            sys.stdout.flush()
+            for frame in frames:
+                info = tracker.on_response(frame)
+                trace_frame("unity->host", frame, info.method)
+                if capture:
+                    capture.record(UNITY_IN, frame)
+                if deadlines.on_response(info):
+                    continue
+                if supervisor and supervisor.on_response(info):
+                    continue
+                if speech and speech.on_response(info, frame):
+                    continue
+                if catalog:
+                    catalog.on_response(info.id, info.method, frame)
+                if not handshake.on_response(info, frame):
+                    await out_queue.put(frame)
 
     except Exception as e:
-        log(f"TCP->Stdout Error: {e}")
+        error(f"TCP->Stdout Error: {e}")
     finally:
         log("TCP connection closed")
 
+async def pipe_queue_to_stdout(out_queue: FrameQueue, stdout: ThreadStdoutWriter,
+                               validator: FrameValidator | None, scheduler: ActionScheduler | None,
+                               capture: CaptureWriter | None, blobs: BlobSpool | None):
+    """
+    Write queued frames to stdout (MCP client), a batch per write + flush.
+    Runs for the whole session, across Unity reconnects. None marks the end.
+    Responses to a split JSON-RPC batch leave here as one array.
+    The scheduler sees every response here, whoever produced it.
+    Blob links are resolved here, so only frames the host gets are expanded.
+    """
+    try:
+        while True:
+            frames = await out_queue.get_batch()
+            eof = frames[-1] is None
+            if eof:
+                frames.pop()
+            if scheduler:
+                scheduler.on_delivered(frames)
+            if blobs:
+                frames = await blobs.deliver(frames)
+            if validator:
+                frames = validator.collect(frames)
+            if frames:
+                await stdout.write_frames(frames)
+                if capture:
+                    for frame in frames:
+                        capture.record(HOST_OUT, frame)
+            if eof:
+                return
+    except Exception as e:
+        error(f"Stdout write Error: {e}")
+
+# ------------------------------------------------------------------------------
+# 3. Session: run the bridge, recover from a lost Unity connection
+# ------------------------------------------------------------------------------
+class Deadline:
+    """One time budget shared by all shutdown steps; starts on first use."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._at: float | None = None
+
+    def remaining(self) -> float:
+        if self._at is None:
+            self._at = time.monotonic() + self.timeout
+        return max(0.0, self._at - time.monotonic())
+
+async def wait_for_responses(tracker: RequestTracker, task_out: asyncio.Task, shutdown: Deadline):
+    """After stdin EOF: keep relaying until Unity has answered everything sent to it."""
+    if tracker.inflight:
+        log(f"Waiting for {len(tracker.inflight)} in-flight response(s)")
+    while tracker.inflight and not task_out.done() \
+            and shutdown.remaining() > SHUTDOWN_FLUSH_RESERVE_SEC:
+        await asyncio.wait([task_out], timeout=0.05)
+    if tracker.inflight and not task_out.done():
+        log(f"Shutdown deadline: {len(tracker.inflight)} response(s) not received")
+
+async def cancel_outstanding(writer: asyncio.StreamWriter, deadlines: RequestDeadlines,
+                             handshake: InitializeCache, reason: str, timeout: float):
+    """Send notifications/cancelled for every request still in flight, straight to TCP."""
+    frames = [deadlines.abandon(req_id, reason) for req_id in list(deadlines.tracker.inflight)
+              if not handshake.owns(req_id)]  # initialize must not be cancelled
+    if not frames or writer.is_closing():
+        return
+    log(f"Cancelling {len(frames)} abandoned request(s) in Unity")
+    try:
+        writer.write(b"".join(frames))
+        await asyncio.wait_for(writer.drain(), timeout)
+    except (ConnectionError, asyncio.TimeoutError):
+        pass
+
+async def expire_requests(deadlines: RequestDeadlines, handshake: InitializeCache,
+                          out_queue: FrameQueue, speech: SpeechChunker | None,
+                          scheduler: ActionScheduler | None):
+    """Answer requests that ran past their deadline with an error (runs for the session)."""
+    while True:
+        await asyncio.sleep(deadlines.next_check())
+        for req_id, key, timeout in deadlines.expired():
+            if handshake.owns(req_id):
+                if not handshake.is_pending(req_id):
+                    deadlines.tracker.inflight.pop(req_id, None)  # the bridge's own: nobody waits
+                continue  # the host's initialize: the startup timeout covers it
+            deadlines.expire(req_id, key, timeout)
+            if scheduler:
+                scheduler.release(req_id)  # the avatar lane takes the next action
+            message = f"Unity did not answer {key} within {timeout:g}s"
+            if speech and speech.owns(req_id):
+                speech.on_lost(req_id, message)  # the chunker answers the host's request
+                continue
+            out_queue.put_nowait(error_frame(req_id, REQUEST_TIMEOUT, message))
+
+async def run_bridge(reader, writer, queue: FrameQueue, handshake: InitializeCache,
+                     catalog: CatalogCache | None, out_queue: FrameQueue,
+                     tracker: RequestTracker, deadlines: RequestDeadlines,
+                     speech: SpeechChunker | None, supervisor: UnitySupervisor | None,
+                     connector: UnityConnector, shutdown: Deadline,
+                     capture: CaptureWriter | None) -> bool:
+    """
+    Pipe both directions until one side ends, or until the supervisor
+    finds Unity hung (it is then killed and the session reconnects).
+    Returns True when the host closed stdin (normal end of session);
+    responses already on their way are relayed first, within the
+    shutdown deadline, the rest is cancelled in Unity, then the TCP
+    connection is closed.
+    """
+    task_in = asyncio.create_task(pipe_stdin_to_tcp(queue, writer, tracker, deadlines, capture))
+    task_out = asyncio.create_task(pipe_tcp_to_stdout(reader, handshake, catalog, out_queue, tracker,
+                                                      deadlines, speech, supervisor, capture))
+    tasks = [task_in, task_out]
+    task_watch = asyncio.create_task(supervisor.watch(writer, out_queue)) if supervisor else None
+    if task_watch:
+        tasks.append(task_watch)
+
+    done, pending = await asyncio.wait(
+        tasks,
+        return_when=asyncio.FIRST_COMPLETED
+    )
+
+    stdin_closed = task_in in done and task_in.result()
+    if stdin_closed:
+        if task_watch:
+            task_watch.cancel()  # no more pings
+        await wait_for_responses(tracker, task_out, shutdown)
+        await cancel_outstanding(writer, deadlines, handshake, "host disconnected",
+                                 min(shutdown.remaining(), 1.0))
+
+    for t in pending:
+        t.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if not writer.is_closing():
+        writer.close()
+        # HTTP: lets the DELETE that ends the MCP session go out
+        await asyncio.gather(asyncio.wait_for(writer.wait_closed(), 1.0), return_exceptions=True)
+
+    if task_watch in done:
+        error(f"Restarting Unity: {task_watch.result()}")
+        supervisor.restarts += 1
+        await connector.restart_unity()
+        return False
+    return stdin_closed
+
+def fail_lost_requests(tracker: RequestTracker, handshake: InitializeCache,
+                       out_queue: FrameQueue, speech: SpeechChunker | None):
+    """Answer every request that was sent to the lost connection with an error."""
+    count = 0
+    for req_id in tracker.drop_inflight():
+        if handshake.owns(req_id):
+            continue  # initialize: the host's is replayed, the bridge's is its own
+        if speech and speech.owns(req_id):
+            speech.on_lost(req_id)  # the chunker answers the host's request
+            continue
+        out_queue.put_nowait(dumps_line({
+            "jsonrpc": "2.0", "id": req_id,
+            "error": {"code": -32000,
+                      "message": "Unity connection lost before the request completed"}}))
+        count += 1
+    if count:
+        log(f"Returning errors for {count} request(s) lost in flight")
+
 # ------------------------------------------------------------------------------
 # Main
 # ------------------------------------------------------------------------------
+def pool_avatars() -> dict:
+    """POOL_AVATARS, or the same sizes running mock_unity_server.py with POOL_MOCK."""
+    if not POOL_MOCK:
+        return POOL_AVATARS
+    mock = {"exe": sys.executable, "args": [MOCK_UNITY_SCRIPT, "--startup-delay", "1"]}
+    return {name: dict(avatar, **mock) for name, avatar in POOL_AVATARS.items()}
+
 async def main():
+    # error() dumps the last frames next to the Unity log
+    set_dump_dir(WORK_DIR)
+
     # Unity launch arguments
-    args = ["-logFile", LOG_FILE]
+    # (-voicevoxUrl is added where the VOICEVOX proxy is started)
+    shared_args = []
+    if BLOB_SPOOL:
+        shared_args += ["-blobDir", BLOB_DIR]
+    args = ["-logFile", LOG_FILE] + shared_args
+    if UNITY_LOCAL_ENDPOINT and UPSTREAM_TRANSPORT == "tcp":
+        args += ["-mcpPipe", UNITY_LOCAL_ENDPOINT]
+    if UPSTREAM_TRANSPORT == "http" and DAEMON_MODE and MUX_MODE:
+        log("The multiplexer speaks TCP to Unity; UNIA_TRANSPORT=http is ignored")
+    elif UPSTREAM_TRANSPORT == "http" and not POOL_MODE:
+        log("UNIA_TRANSPORT=http is experimental (the Unity player has no HTTP listener yet)")
+    if POOL_MODE and (DAEMON_MODE or UPSTREAM_TRANSPORT != "tcp"):
+        log("The avatar pool owns its Unity processes over TCP; UNIA_DAEMON / UNIA_TRANSPORT are ignored")
 
-    try:
-        # 1. Start Unity
-        async with unity_process_context(UNITY_EXE_PATH, args):
+    # 0. Start reading stdin right away; Unity startup runs in parallel
+    handshake = InitializeCache(INITIALIZE_SNAPSHOT_FILE, UNITY_EXE_PATH,
+                                answer_locally=ANSWER_INITIALIZE_LOCALLY)
+    catalog = (CatalogCache(CATALOG_CACHE_FILE, UNITY_EXE_PATH, handshake)
+               if ANSWER_CATALOG_LOCALLY else None)
+    tracker = RequestTracker()
+    queue = FrameQueue("host->unity", STDIN_QUEUE_MAX, STDIN_QUEUE_LOW, QUEUE_MAX_BYTES,
+                       policy=OVERFLOW_POLICY, drop_notifications=DROP_NOTIFICATIONS)
+    out_queue = FrameQueue("unity->host", STDOUT_QUEUE_MAX, STDOUT_QUEUE_LOW, QUEUE_MAX_BYTES,
+                           drop_notifications=DROP_NOTIFICATIONS)
+    tracker.watch_queue(queue)
+    tracker.watch_queue(out_queue)
+    speech = SpeechChunker(queue, out_queue) if SPEAK_CHUNKING else None
+    validator = FrameValidator() if VALIDATE_FRAMES else None
+    capture = (CaptureWriter(CAPTURE_DIR, CAPTURE_MAX_BYTES, CAPTURE_KEEP_FILES, CAPTURE_COMPRESS)
+               if CAPTURE else None)
+    scheduler = (ActionScheduler([Lane(name, **lane) for name, lane in ACTION_LANES.items()],
+                                 lambda frame: forward_action(frame, queue, out_queue, speech),
+                                 out_queue, by_avatar=POOL_MODE, default_avatar=POOL_DEFAULT_AVATAR)
+                 if SCHEDULE_ACTIONS else None)
+    if scheduler:
+        tracker.watch_stage(scheduler)
+    blobs = BlobSpool(BLOB_DIR, BLOB_SPOOL_MAX_BYTES, BLOB_TTL_SEC) if BLOB_SPOOL else None
+    if blobs:
+        tracker.watch_stage(blobs)
+    shutdown = Deadline(SHUTDOWN_TIMEOUT_SEC)
+    stdout = ThreadStdoutWriter(asyncio.get_running_loop())
+    task_write = asyncio.create_task(pipe_queue_to_stdout(out_queue, stdout, validator, scheduler,
+                                                          capture, blobs))
+    task_read = asyncio.create_task(read_stdin_to_queue(queue, handshake, catalog, out_queue, speech,
+                                                        validator, scheduler, shutdown, capture))
+    task_stats = asyncio.create_task(tracker.report_periodically(METRICS_INTERVAL_SEC, STATS_FILE))
+    task_sweep = asyncio.create_task(blobs.sweep_periodically(BLOB_SWEEP_SEC)) if blobs else None
+    deadlines = RequestDeadlines(tracker, queue, REQUEST_TIMEOUT_SEC, REQUEST_TIMEOUTS_SEC)
+    services = AsyncExitStack()  # shared by the pool's replicas
+    if POOL_MODE:
+        connector = UnityPool([Avatar(name, avatar["exe"], avatar["args"], avatar["min"], avatar["max"])
+                               for name, avatar in pool_avatars().items()],
+                              unity_process_context, WORK_DIR, TCP_HOST, POOL_BASE_PORT,
+                              POOL_ROUTING, POOL_DEFAULT_AVATAR,
+                              local_endpoints=bool(UNITY_LOCAL_ENDPOINT), base_args=shared_args)
+        tracker.watch_stage(connector)
+    else:
+        connector = UnityConnector(args)
+    # the pool pings and restarts each replica itself; a daemon's Unity is shared
+    supervisor = (UnitySupervisor(connector.unity_pid, SUPERVISOR_SAMPLE_SEC, PING_INTERVAL_SEC,
+                                  PING_TIMEOUT_SEC, PING_MISSES, UNITY_RSS_LIMIT_MB << 20)
+                  if SUPERVISE_UNITY and not (POOL_MODE or DAEMON_MODE) else None)
+    task_deadlines = asyncio.create_task(expire_requests(deadlines, handshake, out_queue, speech,
+                                                         scheduler))
 
-            # 2. Connect to Unity TCP server
-            log(f"Attempting TCP connection: {TCP_HOST}:{TCP_PORT}")
+    try:
+        if POOL_MODE and VOICEVOX_PROXY:
+            proxy = await services.enter_async_context(
+                voicevox_proxy_context(WORK_DIR, VOICEVOX_PROXY_LISTEN, VOICEVOX_URL))
+            connector.base_args += unity_args(proxy, VOICEVOX_PROXY_LISTEN, VOICEVOX_URL)
+        failures = 0
+        while True:
+            # 1. Start or attach to Unity
+            # 2. Connect to Unity TCP server as soon as it is ready
             try:
-                reader, writer = await asyncio.open_connection(TCP_HOST, TCP_PORT)
-                log("TCP connection established. Starting bridge.")
-
-                # 3. Start bidirectional piping
-                task_in = asyncio.create_task(pipe_stdin_to_tcp(writer))
-                task_out = asyncio.create_task(pipe_tcp_to_stdout(reader))
+                reader, writer = await connector.connect()
+            except UnityStartupError as e:
+                failures += 1
+                if connector.connects == 0 or failures >= RECONNECT_ATTEMPTS:
+                    raise
+                delay = RECONNECT_BACKOFF_SEC * 2 ** (failures - 1)
+                log(f"Reconnect failed ({e}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            log("TCP connection established. Starting bridge.")
 
-                done, pending = await asyncio.wait(
-                    [task_in, task_out],
-                    return_when=asyncio.FIRST_COMPLETED
-                )
+            if connector.connects > 1:
+                # a new Unity session needs the MCP handshake again
+                replay = handshake.replay_frames()
+                if replay:
+                    log("Replaying initialize handshake")
+                    writer.write(b"".join(replay))
 
-                for t in pending:
-                    t.cancel()
-
-            except ConnectionRefusedError:
-                log("Connection refused: Unity may not be running or port is closed.")
+            # 3. Start bidirectional piping
+            try:
+                stdin_closed = await run_bridge(reader, writer, queue, handshake, catalog, out_queue,
+                                                tracker, deadlines, speech, supervisor, connector,
+                                                shutdown, capture)
             except Exception as e:
-                log(f"Bridge error: {e}")
+                error(f"Bridge error: {e}")
+                break
+            if stdin_closed:
+                break
+
+            fail_lost_requests(tracker, handshake, out_queue, speech)
+            if not RECONNECT_ENABLED:
+                break
+            error("Unity connection lost; reconnecting")
 
+    except UnityStartupError as e:
+        error(f"Unity startup failed: {e}")
     except Exception as e:
-        log(f"Fatal error: {e}")
+        error(f"Fatal error: {e}")
+    finally:
+        # stop accepting stdin (the TCP connection is already closed)
+        task_read.cancel()
+        task_stats.cancel()
+        if task_sweep:
+            task_sweep.cancel()
+        task_deadlines.cancel()
+        if scheduler:
+            scheduler.close()
+        if speech:
+            speech.close()
+        # let the host receive whatever is still queued for it
+        out_queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(task_write, shutdown.remaining())
+        except asyncio.TimeoutError:
+            log("Host is not reading stdout; dropping queued output")
+        await connector.close(shutdown.remaining())
+        await services.aclose()
+        if capture:
+            await asyncio.to_thread(capture.close)
+        for line in tracker.summary_lines() + deadlines.summary_lines() \
+                + (supervisor.summary_lines() if supervisor else []):
+            log(line)
+        if catalog and catalog.hits:
+            log(f"  answered {catalog.hits} catalog request(s) from cache")
+        if validator and (validator.parse_errors or validator.invalid or validator.batches):
+            log(f"  host messages ({JSON_BACKEND}): {validator.parse_errors} parse error(s), "
+                f"{validator.invalid} invalid, {validator.batches} batch(es) split")
+
+def set_event_loop_policy():
+    """The selector loop on Windows, unless Unity is reached over a named pipe."""
+    # named pipes need the default (Proactor) loop; stdio and ChildProcess work with both
+    if sys.platform == 'win32' and not (UNITY_LOCAL_ENDPOINT and UPSTREAM_TRANSPORT == "tcp"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 if __name__ == "__main__":
-    if sys.platform == 'win32':
-         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    set_event_loop_policy()
 
     try:
         asyncio.run(main())
@@ -0,0 +1,11 @@
+import os
+import sys
+
+#
+# pytest for unia_bridge: python -m pytest ai-unia-mcpb/tests
+# The modules are driven against unity-project/test_py/mock_unity_server.py
+# (in-process, on a free port) instead of the Unity player.
+#
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, ".."))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "unity-project", "test_py"))
@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+from mock_unity_server import start_mock_server
+
+
+async def start_mock(**kwargs):
+    """mock_unity_server on a free port: (server, mock, port)."""
+    server, mock = await start_mock_server(port=0, **kwargs)
+    return server, mock, server.sockets[0].getsockname()[1]
+
+
+def request(request_id, method, params=None) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                       "params": params or {}}).encode() + b"\n"
+
+
+def tool_call(request_id, name, arguments, meta=None) -> bytes:
+    params = {"name": name, "arguments": arguments}
+    if meta:
+        params["_meta"] = meta
+    return request(request_id, "tools/call", params)
+
+
+def cancel(request_id) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                       "params": {"requestId": request_id}}).encode() + b"\n"
+
+
+async def until(predicate, timeout=5.0, what="condition"):
+    """Poll predicate() until it is true."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            raise AssertionError(f"timed out waiting for {what}")
+        await asyncio.sleep(0.01)
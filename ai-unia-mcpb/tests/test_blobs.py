@@ -0,0 +1,49 @@
+import asyncio
+import base64
+import json
+import os
+
+from helpers import start_mock, tool_call
+from unia_bridge.blobs import MARKER, BlobSpool
+from unia_bridge.relay import FrameReader
+
+
+async def speak_with_audio(blob_dir, text="あいうえお"):
+    """The raw frame for ai-unia-speak {"returnAudio": true} from a mock with -blobDir."""
+    server, mock, port = await start_mock(speak_base_ms=0, speak_ms_per_char=1, blob_dir=blob_dir)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(tool_call(1, "ai-unia-speak", {"text": text, "returnAudio": True}))
+        return (await FrameReader(reader).read_frames())[0]
+    finally:
+        writer.close()
+        server.close()
+
+
+def test_spooled_audio_is_inlined_before_stdout(tmp_path):
+    async def run():
+        frame = await speak_with_audio(str(tmp_path))
+        assert MARKER in frame
+        link = json.loads(frame)["result"]["content"][1]
+        assert link["type"] == "resource_link"
+
+        [delivered] = await BlobSpool(str(tmp_path)).deliver([frame])
+        audio = json.loads(delivered)["result"]["content"][1]
+        assert audio["type"] == "audio" and audio["mimeType"] == "audio/wav"
+        assert len(base64.b64decode(audio["data"])) == link["size"]
+    asyncio.run(run())
+
+
+def test_rewritten_blob_is_not_delivered(tmp_path):
+    async def run():
+        frame = await speak_with_audio(str(tmp_path))
+        name = json.loads(frame)["result"]["content"][1]["name"]
+        with open(os.path.join(tmp_path, name), "r+b") as f:
+            f.write(b"X")
+
+        spool = BlobSpool(str(tmp_path))
+        [delivered] = await spool.deliver([frame])
+        item = json.loads(delivered)["result"]["content"][1]
+        assert item["type"] == "text" and "sha256" in item["text"]
+        assert spool.errors == 1
+    asyncio.run(run())
@@ -0,0 +1,63 @@
+import os
+import struct
+
+import pytest
+
+from unia_bridge.capture import HOST_IN, HOST_OUT, MAGIC, UNITY_IN, UNITY_OUT, CaptureWriter, read_capture
+
+FRAMES = [(HOST_IN, b'{"jsonrpc":"2.0","id":1,"method":"tools/list"}\n'),
+          (UNITY_OUT, b'{"jsonrpc":"2.0","id":1,"method":"tools/list"}\n'),
+          (UNITY_IN, b'{"jsonrpc":"2.0","id":1,"result":{"tools":[]}}\n'),
+          (HOST_OUT, b'{"jsonrpc":"2.0","id":1,"result":{"tools":[]}}\n')]
+
+
+def capture_files(directory) -> list[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_rotated_files_read_back_in_order(tmp_path, compress):
+    writer = CaptureWriter(str(tmp_path), max_bytes=200, keep_files=100, compress=compress)
+    for n in range(10):
+        for direction, frame in FRAMES:
+            writer.record(direction, frame.replace(b'"id":1', b'"id":%d' % n))
+    writer.close()
+
+    files = capture_files(tmp_path)
+    assert len(files) > 3 and writer.frames == 40 and not writer.dropped
+    assert all(f.endswith(".cap.gz" if compress else ".cap") for f in files)
+    records = [r for path in files for r in read_capture(path)]
+    assert [(d, f) for d, _, f in records] == [
+        (direction, frame.replace(b'"id":1', b'"id":%d' % n)) for n in range(10) for direction, frame in FRAMES]
+    stamps = [t for _, t, _ in records]
+    assert stamps == sorted(stamps) and 0 <= stamps[0] < 5   # timestamps continue across files
+
+
+def test_record_format(tmp_path):
+    writer = CaptureWriter(str(tmp_path), compress=False)
+    writer.record(UNITY_IN, b"{}\n")
+    writer.close()
+    [path] = capture_files(tmp_path)
+    data = open(path, "rb").read()
+
+    # b"UNIACAP1" <d: wall clock> then <B: direction> <Q: microseconds> <I: length> bytes
+    assert data[:8] == MAGIC
+    assert abs(struct.unpack_from("<d", data, 8)[0] - os.path.getmtime(path)) < 60
+    direction, stamp, length = struct.unpack_from("<BQI", data, 16)
+    assert (direction, length, data[16 + 13:]) == (UNITY_IN, 3, b"{}\n")
+    assert [(d, f) for d, _, f in read_capture(path)] == [(UNITY_IN, b"{}\n")]
+
+    # a file cut off mid-record (bridge killed) reads up to the last whole record
+    with open(path, "ab") as f:
+        f.write(struct.pack("<BQI", HOST_IN, stamp, 100) + b"{")
+    assert len(list(read_capture(path))) == 1
+
+
+def test_only_the_newest_files_are_kept(tmp_path):
+    writer = CaptureWriter(str(tmp_path), max_bytes=100, keep_files=2, compress=False)
+    for n in range(8):
+        writer.record(HOST_IN, b'{"n":%d,"pad":"%s"}\n' % (n, b"x" * 80))
+    writer.close()
+    files = capture_files(tmp_path)
+    assert [name[-7:] for name in files] == ["006.cap", "007.cap"]
+    assert [f[:6] for path in files for _, _, f in read_capture(path)] == [b'{"n":6', b'{"n":7']
@@ -0,0 +1,32 @@
+import asyncio
+import json
+
+from helpers import start_mock
+from unia_bridge.daemon import try_attach
+
+
+async def other_server():
+    """An MCP server that is not Unity, on a free port."""
+    async def handle(reader, writer):
+        msg = json.loads(await reader.readline())
+        writer.write(json.dumps({"jsonrpc": "2.0", "id": msg["id"],
+                                 "result": {"serverInfo": {"name": "SomethingElse"}}}).encode() + b"\n")
+        await reader.read()
+        writer.close()
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_attaches_only_to_unity():
+    async def run():
+        server, mock, port = await start_mock()
+        other, other_port = await other_server()
+        try:
+            conn = await try_attach("127.0.0.1", port)
+            assert conn is not None
+            conn[1].close()
+            assert await try_attach("127.0.0.1", other_port) is None
+        finally:
+            server.close()
+            other.close()
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import json
+import time
+
+from unia_bridge.deadlines import RequestDeadlines, parse_timeouts
+from unia_bridge.metrics import RequestTracker
+
+
+class Sent(list):
+    """Stands in for the host->Unity queue."""
+
+    def put_nowait(self, frame):
+        self.append(frame)
+
+
+def deadlines(default_sec=60.0, per_key="") -> RequestDeadlines:
+    return RequestDeadlines(RequestTracker(), Sent(), default_sec, parse_timeouts(per_key))
+
+
+def started(dl: RequestDeadlines, request_id, key: str, ago: float):
+    dl.tracker.inflight[request_id] = (time.monotonic() - ago, key)
+
+
+def test_parse_timeouts():
+    assert parse_timeouts("tools/call:ai-unia-speak=30, tools/list=5,bad=x,,neg=-1") == {
+        "tools/call:ai-unia-speak": 30.0, "tools/list": 5.0, "neg": 0.0}
+
+
+def test_timeout_is_looked_up_by_tool_then_method_then_default():
+    dl = deadlines(60, "tools/call:ai-unia-speak=30,tools/call=10,resources/read=0")
+    assert dl.timeout_for("tools/call:ai-unia-speak") == 30
+    assert dl.timeout_for("tools/call:ai-unia-echo") == 10
+    assert dl.timeout_for("tools/list") == 60
+    assert dl.timeout_for("resources/read") == 0
+
+
+def test_expired_lists_overdue_requests_in_send_order():
+    dl = deadlines(5, "tools/call:ai-unia-speak=30,resources/read=0")
+    started(dl, 1, "tools/list", ago=9)
+    started(dl, 2, "tools/call:ai-unia-speak", ago=9)   # within its own 30s
+    started(dl, "b", "tools/call:ai-unia-echo", ago=6)
+    started(dl, 3, "resources/read", ago=3600)          # no deadline at all
+    started(dl, "a", "tools/call:ai-unia-speak", ago=31)
+    assert dl.expired() == [(1, "tools/list", 5), ("b", "tools/call:ai-unia-echo", 5),
+                            ("a", "tools/call:ai-unia-speak", 30)]
+    assert 0.01 <= dl.next_check() <= 0.5
+
+
+def test_expire_cancels_in_unity_and_swallows_the_late_response():
+    dl = deadlines(5)
+    started(dl, 7, "tools/list", ago=9)
+    started(dl, 8, "tools/list", ago=1)
+    for request_id, key, timeout in dl.expired():
+        dl.expire(request_id, key, timeout)
+
+    assert list(dl.tracker.inflight) == [8] and dl.timeouts == 1
+    assert [json.loads(f) for f in dl.queue] == [{
+        "jsonrpc": "2.0", "method": "notifications/cancelled",
+        "params": {"requestId": 7, "reason": "timed out after 5s"}}]
+
+    late = dl.tracker.on_response(b'{"jsonrpc":"2.0","id":7,"result":{}}\n')
+    assert dl.on_response(late) and dl.late == 1
+    assert not dl.on_response(late)   # swallowed once only
+    assert "1 timed out" in dl.summary_lines()[0]
+
+
+def test_host_cancel_abandons_without_a_second_cancel():
+    dl = deadlines()
+    started(dl, "x", "tools/list", ago=0)
+    dl.on_host_cancel(b'{"jsonrpc":"2.0","method":"notifications/cancelled","params":{"requestId":"x"}}')
+    dl.on_host_cancel(b'not json')
+    assert not dl.tracker.inflight and dl.cancelled == 1
+    assert not dl.queue   # the host's own cancel is what goes to Unity
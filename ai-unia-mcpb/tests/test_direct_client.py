@@ -0,0 +1,25 @@
+import asyncio
+
+from helpers import start_mock
+from test_mcp_client_direct_connect_to_tcp import UnityMcpClient
+
+
+def test_calls_fail_once_the_reader_is_gone():
+    async def run():
+        server, mock, port = await start_mock(speak_base_ms=0, speak_ms_per_char=100)
+        client = UnityMcpClient(port=port, timeout=30, verbose=False)
+        await client.connect()
+        try:
+            speak = asyncio.create_task(client.call_tool("ai-unia-speak", {"text": "a" * 50}))
+            await asyncio.sleep(0.1)
+            client.reader.feed_eof()   # as if Unity had closed the connection
+            for call in (speak, client.ping()):
+                try:
+                    await asyncio.wait_for(call, 1)
+                except ConnectionError:
+                    continue
+                raise AssertionError("the call did not fail")
+        finally:
+            await client.close()
+            server.close()
+    asyncio.run(run())
@@ -0,0 +1,25 @@
+import asyncio
+import json
+
+from unia_bridge.flow import REJECT, FrameQueue, busy_frame
+
+
+def reply(request_id) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": {}}).encode() + b"\n"
+
+
+def test_local_replies_wait_at_the_high_mark():
+    async def run():
+        out = FrameQueue("unity->host", high=2, low=1, max_bytes=1 << 20, policy=REJECT)
+        assert await out.put(reply(1)) and await out.put(busy_frame(2))
+        waiting = asyncio.create_task(out.put(reply(3)))   # a cached or busy reply, say
+        room = asyncio.create_task(out.wait_room())
+        await asyncio.sleep(0.05)
+        assert len(out) == 2 and not waiting.done() and not room.done()
+        assert out.stats()["blocked"] == 1
+
+        assert len(await out.get_batch()) == 2
+        assert await waiting
+        await room
+        assert [json.loads(f)["id"] for f in await out.get_batch()] == [3]
+    asyncio.run(run())
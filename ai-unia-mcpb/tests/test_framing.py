@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from helpers import request
+from unia_bridge import framing
+from unia_bridge.framing import INVALID_REQUEST, PARSE_ERROR, FrameValidator
+
+
+@pytest.fixture(params=sorted(framing.BACKENDS))
+def backend(request):
+    """Every test runs with each JSON backend installed here (orjson is optional)."""
+    previous = framing.JSON_BACKEND
+    framing.use_backend(request.param)
+    yield request.param
+    framing.use_backend(previous)
+
+
+def reply(request_id, **body) -> bytes:
+    return json.dumps(dict({"jsonrpc": "2.0", "id": request_id}, **body)).encode() + b"\n"
+
+
+def test_broken_lines_get_a_parse_error(backend):
+    validator = FrameValidator()
+    frames, replies = validator.on_line(b"not json\n")
+    assert frames == []
+    assert json.loads(replies[0]) == {"jsonrpc": "2.0", "id": None,
+                                      "error": {"code": PARSE_ERROR, "message": "Parse error"}}
+    frames, replies = validator.on_line(b'{"jsonrpc": "1.0", "id": 4, "method": "ping"}\n')
+    assert frames == [] and json.loads(replies[0])["error"]["code"] == INVALID_REQUEST
+    assert json.loads(replies[0])["id"] == 4
+
+    line = request(5, "ping")
+    assert validator.on_line(line) == ([line], [])   # well-formed: the original bytes
+
+
+def test_message_over_several_lines_is_joined(backend):
+    validator = FrameValidator()
+    pretty = json.dumps(json.loads(request(1, "tools/list")), indent=2).encode() + b"\n"
+    lines = pretty.splitlines(keepends=True)
+    for line in lines[:-1]:
+        assert validator.on_line(line) == ([], [])
+    [frame], replies = validator.on_line(lines[-1])
+    assert replies == [] and frame.count(b"\n") == 1
+    assert json.loads(frame)["method"] == "tools/list"
+
+    # a raw newline inside a string, then EOF in the middle of a message
+    assert validator.on_line(b'{"jsonrpc": "2.0", "method": "note", "params": {"t": "a\n') == ([], [])
+    [frame], _ = validator.on_line(b'b"}}\n')
+    assert json.loads(frame)["params"]["t"] == "a\nb"
+    validator.on_line(b'{"jsonrpc": "2.0",\n')
+    [error] = validator.flush()
+    assert json.loads(error)["error"]["code"] == PARSE_ERROR
+
+
+def test_batch_is_split_and_answered_as_one_array(backend):
+    validator = FrameValidator()
+    batch = [json.loads(request(1, "tools/list")), json.loads(request(2, "tools/call")),
+             {"jsonrpc": "2.0", "method": "notifications/initialized"}, {"id": 3}]
+    frames, replies = validator.on_line(json.dumps(batch).encode() + b"\n")
+    assert replies == [] and [json.loads(f).get("id") for f in frames] == [1, 2, None]
+
+    # 1 answered by the bridge (catalog cache), 2 by Unity, a notification in between
+    note = b'{"jsonrpc": "2.0", "method": "notifications/message", "params": {}}\n'
+    assert validator.collect([reply(1, result={"tools": []}), note]) == [note]
+    [array] = validator.collect([reply(2, result={"content": []})])
+    answers = {item["id"]: item for item in json.loads(array)}
+    assert set(answers) == {1, 2, 3}
+    assert answers[3]["error"]["code"] == INVALID_REQUEST
+    assert validator.batches == 1 and validator.invalid == 1
+
+
+def test_orjson_falls_back_for_what_it_cannot_encode():
+    if "orjson" not in framing.BACKENDS:
+        pytest.skip("orjson is not installed")
+    huge = 2 ** 70
+    assert json.loads(framing._orjson_dumps_line({"id": huge})) == {"id": huge}
+    assert framing._orjson_dumps_line({"a": "é"}) == framing._json_dumps_line({"a": "é"})
@@ -0,0 +1,127 @@
+import json
+import os
+
+from helpers import request
+from unia_bridge.handshake import BRIDGE_INIT_ID, CatalogCache, InitializeCache
+from unia_bridge.metrics import peek_frame
+
+RESULT = {"protocolVersion": "2025-03-26", "capabilities": {"tools": {}},
+          "serverInfo": {"name": "UnityMcpServer", "version": "0.1.0"}}
+
+
+def reply(request_id, **body) -> bytes:
+    return json.dumps(dict({"jsonrpc": "2.0", "id": request_id}, **body)).encode() + b"\n"
+
+
+def on_response(cache, frame) -> bool:
+    return cache.on_response(peek_frame(frame), frame)
+
+
+def cached(tmp_path) -> InitializeCache:
+    path = str(tmp_path / "initialize.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"exe_mtime": None, "result": RESULT}, f)
+    return InitializeCache(path)
+
+
+def test_error_to_the_bridge_initialize_is_swallowed(tmp_path):
+    cache = cached(tmp_path)
+    frame, local = cache.on_request(request(1, "initialize", {"protocolVersion": "2025-03-26"}))
+    assert json.loads(local)["result"] == RESULT
+    assert json.loads(frame)["id"] == BRIDGE_INIT_ID
+
+    assert on_response(cache, reply(BRIDGE_INIT_ID, error={"code": -32603, "message": "boom"}))
+    assert not on_response(cache, reply(1, result={}))   # the host's own ids pass
+    assert cache.result == RESULT
+
+
+def test_host_initialize_reply_reaches_the_host(tmp_path):
+    cache = InitializeCache(str(tmp_path / "initialize.json"))
+    frame, local = cache.on_request(request(1, "initialize", {"protocolVersion": "2025-03-26"}))
+    assert local is None and json.loads(frame)["id"] == 1
+
+    assert not on_response(cache, reply(1, error={"code": -32602, "message": "bad version"}))
+    assert not cache.is_pending(1)
+    frame, _ = cache.on_request(request(2, "initialize", {"protocolVersion": "2025-03-26"}))
+    assert not on_response(cache, reply(2, result=RESULT))
+    assert cache.result == RESULT
+
+
+def test_bridge_initialize_is_never_the_hosts_after_reconnects(tmp_path):
+    cache = InitializeCache(str(tmp_path / "initialize.json"))
+    cache.on_request(request(1, "initialize", {"protocolVersion": "2025-03-26"}))
+    cache.on_request(b'{"jsonrpc": "2.0", "method": "notifications/initialized"}\n')
+    assert cache.owns(1)
+    assert not on_response(cache, reply(1, result=RESULT))
+    assert not cache.owns(1)
+
+    for _ in range(2):   # reconnect, lost again before Unity answered, reconnect
+        frames = cache.replay_frames()
+        assert json.loads(frames[0])["id"] == BRIDGE_INIT_ID
+        assert cache.owns(BRIDGE_INIT_ID) and not cache.owns(1)
+    assert on_response(cache, reply(BRIDGE_INIT_ID, result=RESULT))
+    assert cache.owns(BRIDGE_INIT_ID)   # a late duplicate is still not the host's
+
+
+TOOLS = {"tools": [{"name": "ai-unia-speak", "inputSchema": {"type": "object"}}]}
+PROMPTS = {"prompts": [{"name": "greet"}]}
+
+
+def fill(catalog: CatalogCache, request_id, method, result) -> bytes | None:
+    """One host request through the cache; a miss is answered as Unity would."""
+    local = catalog.on_request(request(request_id, method))
+    if local is None:
+        catalog.on_response(request_id, None, reply(request_id, result=result))
+    return local
+
+
+def catalog_for(tmp_path, exe, version="0.1.0") -> CatalogCache:
+    handshake = cached(tmp_path)
+    handshake.result = dict(RESULT, serverInfo={"name": "UnityMcpServer", "version": version})
+    return CatalogCache(str(tmp_path / "catalog.json"), str(exe), handshake)
+
+
+def test_catalog_is_served_from_disk_until_the_exe_changes(tmp_path):
+    exe = tmp_path / "avatar.exe"
+    exe.write_bytes(b"build 1")
+    catalog = catalog_for(tmp_path, exe)
+    assert fill(catalog, 1, "tools/list", TOOLS) is None
+    assert json.loads(fill(catalog, 2, "tools/list", TOOLS)) == {"jsonrpc": "2.0", "id": 2, "result": TOOLS}
+
+    catalog = catalog_for(tmp_path, exe)   # next bridge run, same build
+    assert fill(catalog, 3, "tools/list", TOOLS) is not None and catalog.hits == 1
+
+    mtime = os.path.getmtime(exe)
+    os.utime(exe, (mtime + 10, mtime + 10))   # Unity rebuilt
+    catalog = catalog_for(tmp_path, exe)
+    assert not catalog.entries and fill(catalog, 4, "tools/list", TOOLS) is None
+
+
+def test_catalog_is_dropped_when_the_server_version_changes(tmp_path):
+    exe = tmp_path / "avatar.exe"
+    exe.write_bytes(b"build 1")
+    catalog = catalog_for(tmp_path, exe)
+    fill(catalog, 1, "tools/list", TOOLS)
+    assert fill(catalog, 2, "tools/list", TOOLS) is not None
+
+    catalog.handshake.result = dict(RESULT, serverInfo={"name": "UnityMcpServer", "version": "0.2.0"})
+    assert fill(catalog, 3, "tools/list", TOOLS) is None        # refetched from Unity
+    assert fill(catalog, 4, "tools/list", TOOLS) is not None    # and cached for 0.2.0
+    assert catalog_for(tmp_path, exe, "0.1.0").on_request(request(5, "tools/list")) is None
+
+
+def test_list_changed_drops_only_its_methods(tmp_path):
+    changed = b'{"jsonrpc":"2.0","method":"notifications/tools/list_changed"}\n'
+    catalog = catalog_for(tmp_path, tmp_path / "missing.exe")
+    fill(catalog, 1, "tools/list", TOOLS)
+    fill(catalog, 2, "prompts/list", PROMPTS)
+
+    catalog.on_response(None, "notifications/tools/list_changed", changed)
+    assert fill(catalog, 3, "prompts/list", PROMPTS) is not None
+    assert catalog.on_request(request(4, "tools/list")) is None
+
+    # the answer to 4 may predate a second change: it is not cached
+    catalog.on_response(None, "notifications/tools/list_changed", changed)
+    catalog.on_response(4, None, reply(4, result=TOOLS))
+    assert fill(catalog, 5, "tools/list", TOOLS) is None
+    assert fill(catalog, 6, "tools/list", TOOLS) is not None
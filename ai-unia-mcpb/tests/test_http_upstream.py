@@ -0,0 +1,105 @@
+import asyncio
+import json
+import random
+
+from helpers import request, start_mock, until
+from unia_bridge.http_upstream import READ_LIMIT, HttpUpstream, iter_body
+
+
+def stream(*pieces: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    for piece in pieces:
+        reader.feed_data(piece)
+    reader.feed_eof()
+    return reader
+
+
+async def body(reader, headers) -> bytes:
+    return b"".join([piece async for piece in iter_body(reader, headers)])
+
+
+def test_iter_body_chunked():
+    async def run():
+        reader = stream(b"5;ext=1\r\nhello\r\n", b"6\r\n world\r\n0\r\nX-Trailer: 1\r\n\r\nNEXT")
+        assert await body(reader, {"transfer-encoding": "chunked"}) == b"hello world"
+        assert await reader.read() == b"NEXT"   # the keep-alive connection is left at the next response
+    asyncio.run(run())
+
+
+def test_iter_body_content_length():
+    async def run():
+        reader = stream(b"0123456789", b"NEXT")
+        assert await body(reader, {"content-length": "10"}) == b"0123456789"
+        assert await reader.read() == b"NEXT"
+    asyncio.run(run())
+
+
+def test_iter_body_until_eof():
+    async def run():
+        assert await body(stream(b"abc", b"def"), {}) == b"abcdef"
+    asyncio.run(run())
+
+
+def test_read_events():
+    async def run():
+        upstream = HttpUpstream("127.0.0.1", 1)
+        events = (b": keep-alive comment\r\n"
+                  b"event: message\r\nid: 1\r\n"
+                  b'data: {"jsonrpc":"2.0","id":1,\r\n'
+                  b'data: "result":{}}\r\n\r\n'
+                  b'data:{"jsonrpc":"2.0","method":"notifications/message"}\n\n')
+        # split mid-line, as the chunks arrive
+        reader = stream(events[:40], events[40:95], events[95:])
+        await upstream._read_events(reader, {})
+        frames = [await upstream.reader.readline() for _ in range(2)]
+        assert json.loads(frames[0]) == {"jsonrpc": "2.0", "id": 1, "result": {}}
+        assert json.loads(frames[1]) == {"jsonrpc": "2.0", "method": "notifications/message"}
+        assert upstream.events == 2
+    asyncio.run(run())
+
+
+def test_frames_reach_unity_in_write_order():
+    async def run():
+        server, mock, port = await start_mock(transport="http")
+        arrived = []
+        http_request = mock.http_request
+
+        async def record(method, headers, body, writer):
+            if method == "POST":
+                await asyncio.sleep(random.random() * 0.005)   # Unity's connection threads
+                arrived.append(json.loads(body).get("params", {}).get("n"))
+            return await http_request(method, headers, body, writer)
+        mock.http_request = record
+
+        upstream = HttpUpstream("127.0.0.1", port, pool_size=8)
+        upstream.writer.write(request(1, "initialize", {"protocolVersion": "2025-03-26"}))
+        for n in range(40):
+            upstream.writer.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/progress",
+                                              "params": {"n": n}}).encode() + b"\n")
+        assert json.loads(await upstream.reader.readline())["id"] == 1
+        await until(lambda: len(arrived) == 41, 5, "the notifications")
+        assert arrived == [None] + list(range(40))
+        upstream.close()
+        await upstream.wait_closed()
+        server.close()
+    asyncio.run(run())
+
+
+def test_server_messages_wait_for_the_bridge():
+    async def run():
+        upstream = HttpUpstream("127.0.0.1", 1)
+        event = b'data: {"jsonrpc":"2.0","method":"notifications/message","params":"%s"}\n\n' % (b"x" * 100_000)
+        source = asyncio.StreamReader()
+        feeding = asyncio.create_task(upstream._read_events(source, {}))
+        for _ in range(40):
+            source.feed_data(event)
+        source.feed_eof()
+
+        await asyncio.sleep(0.2)
+        assert not feeding.done()
+        assert len(upstream.reader._buffer) < 3 * READ_LIMIT   # not all 4 MB
+
+        frames = [await upstream.reader.readline() for _ in range(40)]
+        assert all(json.loads(f)["method"] == "notifications/message" for f in frames)
+        await feeding
+    asyncio.run(run())
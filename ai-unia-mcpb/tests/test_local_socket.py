@@ -0,0 +1,12 @@
+import sys
+
+from unia_bridge.local_socket import PIPE_PREFIX, default_endpoint
+
+
+def test_pipe_name_follows_the_work_dir(monkeypatch):
+    monkeypatch.setattr(sys, "platform", "win32")
+    first = default_endpoint("C:\\work\\a")
+    assert first.startswith(PIPE_PREFIX + "ai-unia-mcp-")
+    assert default_endpoint("C:\\work\\a") == first
+    assert default_endpoint("C:\\work\\b") != first
+    assert default_endpoint("C:\\work\\a", "replica-1") == PIPE_PREFIX + "replica-1"
@@ -0,0 +1,25 @@
+import asyncio
+import json
+import os
+
+from helpers import until
+from unia_bridge import logger
+
+
+def test_error_dump_is_written_off_the_caller(tmp_path):
+    async def run():
+        frame = json.dumps({"jsonrpc": "2.0", "id": 1, "result": {"text": "a" * 10000}}).encode()
+        logger.trace_frame("unity->host", frame, None)
+        assert len(logger._ring[-1][2]) == logger.RING_HEAD_BYTES   # info level: the head only
+
+        logger.set_dump_dir(str(tmp_path))
+        try:
+            logger.error("test failure")
+            await until(lambda: os.listdir(tmp_path), what="the dump")
+        finally:
+            logger.set_dump_dir(None)
+        [name] = os.listdir(tmp_path)
+        await until(lambda: (tmp_path / name).read_text(encoding="utf-8").endswith("\n"), what="the dump closed")
+        last = (tmp_path / name).read_text(encoding="utf-8").splitlines()[-1]
+        assert '{"jsonrpc": "2.0", "id": 1' in last and f"({len(frame)} bytes)" in last
+    asyncio.run(run())
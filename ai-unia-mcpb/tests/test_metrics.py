@@ -0,0 +1,30 @@
+import json
+
+from unia_bridge.metrics import has_id, peek_frame
+
+
+def frame(text: str) -> bytes:
+    return text.encode() + b"\n"
+
+
+def test_ids_keep_their_type():
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":7,"result":{}}')).id == 7
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":-3,"result":{}}')).id == -3
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":1.5,"result":{}}')).id == 1.5
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":"1","result":{}}')).id == "1"
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":null,"error":{}}')).id is None
+    assert not has_id(peek_frame(frame('{"jsonrpc":"2.0","method":"notifications/initialized"}')))
+
+
+def test_method_after_params():
+    msg = {"jsonrpc": "2.0", "params": {"name": "ai-unia-speak", "arguments": {"text": "x" * 500}},
+           "method": "tools/call", "id": 4}
+    info = peek_frame(json.dumps(msg).encode() + b"\n")
+    assert (info.id, info.method, info.tool) == (4, "tools/call", "ai-unia-speak")
+
+
+def test_method_up_front():
+    info = peek_frame(frame('{"jsonrpc":"2.0","id":2,"method":"tools/call",'
+                            '"params":{"name":"echo","arguments":{"message":"method"}}}'))
+    assert (info.id, info.method, info.tool) == (2, "tools/call", "echo")
+    assert peek_frame(frame('{"jsonrpc":"2.0","id":3,"result":{"text":"\\"method\\""}}')).method is None
@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+from helpers import cancel, request, start_mock, tool_call, until
+from unia_bridge.mux import Multiplexer
+
+
+class Client:
+    """A bridge connected to the multiplexer: frames by id, notifications in order."""
+
+    def __init__(self, reader, writer):
+        self.writer = writer
+        self.replies = {}
+        self.notifications = []
+        self.task = asyncio.create_task(self.read(reader))
+
+    async def read(self, reader):
+        while line := await reader.readline():
+            msg = json.loads(line)
+            if "id" in msg:
+                self.replies[msg["id"]] = msg
+            else:
+                self.notifications.append(msg)
+
+    def send(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+async def start_mux(**mock_kwargs):
+    server, mock, port = await start_mock(**mock_kwargs)
+    mux = Multiplexer("127.0.0.1", port)
+    await mux.connect()
+    await mux.serve("127.0.0.1:0")
+    return server, mock, mux
+
+
+async def connect(mux) -> Client:
+    port = mux._server.sockets[0].getsockname()[1]
+    client = Client(*await asyncio.open_connection("127.0.0.1", port))
+    client.send(request(0, "initialize"))
+    await until(lambda: 0 in client.replies, what="initialize")
+    return client
+
+
+def idle(mux) -> bool:
+    return not mux._routes and not mux._progress and all(u.inflight == 0 for u in mux.upstreams)
+
+
+def test_ids_are_rewritten_per_client():
+    async def run():
+        server, mock, mux = await start_mux()
+        a, b = await connect(mux), await connect(mux)
+        try:
+            a.send(tool_call(1, "echo", {"message": "from a"}, meta={"progressToken": "t"}))
+            b.send(tool_call(1, "echo", {"message": "from b"}, meta={"progressToken": "t"}))
+            await until(lambda: 1 in a.replies and 1 in b.replies, what="both replies")
+            assert a.replies[1]["result"]["content"][0]["text"] == "hello from a"
+            assert b.replies[1]["result"]["content"][0]["text"] == "hello from b"
+            assert idle(mux)
+        finally:
+            a.close()
+            b.close()
+            mux.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_cancel_and_disconnect_clean_up():
+    async def run():
+        server, mock, mux = await start_mux(speak_base_ms=0, speak_ms_per_char=100)
+        a, b = await connect(mux), await connect(mux)
+        try:
+            a.send(tool_call(7, "ai-unia-speak", {"text": "a" * 50}, meta={"progressToken": 7}))
+            await until(lambda: mux._routes, what="the call routed")
+            a.send(cancel(7))
+            await until(lambda: idle(mux), what="the cancelled route gone")
+
+            b.send(tool_call(8, "ai-unia-speak", {"text": "b" * 50}, meta={"progressToken": 8}))
+            await until(lambda: mux._routes, what="the call routed")
+            b.close()
+            await until(lambda: idle(mux) and len(mux.clients) == 1, what="the client dropped")
+
+            a.send(tool_call(9, "echo", {"message": "still here"}))
+            await until(lambda: 9 in a.replies, what="the next reply")
+            assert 7 not in a.replies
+        finally:
+            a.close()
+            mux.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_notifications_fan_out():
+    async def run():
+        server, mock, mux = await start_mux()
+        a = await connect(mux)
+        message = json.dumps({"jsonrpc": "2.0", "method": "notifications/message",
+                              "params": {"level": "info", "data": "same text"}}).encode() + b"\n"
+        changed = json.dumps({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}).encode() + b"\n"
+        try:
+            for upstream in mux.upstreams:   # as if every session had sent both
+                mux._on_upstream_frame(upstream, message)
+                mux._on_upstream_frame(upstream, changed)
+            await until(lambda: len(a.notifications) == 3, what="the notifications")
+            methods = [n["method"] for n in a.notifications]
+            assert methods.count("notifications/message") == 2   # repeats are not dropped
+            assert methods.count("notifications/tools/list_changed") == 1
+        finally:
+            a.close()
+            mux.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_same_progress_token_from_two_clients():
+    async def run():
+        server, mock, mux = await start_mux(speak_base_ms=0, speak_ms_per_char=20)
+        a, b = await connect(mux), await connect(mux)
+        try:
+            a.send(tool_call(1, "ai-unia-speak", {"text": "a" * 20}, meta={"progressToken": 1}))
+            b.send(tool_call(1, "ai-unia-speak", {"text": "b" * 50}, meta={"progressToken": 1}))
+            await until(lambda: len(mux._routes) == 2, what="both calls routed")
+            for client, _, upstream, token in list(mux._routes.values()):
+                progress = {"jsonrpc": "2.0", "method": "notifications/progress",
+                            "params": {"progressToken": token, "progress": 1,
+                                       "message": f"for #{client.id}"}}
+                mux._on_upstream_frame(upstream, json.dumps(progress).encode() + b"\n")
+            await until(lambda: a.notifications and b.notifications, what="the progress")
+            [note_a], [note_b] = a.notifications, b.notifications
+            assert note_a["params"]["progressToken"] == note_b["params"]["progressToken"] == 1
+            first, second = sorted(mux.clients, key=lambda c: c.id)   # a connected first
+            assert note_a["params"]["message"] == f"for #{first.id}"
+            assert note_b["params"]["message"] == f"for #{second.id}"
+
+            await until(lambda: 1 in a.replies and 1 in b.replies, what="both replies")
+            assert idle(mux)
+        finally:
+            a.close()
+            b.close()
+            mux.close()
+            server.close()
+    asyncio.run(run())
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+from contextlib import asynccontextmanager
+
+from helpers import request, tool_call, until
+from unia_bridge.pool import READ_LIMIT, Avatar, UnityPool
+from unia_bridge.process import spawn
+
+MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    "..", "..", "unity-project", "test_py", "mock_unity_server.py")
+
+
+@asynccontextmanager
+async def mock_process(exe, args):
+    """unity_process_context, quiet."""
+    process = await spawn([exe] + args, stdin=asyncio.subprocess.DEVNULL,
+                          stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    try:
+        yield process
+    finally:
+        if process.returncode is None:
+            await process.stop(5)
+
+
+@asynccontextmanager
+async def slow_stopping_process(exe, args):
+    """mock_process that takes a while to stop, like Unity does."""
+    async with mock_process(exe, args) as process:
+        try:
+            yield process
+        finally:
+            await asyncio.sleep(0.5)
+
+
+class Host:
+    """The bridge's side of the pool connection: replies by id."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.replies = {}
+        self.task = asyncio.create_task(self.read(reader))
+
+    async def read(self, reader):
+        while line := await reader.readline():
+            msg = json.loads(line)
+            if "id" in msg:
+                self.replies[msg["id"]] = msg
+
+    async def call(self, frame, request_id, timeout=10):
+        self.writer.write(frame)
+        await until(lambda: request_id in self.replies, timeout, f"reply {request_id}")
+        return self.replies[request_id]
+
+
+def avatar(name):
+    return Avatar(name, sys.executable, [MOCK, "--speak-ms-per-char", "100"])
+
+
+def ready(pool, name):
+    return [r for r in pool.replicas if r.avatar.name == name and r.state == "ready"]
+
+
+async def start_pool(tmp_path, process_context=mock_process):
+    pool = UnityPool([avatar("mikuru"), avatar("asuka")], process_context, str(tmp_path),
+                     base_port=18100, default_avatar="mikuru", local_endpoints=False)
+    host = Host(*await pool.connect())
+    await until(lambda: ready(pool, "mikuru") and ready(pool, "asuka"), 20, "both avatars")
+    reply = await host.call(request(0, "initialize", {"protocolVersion": "2025-03-26"}), 0)
+    assert "result" in reply
+    return pool, host
+
+
+def test_calls_go_to_their_avatar(tmp_path):
+    async def run():
+        pool, host = await start_pool(tmp_path)
+        try:
+            await host.call(tool_call(1, "echo", {"message": "a"}, meta={"avatar": "asuka"}), 1)
+            await host.call(tool_call(2, "echo", {"message": "m"}), 2)
+            await host.call(tool_call(3, "echo", {"message": "m"}, meta={"avatar": "mikuru"}), 3)
+            [asuka], [mikuru] = ready(pool, "asuka"), ready(pool, "mikuru")
+            assert (asuka.requests, mikuru.requests) == (1, 3)   # mikuru also had the initialize
+            unknown = await host.call(tool_call(4, "echo", {"message": "x"}, meta={"avatar": "nobody"}), 4)
+            assert unknown["error"]["code"] == -32602
+        finally:
+            await pool.close()
+    asyncio.run(run())
+
+
+def test_killed_replica_is_restarted(tmp_path):
+    async def run():
+        pool, host = await start_pool(tmp_path)
+        try:
+            [victim] = ready(pool, "asuka")
+            pid = victim.process.pid
+            host.writer.write(tool_call(1, "ai-unia-speak", {"text": "a" * 50}, meta={"avatar": "asuka"}))
+            await until(lambda: victim.outstanding, what="the call at the replica")
+            os.kill(pid, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+            await until(lambda: 1 in host.replies, what="the lost call's error")
+            assert host.replies[1]["error"]["code"] == -32000
+            await until(lambda: victim.restarts == 1 and victim.state == "ready", 20, "the restart")
+            assert victim.process.pid != pid
+            reply = await host.call(tool_call(2, "echo", {"message": "again"}, meta={"avatar": "asuka"}), 2)
+            assert reply["result"]["content"][0]["text"] == "hello again"
+        finally:
+            await pool.close()
+    asyncio.run(run())
+
+
+def test_calls_during_a_replica_restart_wait_for_it(tmp_path):
+    async def run():
+        pool, host = await start_pool(tmp_path, slow_stopping_process)
+        try:
+            [victim] = ready(pool, "asuka")
+            victim.writer.close()   # lost: the process is stopped, slowly
+            await until(lambda: victim.writer is None, what="the replica stopping")
+            for request_id in range(1, 11):
+                host.writer.write(tool_call(request_id, "echo", {"message": "x"}, meta={"avatar": "asuka"}))
+                await asyncio.sleep(0.05)
+            await until(lambda: all(i in host.replies for i in range(1, 11)), 20, "every reply")
+            assert all("result" in host.replies[i] for i in range(1, 11))
+            assert victim.restarts == 1
+        finally:
+            await pool.close()
+    asyncio.run(run())
+
+
+def test_replicas_are_not_read_while_the_host_is_behind(tmp_path):
+    async def run():
+        pool, host = await start_pool(tmp_path)
+        try:
+            host.task.cancel()   # the bridge stops taking Unity's output
+            big = "a" * (200 * 1024)
+            for request_id in range(1, 21):
+                host.writer.write(tool_call(request_id, "echo", {"message": big}))
+            await until(lambda: not pool._flowing.is_set(), what="reading paused")
+            await asyncio.sleep(0.3)
+            # past the limit by at most the batch in hand, far from the 4 MB sent
+            assert len(pool.reader._buffer) < 5 * READ_LIMIT
+
+            host.task = asyncio.create_task(host.read(host.reader))
+            await until(lambda: all(i in host.replies for i in range(1, 21)), 20, "every reply")
+        finally:
+            await pool.close()
+    asyncio.run(run())
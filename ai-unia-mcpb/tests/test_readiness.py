@@ -0,0 +1,41 @@
+import asyncio
+import socket
+
+import pytest
+
+from unia_bridge.readiness import LOG_MARKER, LogMarkerWatcher, UnityStartupError, connect_when_ready
+
+
+def test_marker_from_the_previous_run_is_ignored(tmp_path):
+    log = tmp_path / "ai-unity-avatar.log"
+    log.write_bytes(b"old run\n" + LOG_MARKER + b" on 8080\n")
+    watcher = LogMarkerWatcher(str(log))   # at launch
+    assert not watcher.poll()
+    with open(log, "ab") as f:
+        f.write(b"still loading\n")
+    assert not watcher.poll()
+
+    log.write_bytes(b"new run\n")           # Unity truncates the log on launch
+    assert not watcher.poll()
+    with open(log, "ab") as f:
+        f.write(LOG_MARKER + b" on 8080\n")
+    assert watcher.poll()
+
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_marker_written_before_the_first_probe_is_seen(tmp_path):
+    log = tmp_path / "ai-unity-avatar.log"
+    log.write_bytes(b"old run\n")
+    watcher = LogMarkerWatcher(str(log))   # before the spawn
+    with open(log, "ab") as f:             # a quick Unity logs it before we start probing
+        f.write(LOG_MARKER + b" on 8080\n")
+    late = LogMarkerWatcher(str(log))      # what a watcher made after the spawn would see
+
+    with pytest.raises(UnityStartupError):
+        asyncio.run(connect_when_ready("127.0.0.1", closed_port(), watcher=watcher, timeout=0.2))
+    assert watcher.seen and not late.poll()
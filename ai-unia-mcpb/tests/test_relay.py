@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+from unia_bridge.relay import FrameReader
+
+
+def frame(msg) -> bytes:
+    return json.dumps(msg).encode() + b"\n"
+
+
+async def read_all(data: bytes, max_frame: int) -> list[dict]:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    frames_in = FrameReader(reader, max_frame=max_frame, chunk_size=100)
+    frames = []
+    while batch := await frames_in.read_frames():
+        frames += batch
+    return [json.loads(f) for f in frames]
+
+
+def test_oversized_response_becomes_an_error():
+    big = frame({"jsonrpc": "2.0", "id": 3, "result": {"content": [{"type": "text", "text": "a" * 5000}]}})
+    small = frame({"jsonrpc": "2.0", "id": 4, "result": {}})
+    msgs = asyncio.run(read_all(big + small, max_frame=1000))
+    assert [m["id"] for m in msgs] == [3, 4]
+    assert "frame limit" in msgs[0]["error"]["message"]
+    assert msgs[1]["result"] == {}
+
+
+def test_oversized_notification_is_dropped():
+    big = frame({"jsonrpc": "2.0", "method": "notifications/message", "params": {"data": "a" * 5000}})
+    small = frame({"jsonrpc": "2.0", "id": "x", "result": {}})
+    msgs = asyncio.run(read_all(big + small, max_frame=1000))
+    assert msgs == [{"jsonrpc": "2.0", "id": "x", "result": {}}]
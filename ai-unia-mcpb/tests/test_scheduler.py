@@ -0,0 +1,174 @@
+import asyncio
+import json
+
+from helpers import cancel, start_mock, tool_call, until
+from unia_bridge.deadlines import RequestDeadlines
+from unia_bridge.metrics import RequestTracker
+from unia_bridge.relay import FrameReader
+from unia_bridge.scheduler import ActionScheduler, Lane
+
+
+class Pipeline:
+    """
+    The scheduler wired like ai_unia_mcp_server.py: released actions and
+    cancels go to the mock, responses pass the deadlines and reach the
+    "host" (self.delivered) through on_delivered().
+    """
+
+    def __init__(self, reader, writer, hold_sec_per_char=0.0, timeout_sec=0.0):
+        self.writer = writer
+        self.tracker = RequestTracker()
+        self.deadlines = RequestDeadlines(self.tracker, self, timeout_sec, {})
+        self.delivered = {}
+        self.scheduler = ActionScheduler(
+            [Lane("speech", ["ai-unia-speak"], hold_sec_per_char=hold_sec_per_char),
+             Lane("expression", ["ai-unia-smile"], priority=1, coalesce=True)],
+            self.forward, self)
+        self.frames = FrameReader(reader)
+        self.task = asyncio.create_task(self.read())
+
+    # out_queue (answers made here) and the deadlines' queue (cancels for Unity)
+    def put_nowait(self, frame):
+        if b'"notifications/cancelled"' in frame:
+            self.writer.write(frame)
+        else:
+            self.deliver(frame)
+
+    async def forward(self, frame):
+        self.tracker.on_request(frame)
+        self.writer.write(frame)
+
+    def host_sends(self, frame):
+        if b'"notifications/cancelled"' in frame:
+            self.deadlines.on_host_cancel(frame)
+        if not self.scheduler.intercept(frame):
+            self.writer.write(frame)
+
+    def deliver(self, frame):
+        self.scheduler.on_delivered([frame])
+        msg = json.loads(frame)
+        self.delivered[msg["id"]] = msg
+
+    async def read(self):
+        while frames := await self.frames.read_frames():
+            for frame in frames:
+                if not self.deadlines.on_response(self.tracker.on_response(frame)):
+                    self.deliver(frame)
+
+    async def close(self):
+        self.scheduler.close()
+        self.task.cancel()
+        self.writer.close()
+
+
+async def pipeline(**kwargs):
+    server, mock, port = await start_mock(speak_base_ms=0, speak_ms_per_char=100)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    return server, mock, Pipeline(reader, writer, **kwargs)
+
+
+def test_cancel_after_send_frees_the_lane():
+    async def run():
+        server, mock, p = await pipeline()
+        try:
+            p.host_sends(tool_call(1, "ai-unia-speak", {"text": "s1" * 20}))   # ~4s in the mock
+            await until(lambda: mock.calls.get("ai-unia-speak") == 1, what="s1 at Unity")
+            p.host_sends(cancel(1))
+            p.host_sends(tool_call(2, "ai-unia-speak", {"text": "s2"}))
+            await until(lambda: 2 in p.delivered, what="s2 answered")
+            assert p.delivered[2]["result"]["content"][0]["text"] == 'Avatar speaking: "s2"'
+            assert 1 not in p.delivered   # cancelled: no response for the host
+            assert mock.calls["ai-unia-speak"] == 2
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_timeout_frees_the_lane():
+    async def run():
+        server, mock, p = await pipeline(timeout_sec=0.2)
+        try:
+            p.host_sends(tool_call(1, "ai-unia-speak", {"text": "s1" * 20}))
+            p.host_sends(tool_call(2, "ai-unia-speak", {"text": "s2"}))
+            await until(lambda: p.deadlines.expired(), what="s1 past its deadline")
+            for req_id, key, timeout in p.deadlines.expired():   # what expire_requests() does
+                p.deadlines.expire(req_id, key, timeout)
+                p.scheduler.release(req_id)
+            await until(lambda: 2 in p.delivered, what="s2 answered")
+            assert "result" in p.delivered[2]
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_hold_after_the_response():
+    async def run():
+        server, mock, p = await pipeline(hold_sec_per_char=0.1)
+        try:
+            p.host_sends(tool_call(1, "ai-unia-speak", {"text": "a"}))   # held 0.1s after its answer
+            p.host_sends(tool_call(2, "ai-unia-speak", {"text": "b"}))
+            await until(lambda: 1 in p.delivered, what="s1 answered")
+            answered = asyncio.get_running_loop().time()
+            await until(lambda: 2 in p.delivered, what="s2 answered")
+            assert asyncio.get_running_loop().time() - answered >= 0.09
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_skipped_calls_are_errors():
+    async def run():
+        server, mock, p = await pipeline()
+        try:
+            p.host_sends(tool_call(1, "ai-unia-speak", {"text": "s1" * 5}))
+            p.host_sends(tool_call(2, "ai-unia-smile", {}))
+            p.host_sends(tool_call(3, "ai-unia-speak", {"text": "queued"}))
+            p.host_sends(tool_call(4, "ai-unia-speak", {"text": "now", "interrupt": True}))
+            await until(lambda: 3 in p.delivered, what="the skipped call")
+            skipped = p.delivered[3]["result"]
+            assert skipped["isError"] is True
+            assert "did not run" in skipped["content"][0]["text"]
+            await until(lambda: 4 in p.delivered, what="the interrupting call")
+            assert p.delivered[4]["result"]["isError"] is False
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_coalesced_expression_is_not_an_error():
+    async def run():
+        server, mock, p = await pipeline()
+        p.scheduler.lanes[1].hold_sec = 5   # the expression lane stays busy after the first smile
+        try:
+            for request_id in (1, 2, 3):
+                p.host_sends(tool_call(request_id, "ai-unia-smile", {}))
+            await until(lambda: 2 in p.delivered, what="the merged smile")
+            assert p.delivered[2]["result"] == {"content": [
+                {"type": "text", "text": "Merged into a later ai-unia-smile call (id=3)"}], "isError": False}
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_avatars_have_their_own_lanes():
+    async def run():
+        server, mock, p = await pipeline()
+        p.scheduler = ActionScheduler(
+            [Lane("speech", ["ai-unia-speak"])], p.forward, p, by_avatar=True, default_avatar="mikuru")
+        try:
+            p.host_sends(tool_call(1, "ai-unia-speak", {"text": "m1" * 10}))   # the default avatar
+            p.host_sends(tool_call(2, "ai-unia-speak", {"text": "a1"}, meta={"avatar": "asuka"}))
+            p.host_sends(tool_call(3, "ai-unia-speak", {"text": "m2"}, meta={"avatar": "mikuru"}))
+            await until(lambda: 2 in p.delivered, what="asuka's call")
+            assert 1 not in p.delivered and 3 not in p.delivered   # asuka did not wait for mikuru
+            await until(lambda: 3 in p.delivered, what="mikuru's second call")
+            assert sorted(lane.name for lane in p.scheduler.lanes) == ["speech@asuka", "speech@mikuru"]
+        finally:
+            await p.close()
+            server.close()
+    asyncio.run(run())
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+from helpers import until
+from unia_bridge.flow import REJECT, FrameQueue
+from unia_bridge.handshake import dumps_line
+from unia_bridge.metrics import peek_frame
+from unia_bridge.speech import CHUNK_MAX_CHARS, SPEAK_TOOL, SpeechChunker, split_sentences
+
+TEXT = "こんにちは。今日はいい天気ですね！散歩に行きましょうか？それとも家で本を読みましょうか。"
+
+
+def test_split_on_japanese_and_english_sentence_ends():
+    assert split_sentences(TEXT) == [
+        "こんにちは。今日はいい天気ですね！", "散歩に行きましょうか？", "それとも家で本を読みましょうか。"]
+    assert split_sentences("Hello there. This is a test! Is it working? Yes.") == [
+        "Hello there.", "This is a test!", "Is it working? Yes."]
+    assert split_sentences("Pi is 3.14 or so. Mr. Smith said that.") == [
+        "Pi is 3.14 or so.", "Mr. Smith said that."]
+
+
+def test_bracket_text_is_dropped_before_splitting():
+    assert split_sentences("はい（笑）。そうです(本当。です)ね。ありがとうございました。") == [
+        "はい。そうですね。", "ありがとうございました。"]
+
+
+def test_short_sentences_are_merged_forward():
+    # "はい。" and "うん。" are under CHUNK_MIN_CHARS: they go with the next sentence,
+    # and a short last sentence goes with the one before it
+    assert split_sentences("はい。うん。それでは始めましょうか。終わり。") == [
+        "はい。うん。それでは始めましょうか。終わり。"]
+    assert split_sentences("短い") == ["短い"]
+
+
+def test_long_sentences_are_split_at_clauses():
+    clause = "これはとても長い文章の一部分で、"
+    sentence = clause * 8 + "おわり。"
+    assert len(sentence) > CHUNK_MAX_CHARS
+    assert split_sentences(sentence) == [clause] * 7 + [clause + "おわり。"]
+    assert split_sentences("短い文、もう一つ。") == ["短い文、もう一つ。"]   # not over the limit
+
+
+def speak_call(request_id, text: str) -> bytes:
+    return dumps_line({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                       "params": {"name": SPEAK_TOOL, "arguments": {"text": text}}})
+
+
+def chunk_result(frame: bytes, is_error=False) -> bytes:
+    msg = json.loads(frame)
+    text = msg["params"]["arguments"]["text"]
+    return dumps_line({"jsonrpc": "2.0", "id": msg["id"],
+                       "result": {"content": [{"type": "text", "text": text}], "isError": is_error}})
+
+
+def queues():
+    to_unity = FrameQueue("host->unity", high=64, low=32, max_bytes=1 << 20, policy=REJECT)
+    to_host = FrameQueue("unity->host", high=64, low=32, max_bytes=1 << 20, policy=REJECT)
+    return to_unity, to_host
+
+
+async def sent(queue: FrameQueue, count: int) -> list[dict]:
+    await until(lambda: len(queue) >= count, 2, f"{count} frame(s) for Unity")
+    return [json.loads(f) for f in await queue.get_batch()]
+
+
+def answer(chunker: SpeechChunker, frame: bytes):
+    assert chunker.on_response(peek_frame(frame), frame)
+
+
+def test_chunks_are_sent_read_ahead_and_merged():
+    async def run():
+        to_unity, to_host = queues()
+        chunker = SpeechChunker(to_unity, to_host, read_ahead=2)
+        assert not chunker.intercept(speak_call(1, "短いテキスト。"))
+        assert chunker.intercept(speak_call(1, TEXT))
+
+        first = await sent(to_unity, 2)
+        assert [m["params"]["arguments"]["index"] for m in first] == [0, 1]
+        assert first[0]["params"]["arguments"]["utterance"] == first[1]["params"]["arguments"]["utterance"]
+        answer(chunker, chunk_result(dumps_line(first[0])))
+        third = await sent(to_unity, 1)
+        assert third[0]["params"]["arguments"]["index"] == 2
+        answer(chunker, chunk_result(dumps_line(third[0]), is_error=True))   # out of order
+        answer(chunker, chunk_result(dumps_line(first[1])))
+
+        [reply] = await sent(to_host, 1)
+        assert reply["id"] == 1
+        assert [c["text"] for c in reply["result"]["content"]] == split_sentences(TEXT)
+        assert reply["result"]["isError"] is True   # one chunk failed
+        assert not chunker.owns(first[0]["id"])
+    asyncio.run(run())
+
+
+def test_a_chunk_error_is_the_reply():
+    async def run():
+        to_unity, to_host = queues()
+        chunker = SpeechChunker(to_unity, to_host, read_ahead=3)
+        assert chunker.intercept(speak_call("s", TEXT))
+        chunks = await sent(to_unity, 3)
+        answer(chunker, chunk_result(dumps_line(chunks[0])))
+        answer(chunker, dumps_line({"jsonrpc": "2.0", "id": chunks[1]["id"],
+                                    "error": {"code": -32602, "message": "Unknown argument: utterance"}}))
+        answer(chunker, chunk_result(dumps_line(chunks[2])))
+        assert await sent(to_host, 1) == [{"jsonrpc": "2.0", "id": "s", "error": {
+            "code": -32602, "message": "Unknown argument: utterance"}}]
+    asyncio.run(run())
+
+
+def test_host_cancel_cancels_the_chunks_in_unity():
+    async def run():
+        to_unity, to_host = queues()
+        chunker = SpeechChunker(to_unity, to_host, read_ahead=2)
+        assert chunker.intercept(speak_call(5, TEXT))
+        chunks = await sent(to_unity, 2)
+        answer(chunker, chunk_result(dumps_line(chunks[0])))
+        third = await sent(to_unity, 1)
+
+        cancel = dumps_line({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                             "params": {"requestId": 5}})
+        assert chunker.intercept(cancel)
+        cancels = await sent(to_unity, 2)
+        assert sorted(m["params"]["requestId"] for m in cancels) == \
+            sorted([chunks[1]["id"], third[0]["id"]])   # the answered chunk is left alone
+        assert {m["method"] for m in cancels} == {"notifications/cancelled"}
+
+        await asyncio.sleep(0.05)
+        assert len(to_host) == 0   # a cancelled request gets no reply
+        assert not chunker.owns(chunks[1]["id"]) and not chunker.intercept(cancel)
+        late = chunk_result(dumps_line(chunks[1]))
+        assert not chunker.on_response(peek_frame(late), late)
+    asyncio.run(run())
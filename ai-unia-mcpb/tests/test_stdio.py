@@ -0,0 +1,42 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from helpers import request
+from unia_bridge.stdio import LineTooLong, PipeStdinReader, ThreadStdinReader
+
+BIG = request(5, "tools/call", {"name": "echo", "arguments": {"message": "a" * 5000}})
+NEXT = request(6, "ping")
+
+
+async def read_all(stdin) -> list:
+    """Lines up to EOF, with each LineTooLong in its place."""
+    lines = []
+    while True:
+        try:
+            line = await stdin.readline()
+        except LineTooLong as e:
+            lines.append(e)
+            continue
+        if not line:
+            return lines
+        lines.append(line)
+
+
+@pytest.mark.parametrize("transport", ["pipe", "thread"])
+def test_oversized_line_is_answered_and_reading_goes_on(transport):
+    async def run():
+        if transport == "pipe":
+            reader = asyncio.StreamReader(limit=1000)
+            reader.feed_data(BIG + NEXT)
+            reader.feed_eof()
+            stdin = PipeStdinReader(reader, limit=1000)
+        else:
+            stdin = ThreadStdinReader(asyncio.get_running_loop(), io.BytesIO(BIG + NEXT), limit=1000)
+        too_long, line = await read_all(stdin)
+        assert too_long.size == len(BIG)
+        assert json.loads(too_long.reply())["id"] == 5
+        assert line == NEXT
+    asyncio.run(run())
@@ -0,0 +1,98 @@
+import asyncio
+
+from helpers import start_mock, tool_call, until
+from unia_bridge.flow import FrameQueue
+from unia_bridge.metrics import RequestTracker
+from unia_bridge.relay import FrameReader
+from unia_bridge.supervisor import UnitySupervisor
+
+
+async def relay(reader, tracker, supervisor, delivered):
+    """pipe_tcp_to_stdout, reduced to what the supervisor needs."""
+    frames_in = FrameReader(reader)
+    while frames := await frames_in.read_frames():
+        for frame in frames:
+            if not supervisor.on_response(tracker.on_response(frame)):
+                if isinstance(delivered, FrameQueue):
+                    await delivered.put(frame)
+                else:
+                    delivered.append(frame)
+
+
+def supervised(ping_misses=2):
+    return UnitySupervisor(lambda: None, sample_sec=60, ping_sec=0.05, ping_timeout=0.3,
+                           ping_misses=ping_misses, rss_limit=0)
+
+
+def test_pings_bypass_the_host_stream():
+    async def run():
+        server, mock, port = await start_mock()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        tracker, supervisor, delivered = RequestTracker(), supervised(), []
+        task_relay = asyncio.create_task(relay(reader, tracker, supervisor, delivered))
+        task_watch = asyncio.create_task(supervisor.watch(writer))
+        try:
+            while supervisor.last_rtt_ms is None:
+                await asyncio.sleep(0.01)
+            assert not delivered              # the answer to the ping is not the host's
+            assert not tracker.inflight       # nor counted as a host request
+            assert not task_watch.done()
+        finally:
+            task_watch.cancel()
+            task_relay.cancel()
+            writer.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_hung_unity_is_diagnosed():
+    async def hung(reader, writer):   # reads, never answers (echo "hang" would block this loop too)
+        while await reader.read(65536):
+            pass
+
+    async def run():
+        server = await asyncio.start_server(hung, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        tracker, supervisor, delivered = RequestTracker(), supervised(), []
+        task_relay = asyncio.create_task(relay(reader, tracker, supervisor, delivered))
+        try:
+            reason = await asyncio.wait_for(supervisor.watch(writer), 5)
+            assert reason.startswith("2 pings in a row unanswered")
+        finally:
+            task_relay.cancel()
+            writer.close()
+            server.close()
+    asyncio.run(run())
+
+
+async def drain_forever(out_queue):
+    while True:
+        await out_queue.get_batch()
+
+
+def test_host_not_reading_is_not_a_hang():
+    async def run():
+        server, mock, port = await start_mock()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        tracker, supervisor = RequestTracker(), supervised()
+        out_queue = FrameQueue("unity->host", high=2, low=1, max_bytes=1 << 20)
+        task_relay = asyncio.create_task(relay(reader, tracker, supervisor, out_queue))
+        task_watch = asyncio.create_task(supervisor.watch(writer, out_queue))
+        try:
+            for request_id in range(1, 6):   # answers the host never takes
+                writer.write(tool_call(request_id, "echo", {"message": "x"}))
+            await until(lambda: out_queue.full, what="the queue full")
+            await asyncio.sleep(1.5)        # 2 misses would take ~0.7 s
+            assert not task_watch.done()
+
+            supervisor.last_rtt_ms = None
+            host = asyncio.create_task(drain_forever(out_queue))   # the host reads again
+            await until(lambda: supervisor.last_rtt_ms is not None, what="a ping answered")
+            assert not task_watch.done()
+            host.cancel()
+        finally:
+            task_watch.cancel()
+            task_relay.cancel()
+            writer.close()
+            server.close()
+    asyncio.run(run())
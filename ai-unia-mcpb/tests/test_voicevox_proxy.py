@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+
+from mock_voicevox_server import start_stub_voicevox
+from unia_bridge.voicevox_proxy import AudioCache, VoicevoxProxy, cache_key, read_body, read_head
+
+QUERY = {"accent_phrases": [], "speedScale": 1.0, "pitchScale": 0.0, "intonationScale": 1.0,
+         "volumeScale": 1.0, "outputSamplingRate": 24000, "kana": "コンニチワ"}
+
+
+async def start_proxy(tmp_path, **stub_kwargs):
+    """Stub engine + proxy on free ports: (engine, stub, proxy, proxy port)."""
+    engine, stub = start_stub_voicevox(port=0, **stub_kwargs)
+    proxy = VoicevoxProxy(f"http://127.0.0.1:{engine.server_address[1]}",
+                          AudioCache(str(tmp_path / "voicevox-cache")))
+    assert await proxy.start("127.0.0.1:0")
+    return engine, stub, proxy, proxy._server.sockets[0].getsockname()[1]
+
+
+async def post(port, target, body=b""):
+    """One POST through the proxy: (status, headers, body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"POST {target} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        (_, status, *_), headers = await read_head(reader)
+        return int(status), headers, await read_body(reader, headers)
+    finally:
+        writer.close()
+
+
+def test_cache_key_covers_what_changes_the_audio():
+    body = json.dumps(QUERY).encode()
+    key = cache_key("/synthesis", {"speaker": "1"}, body)
+    reordered = json.dumps(dict(reversed(list(QUERY.items())))).encode()
+    assert cache_key("/synthesis", {"speaker": "1"}, reordered) == key
+    assert cache_key("/synthesis", {"speaker": "2"}, body) != key
+    assert cache_key("/synthesis", {"speaker": "1"}, json.dumps(dict(QUERY, speedScale=1.2)).encode()) != key
+    assert cache_key("/audio_query", {"text": "a", "speaker": "1"}, b"") \
+        == cache_key("/audio_query", {"speaker": "1", "text": "a"}, b"")
+    assert cache_key("/version", {}, b"") is None
+    assert cache_key("/synthesis", {"speaker": "1"}, b"not json") is None
+
+
+def test_second_request_is_a_hit(tmp_path):
+    async def run():
+        engine, stub, proxy, port = await start_proxy(tmp_path)
+        try:
+            first = await post(port, "/audio_query?text=hello&speaker=1")
+            second = await post(port, "/audio_query?speaker=1&text=hello")
+            assert first[0] == second[0] == 200 and first[2] == second[2]
+            assert (first[1]["x-unia-cache"], second[1]["x-unia-cache"]) == ("MISS", "HIT")
+            assert stub.counts["audio_query"] == 1
+            assert (proxy.hits, proxy.misses) == (1, 1)
+        finally:
+            proxy.close()
+            engine.shutdown()
+    asyncio.run(run())
+
+
+def test_identical_synthesis_shares_one_upstream_call(tmp_path):
+    async def run():
+        engine, stub, proxy, port = await start_proxy(tmp_path, synthesis_ms=300)
+        try:
+            body = json.dumps(QUERY).encode()
+            replies = await asyncio.gather(*(post(port, "/synthesis?speaker=1", body) for _ in range(3)))
+            assert {r[2] for r in replies} == {replies[0][2]} and replies[0][2][:4] == b"RIFF"
+            assert stub.counts["synthesis"] == 1
+            assert (proxy.misses, proxy.coalesced) == (1, 2)
+        finally:
+            proxy.close()
+            engine.shutdown()
+    asyncio.run(run())
+
+
+def test_least_recently_used_is_evicted_at_the_byte_cap(tmp_path):
+    async def run():
+        cache = AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=250)   # disk only
+        for key in ("aa1", "bb2"):
+            await cache.put(key, b"x" * 100)
+        assert await cache.get("aa1") == b"x" * 100   # now the most recent
+        await cache.put("cc3", b"y" * 100)
+        assert await cache.get("bb2") is None
+        assert not os.path.exists(os.path.join(tmp_path, "bb", "bb2"))
+        assert await cache.get("aa1") is not None and await cache.get("cc3") is not None
+
+        reloaded = AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=250)
+        reloaded.load()
+        assert await reloaded.get("cc3") == b"y" * 100
+    asyncio.run(run())
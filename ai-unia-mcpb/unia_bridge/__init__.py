@@ -0,0 +1,4 @@
+"""
+Helper modules for the ai-unia MCP stdio <-> Unity bridge.
+The entry point is ai_unia_mcp_server.py, which wires these together.
+"""
@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import hashlib
+import mmap
+import os
+import time
+from urllib.parse import parse_qsl, quote, unquote
+
+from . import framing
+from .logger import debug, log
+
+# ------------------------------------------------------------------------------
+# Binary side channel: large blobs as files in WORK_DIR/blobs, frames carry links
+# ------------------------------------------------------------------------------
+BLOB_DIR_NAME = "blobs"
+URI_SCHEME = "unia-blob:"
+MARKER = b'"' + URI_SCHEME.encode()     # Frames without it are passed untouched
+SPOOL_MAX_BYTES = 512 * 1024 * 1024
+TTL_SEC = 600                           # Since the file was written or last read
+SWEEP_SEC = 30
+
+
+class BlobError(Exception):
+    pass
+
+
+def blob_uri(name: str, offset: int, length: int, sha256: str, mime_type: str | None = None) -> str:
+    uri = f"{URI_SCHEME}{quote(name)}?offset={offset}&length={length}&sha256={sha256}"
+    return uri + f"&type={quote(mime_type, safe='')}" if mime_type else uri
+
+
+def parse_uri(uri: str):
+    """unia-blob:<file>?offset=..&length=..&sha256=..[&type=..] -> (file, offset, length, sha256, type)"""
+    if not uri.startswith(URI_SCHEME):
+        raise BlobError(f"Not a blob URI: {uri[:80]}")
+    path, _, query = uri[len(URI_SCHEME):].partition("?")
+    params = dict(parse_qsl(query))
+    name = unquote(path)
+    if name in ("", ".", "..") or "/" in name or "\\" in name:
+        raise BlobError(f"Bad blob file name: {path[:80]}")   # a file directly in the spool
+    try:
+        offset, length = int(params.get("offset", 0)), int(params["length"])
+    except (KeyError, ValueError):
+        raise BlobError(f"Blob URI without offset/length: {uri[:80]}") from None
+    if offset < 0 or length < 0:
+        raise BlobError(f"Bad blob range: {offset}+{length}")
+    return name, offset, length, params.get("sha256"), params.get("type")
+
+
+def write_blob(directory: str, data: bytes, mime_type: str, suffix: str = "") -> dict:
+    """
+    Store data as <sha256[:32]><suffix> (tmp file + rename) and return its
+    MCP resource_link content. What Unity's BlobSpool.cs does, for Python
+    producers and tests.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    name = digest[:32] + suffix
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        os.utime(path, None)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return {"type": "resource_link", "uri": blob_uri(name, 0, len(data), digest, mime_type),
+            "name": name, "mimeType": mime_type, "size": len(data)}
+
+
+class BlobSpool:
+    """
+    Resolves blob links written by Unity (-blobDir).
+
+    A tool result may carry a resource_link with a unia-blob: URI instead
+    of base64 content: the file in the spool dir, the byte range and its
+    sha256. Only the link crosses the Unity connection. Just before
+    stdout the blob is read (memory-mapped, hash checked) and the link
+    becomes image / audio / embedded resource content, as if Unity had
+    sent it inline. The host never sees a unia-blob: link, so the bridge
+    needs no resources capability.
+
+    Files unused for ttl_sec are removed, then the least recently used
+    until the spool fits max_bytes. Reading a blob counts as a use.
+    """
+
+    name = "blobs"
+
+    def __init__(self, directory: str, max_bytes: int = SPOOL_MAX_BYTES,
+                 ttl_sec: float = TTL_SEC):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.inlined = 0
+        self.inlined_bytes = 0
+        self.errors = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.spool_bytes = 0
+        self.files = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            log(f"Could not create blob spool {directory}: {e}")
+
+    # --- reading ---
+    def read_base64(self, uri: str) -> tuple[str, str | None, int]:
+        """(base64 data, mime type, length) of the blob a link points to."""
+        name, offset, length, sha256, mime_type = parse_uri(uri)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if offset + length > size:
+                    raise BlobError(f"{name} has {size} bytes, the link wants {offset}+{length}")
+                if length == 0:
+                    data = ""
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                            memoryview(mapped) as view, view[offset:offset + length] as blob:
+                        if sha256 and hashlib.sha256(blob).hexdigest() != sha256:
+                            raise BlobError(f"{name} does not match its sha256 (rewritten?)")
+                        data = base64.b64encode(blob).decode("ascii")
+            os.utime(path, None)   # LRU: last use
+        except FileNotFoundError:
+            raise BlobError(f"{name} is gone from the spool (expired?)") from None
+        except OSError as e:
+            raise BlobError(f"{name}: {e}") from None
+        return data, mime_type, length
+
+    def _inline(self, item: dict) -> dict:
+        try:
+            data, mime_type, length = self.read_base64(item["uri"])
+        except BlobError as e:
+            self.errors += 1
+            log(f"Blob not delivered: {e}")
+            return {"type": "text", "text": f"[blob unavailable: {e}]"}
+        self.inlined += 1
+        self.inlined_bytes += length
+        mime_type = item.get("mimeType") or mime_type or "application/octet-stream"
+        if mime_type.startswith(("image/", "audio/")):
+            content = {"type": mime_type.split("/", 1)[0], "data": data, "mimeType": mime_type}
+        else:
+            content = {"type": "resource",
+                       "resource": {"uri": item["uri"], "mimeType": mime_type, "blob": data}}
+        if "annotations" in item:
+            content["annotations"] = item["annotations"]
+        return content
+
+    def _resolve(self, frame: bytes) -> bytes:
+        try:
+            msg = framing.loads(frame)
+            content = msg["result"]["content"]
+        except (ValueError, KeyError, TypeError):
+            return frame
+        if not isinstance(content, list):
+            return frame
+        changed = False
+        for i, item in enumerate(content):
+            if (isinstance(item, dict) and item.get("type") == "resource_link"
+                    and str(item.get("uri", "")).startswith(URI_SCHEME)):
+                content[i] = self._inline(item)
+                changed = True
+        return framing.dumps_line(msg) if changed else frame
+
+    async def deliver(self, frames: list[bytes]) -> list[bytes]:
+        """Frames on their way to stdout, with blob links made inline content."""
+        if not any(MARKER in frame for frame in frames):
+            return frames
+        return await asyncio.to_thread(
+            lambda: [self._resolve(frame) if MARKER in frame else frame for frame in frames])
+
+    # --- eviction ---
+    def sweep(self):
+        """Remove expired files, then the least recently used above max_bytes."""
+        now = time.time()
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        total = sum(size for _, _, size in entries)
+        kept = len(entries)
+        for mtime, path, size in entries:
+            if now - mtime < self.ttl_sec and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                debug(f"Could not evict {path}: {e}")   # e.g. still open on Windows
+                continue
+            total -= size
+            kept -= 1
+            self.evicted += 1
+            self.evicted_bytes += size
+        self.spool_bytes = total
+        self.files = kept
+
+    async def sweep_periodically(self, interval: float = SWEEP_SEC):
+        while True:
+            await asyncio.to_thread(self.sweep)
+            await asyncio.sleep(interval)
+
+    # --- reporting ---
+    def snapshot(self) -> dict:
+        return {"inlined": self.inlined, "inlined_bytes": self.inlined_bytes,
+                "errors": self.errors, "evicted": self.evicted,
+                "evicted_bytes": self.evicted_bytes, "spool_bytes": self.spool_bytes,
+                "files": self.files}
+
+    def summary_lines(self) -> list[str]:
+        if not (self.inlined or self.errors or self.evicted):
+            return []
+        return [f"  blobs                            inlined={self.inlined} "
+                f"({self.inlined_bytes / 1048576:.1f}MB) errors={self.errors} "
+                f"evicted={self.evicted} spool={self.files} file(s) {self.spool_bytes / 1048576:.1f}MB"]
@@ -0,0 +1,129 @@
+import gzip
+import os
+import queue
+import struct
+import threading
+import time
+
+from .logger import log
+
+# ------------------------------------------------------------------------------
+# Capture file format
+#
+#   b"UNIACAP1" + <d: wall-clock time of capture start>
+#   records: <B: direction> <Q: microseconds since capture start> <I: length> bytes
+#
+# Files are optionally gzip-compressed (detected on read). When a file
+# reaches max_bytes the next one is started; only the newest keep_files
+# files of the same capture are kept (sizes count frames before compression).
+# Timestamps continue across files.
+# ------------------------------------------------------------------------------
+MAGIC = b"UNIACAP1"
+_HEADER = struct.Struct("<d")
+_RECORD = struct.Struct("<BQI")
+
+HOST_IN = 0     # host -> bridge (stdin line)
+HOST_OUT = 1    # bridge -> host (stdout frame)
+UNITY_OUT = 2   # bridge -> Unity
+UNITY_IN = 3    # Unity -> bridge
+DIRECTIONS = {HOST_IN: "host>", HOST_OUT: "<host", UNITY_OUT: ">unity", UNITY_IN: "unity<"}
+
+
+class CaptureWriter:
+    """
+    Records frames to WORK_DIR capture files from a background thread:
+    record() only timestamps the frame and enqueues it, so a slow disk
+    (or gzip) never delays the relay. Frames are dropped, and counted,
+    if the writer falls more than max_pending frames behind.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024,
+                 keep_files: int = 8, compress: bool = True, max_pending: int = 100000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self.compress = compress
+        self.dropped = 0
+        self.frames = 0
+        self._prefix = time.strftime("ai-unia-capture-%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        self._started = time.monotonic()
+        self._wall = time.time()
+        self._queue = queue.Queue(max_pending)
+        self._files: list[str] = []
+        self._index = 0
+        self._file = None
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+        log(f"Capturing traffic to {os.path.join(directory, self._prefix)}-*")
+
+    def record(self, direction: int, frame: bytes):
+        try:
+            self._queue.put_nowait((direction, int((time.monotonic() - self._started) * 1e6), frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Write out what is queued and close the current file."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.dropped:
+            log(f"Capture dropped {self.dropped} frame(s) (disk too slow)")
+
+    # --- writer thread ---
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if self._file is None or self._size >= self.max_bytes:
+                    self._rotate()
+                direction, stamp, frame = item
+                self._file.write(_RECORD.pack(direction, stamp, len(frame)))
+                self._file.write(frame)
+                self._size += _RECORD.size + len(frame)
+                self.frames += 1
+        except OSError as e:
+            log(f"Capture stopped: {e}")
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory,
+                            f"{self._prefix}-{self._index:03d}.cap" + (".gz" if self.compress else ""))
+        self._index += 1
+        # gzip level 1: cheap, and JSON compresses well anyway
+        self._file = gzip.open(path, "wb", compresslevel=1) if self.compress else open(path, "wb")
+        self._file.write(MAGIC + _HEADER.pack(self._wall))
+        self._size = 0
+        self._files.append(path)
+        while len(self._files) > self.keep_files:
+            try:
+                os.remove(self._files.pop(0))
+            except OSError:
+                pass
+
+
+def read_capture(path: str):
+    """Yield (direction, seconds since capture start, frame) from one capture file."""
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if compressed else open(path, "rb")) as f:
+        head = f.read(len(MAGIC) + _HEADER.size)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        while True:
+            try:
+                record = f.read(_RECORD.size)
+                direction, stamp, length = _RECORD.unpack(record)
+                frame = f.read(length)
+            except (struct.error, EOFError):
+                return   # end of file, or cut off (bridge killed while writing)
+            if len(frame) < length:
+                return
+            yield direction, stamp / 1e6, frame
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from .local_socket import open_upstream
+from .logger import log
+from .process import spawn
+
+# ------------------------------------------------------------------------------
+# Daemon settings
+# ------------------------------------------------------------------------------
+ATTACH_TIMEOUT_SEC = 0.5     # Single connect attempt to an already running Unity
+ATTACH_PROBE_TIMEOUT_SEC = 2.0   # Its answer to the probe initialize
+UNITY_SERVER_NAME = "UnityMcpServer"   # serverInfo.name a Unity (or the mux) reports
+HEARTBEAT_SEC = 5            # Bridges touch their session file this often
+SESSION_STALE_SEC = 3 * HEARTBEAT_SEC
+POLL_SEC = 1.0               # Daemon host check interval
+TERMINATE_WAIT_SEC = 10
+
+
+class DaemonState:
+    """
+    Files in WORK_DIR that track who owns the warm Unity process.
+
+      ai-unity-avatar.pid    daemon host pid, Unity pid and port (JSON)
+      ai-unity-avatar.lock   held by the bridge that is launching Unity
+      sessions/<pid>         one heartbeat file per connected bridge
+    """
+
+    def __init__(self, work_dir: str):
+        self.work_dir = work_dir
+        self.pid_file = os.path.join(work_dir, "ai-unity-avatar.pid")
+        self.lock_file = os.path.join(work_dir, "ai-unity-avatar.lock")
+        self.sessions_dir = os.path.join(work_dir, "sessions")
+
+    # --- pid file ---
+    def read_pid(self) -> dict | None:
+        try:
+            with open(self.pid_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_pid(self, info: dict):
+        tmp_path = self.pid_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(tmp_path, self.pid_file)
+
+    def clear_pid(self):
+        try:
+            os.remove(self.pid_file)
+        except OSError:
+            pass
+
+    # --- launch lock ---
+    def try_lock(self, stale_sec: float) -> bool:
+        """Take the launch lock. A lock older than stale_sec is broken."""
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("ascii"))
+                os.close(fd)
+                return True
+            except FileExistsError:
+                try:
+                    age = time.time() - os.path.getmtime(self.lock_file)
+                except OSError:
+                    continue
+                if age < stale_sec:
+                    return False
+                log(f"Breaking stale launch lock ({age:.0f}s old)")
+                self.unlock()
+        return False
+
+    def unlock(self):
+        try:
+            os.remove(self.lock_file)
+        except OSError:
+            pass
+
+    # --- sessions ---
+    def session_path(self, pid: int) -> str:
+        return os.path.join(self.sessions_dir, f"{pid}.session")
+
+    def touch_session(self, pid: int):
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        with open(self.session_path(pid), "a", encoding="utf-8"):
+            pass
+        os.utime(self.session_path(pid), None)
+
+    def remove_session(self, pid: int):
+        try:
+            os.remove(self.session_path(pid))
+        except OSError:
+            pass
+
+    def active_sessions(self) -> int:
+        try:
+            names = os.listdir(self.sessions_dir)
+        except OSError:
+            return 0
+        now = time.time()
+        count = 0
+        for name in names:
+            path = os.path.join(self.sessions_dir, name)
+            try:
+                if now - os.path.getmtime(path) < SESSION_STALE_SEC:
+                    count += 1
+                else:
+                    os.remove(path)  # bridge died without cleaning up
+            except OSError:
+                pass
+        return count
+
+
+# ------------------------------------------------------------------------------
+# Bridge side
+# ------------------------------------------------------------------------------
+async def try_attach(host: str, port: int, limit: int = 2 ** 16, local: str | None = None,
+                     server_name: str | None = UNITY_SERVER_NAME):
+    """
+    One quick connect attempt (local endpoint first, then TCP). Returns
+    (reader, writer) or None. Whatever listens there is first asked to
+    initialize on a throwaway connection, and only a server whose
+    serverInfo.name is server_name is attached to; the real connection
+    stays fresh for the host's own initialize.
+    """
+    try:
+        if server_name:
+            name = await probe_server_name(host, port, local)
+            if name != server_name:
+                log(f"Not attaching to {host}:{port}: it reports serverInfo {name!r}, "
+                    f"not {server_name!r}")
+                return None
+        return await open_upstream(host, port, local, limit, timeout=ATTACH_TIMEOUT_SEC)
+    except (ConnectionError, OSError, asyncio.TimeoutError):
+        return None
+
+
+async def probe_server_name(host: str, port: int, local: str | None = None) -> str | None:
+    """serverInfo.name from an initialize on its own connection (None if it was not answered)."""
+    reader, writer = await open_upstream(host, port, local, timeout=ATTACH_TIMEOUT_SEC)
+    try:
+        writer.write(json.dumps({
+            "jsonrpc": "2.0", "id": "attach-probe", "method": "initialize",
+            "params": {"protocolVersion": "2025-03-26", "capabilities": {},
+                       "clientInfo": {"name": "ai-unia-attach", "version": "0.0.1"}}}).encode() + b"\n")
+        return await asyncio.wait_for(_read_server_name(reader), ATTACH_PROBE_TIMEOUT_SEC)
+    finally:
+        writer.close()
+
+
+async def _read_server_name(reader) -> str | None:
+    while line := await reader.readline():
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return None
+        if isinstance(msg, dict) and msg.get("id") == "attach-probe":
+            info = (msg.get("result") or {}).get("serverInfo")
+            return info.get("name") if isinstance(info, dict) else None
+    return None
+
+
+def launch_daemon_host(work_dir: str, idle_timeout: float, unity_cmd: list,
+                       mux_listen: str | None = None, upstream: str | None = None,
+                       voicevox_listen: str | None = None, voicevox_upstream: str | None = None):
+    """
+    Start `python -m unia_bridge.daemon` detached from the bridge, so
+    Unity survives the MCP host closing our stdio. With mux_listen the
+    daemon host also runs the multiplexer in front of Unity (upstream);
+    with voicevox_listen, the caching VOICEVOX proxy.
+    """
+    bridge_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, "-m", "unia_bridge.daemon", work_dir, str(idle_timeout)]
+    if mux_listen:
+        cmd += ["--mux", mux_listen, "--upstream", upstream]
+    if voicevox_listen:
+        cmd += ["--voicevox", voicevox_listen, "--voicevox-upstream", voicevox_upstream]
+    cmd += ["--"] + unity_cmd
+    env = dict(os.environ)
+    env["PYTHONPATH"] = bridge_dir + os.pathsep + env.get("PYTHONPATH", "")
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    daemon_log = open(os.path.join(work_dir, "ai-unia-daemon.log"), "ab")
+    try:
+        # stdout must not inherit the MCP pipe
+        return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=daemon_log, env=env, cwd=bridge_dir,
+                                close_fds=True, **kwargs)
+    finally:
+        daemon_log.close()
+
+
+async def heartbeat(state: DaemonState):
+    """Keep this bridge's session file fresh until cancelled."""
+    pid = os.getpid()
+    try:
+        while True:
+            try:
+                state.touch_session(pid)
+            except OSError as e:
+                log(f"Session heartbeat failed: {e}")
+            await asyncio.sleep(HEARTBEAT_SEC)
+    finally:
+        state.remove_session(pid)
+
+
+# ------------------------------------------------------------------------------
+# Daemon host: owns the Unity process, stops it after an idle period
+# ------------------------------------------------------------------------------
+async def run_daemon_host(work_dir: str, idle_timeout: float, unity_cmd: list,
+                          mux_listen: str | None = None, upstream: str | None = None,
+                          voicevox_listen: str | None = None, voicevox_upstream: str | None = None):
+    from .mux import Multiplexer, parse_endpoint
+    from .voicevox_proxy import start_proxy, unity_args
+
+    state = DaemonState(work_dir)
+    proxy = None
+    if voicevox_listen:
+        proxy = await start_proxy(work_dir, voicevox_listen, voicevox_upstream)
+        unity_cmd = unity_cmd + unity_args(proxy, voicevox_listen, voicevox_upstream)
+    log(f"Daemon host launching Unity: {unity_cmd[0]}")
+    unity = await spawn(unity_cmd, stdin=asyncio.subprocess.DEVNULL)
+    state.write_pid({"daemon_pid": os.getpid(), "unity_pid": unity.pid,
+                     "started": time.time()})
+    mux = None
+    last_active = time.monotonic()
+    try:
+        if mux_listen:
+            _, host, port = parse_endpoint(upstream)
+            mux = Multiplexer(host, port)
+            await mux.connect(process=unity)
+            await mux.serve(mux_listen)
+
+        while unity.returncode is None:
+            try:
+                await asyncio.wait_for(unity.wait(), POLL_SEC)
+                break
+            except asyncio.TimeoutError:
+                pass
+            if state.active_sessions() or (mux and mux.clients):
+                last_active = time.monotonic()
+            elif time.monotonic() - last_active > idle_timeout:
+                log(f"No bridge for {idle_timeout:.0f}s; stopping Unity (PID: {unity.pid})")
+                await unity.stop(TERMINATE_WAIT_SEC)
+                break
+        log(f"Unity exited (code {unity.returncode})")
+    except Exception as e:
+        log(f"Daemon host error: {e}")
+        await unity.stop(TERMINATE_WAIT_SEC)
+    finally:
+        if mux:
+            mux.close()
+        if proxy:
+            proxy.close()
+        info = state.read_pid()
+        if info and info.get("daemon_pid") == os.getpid():
+            state.clear_pid()
+
+
+if __name__ == "__main__":
+    # python -m unia_bridge.daemon WORK_DIR IDLE_TIMEOUT_SEC
+    #        [--mux LISTEN --upstream HOST:PORT]
+    #        [--voicevox LISTEN --voicevox-upstream URL] -- unity.exe args...
+    sep = sys.argv.index("--")
+    parser = argparse.ArgumentParser(prog="unia_bridge.daemon")
+    parser.add_argument("work_dir")
+    parser.add_argument("idle_timeout", type=float)
+    parser.add_argument("--mux")
+    parser.add_argument("--upstream")
+    parser.add_argument("--voicevox")
+    parser.add_argument("--voicevox-upstream")
+    opts = parser.parse_args(sys.argv[1:sep])
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(run_daemon_host(opts.work_dir, opts.idle_timeout, sys.argv[sep + 1:],
+                                opts.mux, opts.upstream,
+                                opts.voicevox, opts.voicevox_upstream))
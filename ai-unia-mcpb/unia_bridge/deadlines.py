@@ -0,0 +1,116 @@
+import json
+import time
+
+from .handshake import dumps_line
+from .logger import log
+from .metrics import FrameInfo, RequestTracker
+
+REQUEST_TIMEOUT = -32001   # JSON-RPC error code the MCP SDKs use for "Request timed out"
+CHECK_SEC = 0.5            # Longest sleep between deadline checks
+
+
+def parse_timeouts(text: str) -> dict[str, float]:
+    """'tools/call:ai-unia-speak=30,tools/list=5' -> seconds per method / tool (0: none)."""
+    timeouts = {}
+    for item in filter(None, text.split(",")):
+        key, _, seconds = item.rpartition("=")
+        try:
+            timeouts[key.strip()] = max(0.0, float(seconds))
+        except ValueError:
+            pass
+    return timeouts
+
+
+def cancelled_frame(request_id, reason: str) -> bytes:
+    return dumps_line({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                       "params": {"requestId": request_id, "reason": reason}})
+
+
+class RequestDeadlines:
+    """
+    Deadlines for the requests in the tracker's in-flight table.
+
+    The timeout of a request is looked up by its tracker key
+    ("tools/call:<name>"), then by the method alone, then the default;
+    it counts from when the request was written to Unity.
+
+    A request given up here (timeout, host cancel, host gone) is taken
+    out of the tracker, Unity is sent notifications/cancelled for it,
+    and a response that still arrives is swallowed by on_response().
+    """
+
+    MAX_ABANDONED = 1024   # ids remembered for swallowing late responses
+
+    def __init__(self, tracker: RequestTracker, queue, default_sec: float,
+                 per_key: dict[str, float]):
+        self.tracker = tracker
+        self.queue = queue
+        self.default_sec = default_sec
+        self.per_key = per_key
+        self.timeouts = 0
+        self.cancelled = 0
+        self.late = 0
+        self._abandoned: dict = {}   # id -> None, oldest first
+
+    def timeout_for(self, key: str) -> float:
+        if key in self.per_key:
+            return self.per_key[key]
+        method = key.partition(":")[0]
+        return self.per_key.get(method, self.default_sec)
+
+    def expired(self) -> list[tuple]:
+        """(id, key, timeout) of in-flight requests past their deadline."""
+        now = time.monotonic()
+        return [(req_id, key, timeout)
+                for req_id, (start, key) in self.tracker.inflight.items()
+                for timeout in (self.timeout_for(key),)
+                if timeout and now - start > timeout]
+
+    def next_check(self) -> float:
+        """Seconds until the earliest deadline (at most CHECK_SEC)."""
+        now, wait = time.monotonic(), CHECK_SEC
+        for start, key in self.tracker.inflight.values():
+            timeout = self.timeout_for(key)
+            if timeout:
+                wait = min(wait, start + timeout - now)
+        return max(wait, 0.01)
+
+    def abandon(self, request_id, reason: str) -> bytes:
+        """Stop waiting for request_id; returns the cancel notification for Unity."""
+        self.tracker.inflight.pop(request_id, None)
+        self._abandoned[request_id] = None
+        while len(self._abandoned) > self.MAX_ABANDONED:
+            del self._abandoned[next(iter(self._abandoned))]
+        return cancelled_frame(request_id, reason)
+
+    def expire(self, request_id, key: str, timeout: float):
+        """A request ran past its deadline: tell Unity to stop working on it."""
+        self.timeouts += 1
+        log(f"No response to {key} (id={request_id}) within {timeout:g}s; cancelling it in Unity")
+        self.queue.put_nowait(self.abandon(request_id, f"timed out after {timeout:g}s"))
+
+    # --- host -> Unity ---
+    def on_host_cancel(self, frame: bytes):
+        """The host's notifications/cancelled (forwarded to Unity as is)."""
+        try:
+            request_id = (json.loads(frame).get("params") or {}).get("requestId")
+        except (ValueError, AttributeError):
+            return
+        if request_id in self.tracker.inflight:
+            self.cancelled += 1
+            self.abandon(request_id, "cancelled by the host")
+
+    # --- Unity -> host ---
+    def on_response(self, info: FrameInfo) -> bool:
+        """True if the frame answers a request given up already (and must not reach the host)."""
+        if info.method is not None or info.id not in self._abandoned:
+            return False
+        del self._abandoned[info.id]
+        self.late += 1
+        return True
+
+    def summary_lines(self) -> list[str]:
+        if not (self.timeouts or self.cancelled or self.late):
+            return []
+        return [f"  deadlines: {self.timeouts} timed out, {self.cancelled} cancelled by the host, "
+                f"{self.late} late response(s) dropped"]
@@ -0,0 +1,147 @@
+import asyncio
+from collections import deque
+
+from .handshake import dumps_line
+from .logger import log
+from .metrics import has_id, peek_frame
+
+# ------------------------------------------------------------------------------
+# Overflow policies
+# ------------------------------------------------------------------------------
+BLOCK = "block"    # Wait until the queue drains below its low watermark
+REJECT = "reject"  # Answer the request with a "server busy" error instead
+POLICIES = (BLOCK, REJECT)
+
+SERVER_BUSY_CODE = -32000
+BATCH_FRAMES = 64  # Frames a consumer takes per write
+
+# Only these notifications may be dropped when a queue is full; requests,
+# responses, notifications/initialized and notifications/cancelled never are
+DROPPABLE_NOTIFICATIONS = ("notifications/progress", "notifications/message")
+
+
+def busy_frame(req_id) -> bytes:
+    return dumps_line({"jsonrpc": "2.0", "id": req_id,
+                       "error": {"code": SERVER_BUSY_CODE,
+                                 "message": "Server busy: too many requests queued for Unity"}})
+
+
+class FrameQueue:
+    """
+    Bounded FIFO of raw frames from one peer to the other.
+
+    `high` / `low` are frame-count watermarks and `max_bytes` caps the
+    buffered size. Once the queue reaches the high mark it counts as full
+    until it drains back to the low mark, and put() applies the policy:
+      progress/log notification : replaces the oldest queued one
+      request                   : waits (BLOCK) or is refused (REJECT)
+      anything else             : waits
+    An empty queue accepts any frame, however large. Replies the bridge
+    makes itself go through put() as well, so they count against the
+    marks; put_nowait() is left for None (end of stream) and for replies
+    whose number is bounded by the requests already in flight.
+    """
+
+    def __init__(self, name: str, high: int, low: int, max_bytes: int,
+                 policy: str = BLOCK, drop_notifications: bool = True):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r} (expected one of {POLICIES})")
+        self.name = name
+        self.high = high
+        self.low = min(low, high)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.drop_notifications = drop_notifications
+        self._items: deque = deque()   # (frame, droppable)
+        self._bytes = 0
+        self._full = False
+        self._not_empty = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        # metrics
+        self.peak = 0
+        self.blocked = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def full(self) -> bool:
+        """Over the high mark and not yet drained back to the low one."""
+        return self._full
+
+    # --- producer side ---
+    async def put(self, frame: bytes) -> bool:
+        """Queue a frame; False if it was refused (REJECT policy, caller answers it)."""
+        info = peek_frame(frame)
+        droppable = self.drop_notifications and info.method in DROPPABLE_NOTIFICATIONS
+        if self._full:
+            if droppable:
+                self.dropped += 1
+                if self._drop_oldest_notification():
+                    self._append(frame, True)
+                return True
+            if self.policy == REJECT and info.method and has_id(info):
+                self.rejected += 1
+                return False
+            self.blocked += 1
+            while self._full:
+                await self._drained.wait()
+        self._append(frame, droppable)
+        return True
+
+    def put_nowait(self, frame: bytes | None):
+        """Queue without any limit check (end-of-stream marker, bounded replies)."""
+        self._append(frame, False)
+
+    async def wait_room(self):
+        """Wait until the queue is no longer full (frames queued with put_nowait)."""
+        while self._full:
+            await self._drained.wait()
+
+    def _append(self, frame, droppable: bool):
+        self._items.append((frame, droppable))
+        self._bytes += len(frame) if frame else 0
+        self.peak = max(self.peak, len(self._items))
+        self._not_empty.set()
+        if not self._full and (len(self._items) >= self.high or self._bytes >= self.max_bytes):
+            self._full = True
+            self._drained.clear()
+            log(f"Queue {self.name} is full ({len(self._items)} frames, {self._bytes} bytes); "
+                f"applying '{self.policy}' until it drains to {self.low}")
+
+    def _drop_oldest_notification(self) -> bool:
+        # the incoming notification replaces the oldest droppable one;
+        # if none is queued, the incoming one is the one that gets dropped
+        for index, (frame, droppable) in enumerate(self._items):
+            if droppable:
+                del self._items[index]
+                self._bytes -= len(frame)
+                return True
+        return False
+
+    # --- consumer side ---
+    async def get_batch(self, max_frames: int = BATCH_FRAMES) -> list:
+        """Wait for at least one frame, then take up to max_frames of them."""
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        frames = []
+        for _ in range(min(max_frames, len(self._items))):
+            frame, _ = self._items.popleft()
+            self._bytes -= len(frame) if frame else 0
+            frames.append(frame)
+        self._check_drained()
+        return frames
+
+    def _check_drained(self):
+        if self._full and len(self._items) <= self.low \
+                and self._bytes <= self.max_bytes * self.low // self.high:
+            self._full = False
+            self._drained.set()
+
+    def stats(self) -> dict:
+        return {"depth": len(self._items), "bytes": self._bytes, "peak": self.peak,
+                "blocked": self.blocked, "rejected": self.rejected, "dropped": self.dropped}
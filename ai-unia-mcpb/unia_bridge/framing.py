@@ -0,0 +1,256 @@
+import json
+import os
+
+from .logger import debug, log, truncate
+from .metrics import has_id, peek_frame
+
+try:
+    import orjson   # optional: pip install orjson
+except ImportError:
+    orjson = None
+
+# ------------------------------------------------------------------------------
+# JSON backend: orjson when installed (UNIA_JSON=json forces the stdlib)
+# ------------------------------------------------------------------------------
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+MAX_PENDING_BYTES = 1024 * 1024   # A message spread over several lines may grow to this
+
+
+def _json_dumps_line(msg) -> bytes:
+    return json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _orjson_dumps_line(msg) -> bytes:
+    try:
+        return orjson.dumps(msg, option=orjson.OPT_APPEND_NEWLINE)
+    except TypeError:
+        return _json_dumps_line(msg)   # e.g. an integer beyond 64 bits
+
+
+BACKENDS = {"json": (json.loads, _json_dumps_line)}
+if orjson is not None:
+    BACKENDS["orjson"] = (orjson.loads, _orjson_dumps_line)
+
+JSON_BACKEND = ""
+loads = dumps_line = None
+
+
+def use_backend(name: str):
+    """Switch the JSON backend ("json" or "orjson") for the whole bridge."""
+    global JSON_BACKEND, loads, dumps_line
+    loads, dumps_line = BACKENDS[name]
+    JSON_BACKEND = name
+
+
+_requested = os.environ.get("UNIA_JSON", "orjson")
+use_backend(_requested if _requested in BACKENDS else "json")
+
+
+def error_frame(request_id, code: int, message: str) -> bytes:
+    return dumps_line({"jsonrpc": "2.0", "id": request_id,
+                       "error": {"code": code, "message": message}})
+
+
+# ------------------------------------------------------------------------------
+# JSON-RPC 2.0 checks
+# ------------------------------------------------------------------------------
+def _valid_id(value) -> bool:
+    return value is None or (isinstance(value, (str, int, float)) and not isinstance(value, bool))
+
+
+def check_message(msg) -> str | None:
+    """Why msg is not a valid JSON-RPC 2.0 message, or None if it is."""
+    if not isinstance(msg, dict):
+        return "message is not an object"
+    if msg.get("jsonrpc") != "2.0":
+        return 'missing "jsonrpc": "2.0"'
+    if "id" in msg and not _valid_id(msg["id"]):
+        return "id must be a string or a number"
+    if "method" in msg:
+        if not isinstance(msg["method"], str):
+            return "method must be a string"
+        if "params" in msg and not isinstance(msg["params"], (dict, list)):
+            return "params must be an object or an array"
+    elif "id" not in msg or ("result" in msg) == ("error" in msg):
+        return "neither a request, a notification nor a response"
+    return None
+
+
+def _parse(text: bytes):
+    """(message, incomplete): message is None if text is not JSON."""
+    try:
+        return loads(text), False
+    except ValueError as e:
+        pos = getattr(e, "pos", 0)
+        return None, pos >= len(text) or getattr(e, "msg", "").startswith("Unterminated string")
+
+
+class _Batch:
+    def __init__(self):
+        self.parts: list[bytes] = []   # response frames without the newline
+        self.expected = 0
+
+    def frame(self) -> bytes:
+        return b"[" + b",".join(self.parts) + b"]\n"
+
+
+# ------------------------------------------------------------------------------
+# Host -> bridge framing
+# ------------------------------------------------------------------------------
+class FrameValidator:
+    """
+    Checks every line the host writes to stdin before it is queued for
+    Unity, so a broken message is answered here instead of reaching
+    (and possibly breaking) Unity's connection:
+
+    - not JSON: -32700 Parse error; not JSON-RPC 2.0: -32600 Invalid Request
+    - a message pretty-printed over several lines, or with a raw newline
+      inside a string, is joined and re-serialized as one line
+    - a batch array is split into single messages; the responses are
+      collected by collect() and sent back to the host as one array
+
+    Well-formed single-line messages are forwarded as the original bytes.
+    """
+
+    def __init__(self):
+        self.parse_errors = 0
+        self.invalid = 0
+        self.batches = 0
+        self._pending: list[bytes] = []   # lines of an unfinished message
+        self._pending_len = 0
+        self._waiting: dict = {}          # request id -> _Batch
+
+    # --- host -> Unity ---
+    def on_line(self, line: bytes) -> tuple[list[bytes], list[bytes]]:
+        """Returns (frames to forward to Unity, responses for the host)."""
+        if self._pending:
+            return self._continue(line)
+        text = line.strip()
+        if not text:
+            return [], []
+        msg, incomplete = _parse(text)
+        if msg is None:
+            if incomplete and text[:1] in b"{[":
+                self._pending, self._pending_len = [line], len(line)
+                return [], []
+            return [], [self._parse_error(text)]
+        return self._accept(msg, line if len(line) == len(text) + 1 else text + b"\n")
+
+    def flush(self) -> list[bytes]:
+        """At EOF: an unfinished message gets its parse error."""
+        if not self._pending:
+            return []
+        text = b"".join(self._pending).strip()
+        self._pending, self._pending_len = [], 0
+        return [self._parse_error(text)]
+
+    def _continue(self, line: bytes) -> tuple[list[bytes], list[bytes]]:
+        # a line starting at column 0 with { or [ that parses by itself is a
+        # new message: the pending one was broken
+        if line[:1] in b"{[":
+            msg, _ = _parse(line.strip())
+            if msg is not None:
+                return self._restart(line)
+
+        joined = b"".join(self._pending) + line
+        msg, incomplete = _parse(joined)
+        if msg is None and not incomplete:
+            try:
+                # raw control characters (e.g. a newline) inside a string
+                msg = json.loads(joined, strict=False)
+            except ValueError:
+                pass
+        if msg is not None:
+            self._pending, self._pending_len = [], 0
+            return self._accept(msg, None)
+        if incomplete and self._pending_len + len(line) <= MAX_PENDING_BYTES:
+            self._pending.append(line)
+            self._pending_len += len(line)
+            return [], []
+        return self._restart(line)
+
+    def _restart(self, line: bytes) -> tuple[list[bytes], list[bytes]]:
+        responses = self.flush()
+        frames, more = self.on_line(line)
+        return frames, responses + more
+
+    def _accept(self, msg, frame: bytes | None) -> tuple[list[bytes], list[bytes]]:
+        if isinstance(msg, list):
+            return self._split(msg)
+        reason = check_message(msg)
+        if reason:
+            return [], [self._invalid(msg, reason)]
+        responses = self._on_cancel(msg) if msg.get("method") == "notifications/cancelled" else []
+        return [frame or dumps_line(msg)], responses
+
+    def _split(self, items: list) -> tuple[list[bytes], list[bytes]]:
+        if not items:
+            return [], [self._invalid({}, "empty batch")]
+        self.batches += 1
+        batch, frames, seen = _Batch(), [], set()
+        for item in items:
+            reason = check_message(item)
+            if not reason and "method" in item and "id" in item:
+                if item["id"] in seen or item["id"] in self._waiting:
+                    reason = "duplicate id in batch"
+            if reason:
+                batch.parts.append(self._invalid(item, reason)[:-1])
+                continue
+            if "method" in item and "id" in item:
+                seen.add(item["id"])
+                self._waiting[item["id"]] = batch
+                batch.expected += 1
+            frames.append(dumps_line(item))
+        debug(f"Split a batch of {len(items)} message(s)")
+        if batch.expected == 0:
+            # only notifications / responses: nothing to wait for
+            return frames, [batch.frame()] if batch.parts else []
+        return frames, []
+
+    def _on_cancel(self, msg: dict) -> list[bytes]:
+        # a cancelled request gets no response: stop waiting for it
+        params = msg.get("params")
+        request_id = params.get("requestId") if isinstance(params, dict) else None
+        if not _valid_id(request_id):
+            return []
+        batch = self._waiting.pop(request_id, None)
+        if batch is None:
+            return []
+        batch.expected -= 1
+        if batch.expected:
+            return []
+        return [batch.frame()] if batch.parts else []
+
+    def _parse_error(self, text: bytes) -> bytes:
+        self.parse_errors += 1
+        log(f"Parse error in host message: {truncate(text, 200)}")
+        return error_frame(None, PARSE_ERROR, "Parse error")
+
+    def _invalid(self, msg, reason: str) -> bytes:
+        self.invalid += 1
+        request_id = msg.get("id") if isinstance(msg, dict) else None
+        log(f"Invalid request from host: {reason}")
+        return error_frame(request_id if _valid_id(request_id) else None,
+                           INVALID_REQUEST, f"Invalid Request: {reason}")
+
+    # --- Unity -> host ---
+    def collect(self, frames: list[bytes]) -> list[bytes]:
+        """
+        Take the responses to batch members out of frames headed for the
+        host; a batch's array response is added once its last one arrives.
+        """
+        if not self._waiting:
+            return frames
+        out = []
+        for frame in frames:
+            info = peek_frame(frame)
+            batch = self._waiting.pop(info.id, None) if info.method is None and has_id(info) else None
+            if batch is None:
+                out.append(frame)
+                continue
+            batch.parts.append(frame.rstrip(b"\r\n"))
+            batch.expected -= 1
+            if batch.expected == 0:
+                out.append(batch.frame())
+        return out
@@ -0,0 +1,275 @@
+import json
+import os
+
+from . import framing
+from .logger import log
+from .metrics import FrameInfo
+
+BRIDGE_INIT_ID = "unia-bridge-initialize"
+
+
+def dumps_line(msg) -> bytes:
+    """Serialize one JSON-RPC message as a newline-terminated frame."""
+    return framing.dumps_line(msg)
+
+
+class InitializeCache:
+    """
+    Snapshot of Unity's `initialize` result, persisted in WORK_DIR.
+
+    With a valid snapshot the bridge answers the host's `initialize`
+    immediately, even while Unity is still booting. The request is still
+    forwarded to Unity (under a bridge-private id) so the Unity session is
+    initialized; that response is swallowed and refreshes the snapshot.
+    The snapshot is ignored when the Unity executable changes.
+    """
+
+    def __init__(self, path: str, exe_path: str | None = None, answer_locally: bool = True):
+        self.path = path
+        self.exe_path = exe_path
+        self.answer_locally = answer_locally
+        self.result = None
+        self._pending_id = None      # id of the forwarded initialize
+        self._swallow = False        # response was already answered locally
+        self.request = None          # last host initialize, for replay on reconnect
+        self.initialized_seen = False
+        self._load()
+
+    def _exe_mtime(self):
+        try:
+            return os.path.getmtime(self.exe_path) if self.exe_path else None
+        except OSError:
+            return None
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("exe_mtime") == self._exe_mtime():
+                self.result = data["result"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.result = None
+
+    def _save(self):
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"exe_mtime": self._exe_mtime(), "result": self.result},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log(f"Could not save initialize snapshot: {e}")
+
+    def on_request(self, line: bytes):
+        """
+        Inspect a host->Unity frame.
+        Returns (frame_to_forward, local_response_or_None).
+        """
+        if b'"initialize"' not in line:
+            if not self.initialized_seen and b'"notifications/initialized"' in line:
+                self.initialized_seen = True
+            return line, None
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return line, None
+        if not isinstance(msg, dict) or msg.get("method") != "initialize" or "id" not in msg:
+            return line, None
+
+        self.request = dict(msg)
+        requested = (msg.get("params") or {}).get("protocolVersion")
+        if (self.answer_locally and self.result is not None
+                and self.result.get("protocolVersion") == requested):
+            log("Answering initialize from cached snapshot")
+            response = dumps_line({"jsonrpc": "2.0", "id": msg["id"], "result": self.result})
+            msg["id"] = BRIDGE_INIT_ID
+            self._pending_id = BRIDGE_INIT_ID
+            self._swallow = True
+            return dumps_line(msg), response
+
+        self._pending_id = msg["id"]
+        self._swallow = False
+        return line, None
+
+    def is_pending(self, req_id) -> bool:
+        """True if req_id is the host's initialize still waiting for Unity."""
+        return not self._swallow and self._pending_id is not None and req_id == self._pending_id
+
+    def owns(self, req_id) -> bool:
+        """
+        True for an initialize the host must never get an error for: its
+        own while still waiting for Unity, or the bridge's (forwarded
+        after a local answer, or replayed after a reconnect).
+        """
+        return req_id == BRIDGE_INIT_ID or self.is_pending(req_id)
+
+    def replay_frames(self) -> list[bytes]:
+        """
+        Handshake frames for a fresh Unity session after a reconnect.
+        A host initialize that was never answered keeps its id, so the
+        host gets the reply; otherwise the reply is swallowed.
+        """
+        if self.request is None:
+            return []
+        msg = dict(self.request)
+        if not self.is_pending(msg["id"]):
+            msg["id"] = BRIDGE_INIT_ID
+            self._pending_id = BRIDGE_INIT_ID
+            self._swallow = True
+        frames = [dumps_line(msg)]
+        if self.initialized_seen:
+            frames.append(dumps_line({"jsonrpc": "2.0", "method": "notifications/initialized"}))
+        return frames
+
+    def on_response(self, info: FrameInfo, line: bytes) -> bool:
+        """
+        Inspect a Unity->host frame. Returns True if it must not be
+        forwarded to the host (answer to a locally answered initialize),
+        a result or an error alike.
+        """
+        if self._pending_id is None or info.method is not None or info.id != self._pending_id:
+            return False
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return False
+        if not isinstance(msg, dict):
+            return False
+
+        self._pending_id = None
+        if isinstance(msg.get("result"), dict):
+            self.result = msg["result"]
+            self._save()
+        elif self._swallow:
+            log(f"Unity rejected the bridge's initialize: {msg.get('error')}")
+        return self._swallow
+
+
+CATALOG_METHODS = ("tools/list", "prompts/list", "prompts/get")
+LIST_CHANGED = {
+    "notifications/tools/list_changed": ("tools/list",),
+    "notifications/prompts/list_changed": ("prompts/list", "prompts/get"),
+}
+
+
+class CatalogCache:
+    """
+    Unity's tools/list, prompts/list and prompts/get results, persisted
+    in WORK_DIR next to the initialize snapshot.
+
+    A cached call is answered by the bridge (the host's id spliced into
+    the stored result) and never reaches Unity, so it is served even
+    while Unity boots. A miss is forwarded and its result stored. The
+    cache belongs to one Unity build: it is dropped when the exe mtime
+    or the serverInfo version changes, and per method on
+    notifications/*/list_changed.
+    """
+
+    def __init__(self, path: str, exe_path: str | None, handshake: InitializeCache):
+        self.path = path
+        self.exe_path = exe_path
+        self.handshake = handshake
+        self.entries: dict[str, bytes] = {}   # key -> serialized result
+        self.hits = 0
+        self._server_version = None
+        self._pending: dict = {}              # forwarded id -> key
+        self._load()
+
+    def _exe_mtime(self):
+        try:
+            return os.path.getmtime(self.exe_path) if self.exe_path else None
+        except OSError:
+            return None
+
+    def _current_version(self):
+        result = self.handshake.result or {}
+        return (result.get("serverInfo") or {}).get("version")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("exe_mtime") == self._exe_mtime():
+                self._server_version = data["server_version"]
+                self.entries = {key: dumps_line(result)[:-1]
+                                for key, result in data["entries"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.entries = {}
+
+    def _save(self):
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"exe_mtime": self._exe_mtime(),
+                           "server_version": self._server_version,
+                           "entries": {key: json.loads(result)
+                                       for key, result in self.entries.items()}},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log(f"Could not save catalog cache: {e}")
+
+    def _check_version(self):
+        version = self._current_version()
+        if version != self._server_version:
+            if self.entries:
+                log(f"Unity server version changed ({self._server_version} -> {version}); "
+                    "dropping catalog cache")
+            self.entries = {}
+            self._server_version = version
+
+    @staticmethod
+    def _key(msg: dict) -> str:
+        params = {k: v for k, v in (msg.get("params") or {}).items() if k != "_meta"}
+        return msg["method"] + " " + json.dumps(params, ensure_ascii=False, sort_keys=True,
+                                                separators=(",", ":"))
+
+    def on_request(self, line: bytes) -> bytes | None:
+        """Inspect a host->Unity frame. Returns the local response, or None to forward it."""
+        if b'"tools/list"' not in line and b'"prompts/' not in line:
+            return None
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(msg, dict) or msg.get("method") not in CATALOG_METHODS or "id" not in msg:
+            return None
+
+        self._check_version()
+        key = self._key(msg)
+        result = self.entries.get(key)
+        if result is None:
+            self._pending[msg["id"]] = key
+            return None
+        self.hits += 1
+        return (b'{"jsonrpc":"2.0","id":' + json.dumps(msg["id"], ensure_ascii=False).encode("utf-8")
+                + b',"result":' + result + b'}\n')
+
+    def on_response(self, msg_id, method: str | None, line: bytes):
+        """Inspect a Unity->host frame (never swallowed)."""
+        if method in LIST_CHANGED:
+            self.invalidate(LIST_CHANGED[method])
+            return
+        if method is not None or not self._pending:
+            return
+        key = self._pending.pop(msg_id, None)
+        if key is None:
+            return
+        try:
+            result = json.loads(line).get("result")
+        except (ValueError, AttributeError):
+            return
+        if isinstance(result, dict):
+            self._check_version()
+            self.entries[key] = dumps_line(result)[:-1]
+            self._save()
+
+    def invalidate(self, methods):
+        dropped = [key for key in self.entries if key.split(" ", 1)[0] in methods]
+        for key in dropped:
+            del self.entries[key]
+        # an answer already on its way may predate the change
+        self._pending = {i: k for i, k in self._pending.items() if k.split(" ", 1)[0] not in methods}
+        if dropped:
+            log(f"Catalog cache: dropped {len(dropped)} cached {', '.join(methods)} result(s)")
+            self._save()
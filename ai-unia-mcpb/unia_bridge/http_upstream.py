@@ -0,0 +1,428 @@
+import asyncio
+
+from . import framing
+from .logger import debug, log
+from .metrics import PEEK_PREFIX, has_id, peek_frame
+from .voicevox_proxy import HttpError, read_body, read_head
+
+# ------------------------------------------------------------------------------
+# MCP Streamable HTTP settings
+# ------------------------------------------------------------------------------
+MCP_PATH = "/mcp"
+POOL_SIZE = 8                  # Keep-alive connections (one per request being answered)
+MAX_UNSENT = 256               # drain() waits while more frames than this wait for a connection
+LISTEN_RETRY_SEC = 1.0         # Reopen the GET stream for server messages after this
+CLOSE_TIMEOUT_SEC = 1.0        # For the DELETE that ends the session
+READ_LIMIT = 256 * 1024        # Server messages are not read while the bridge has 2x this unread
+SSE_READ_BYTES = 64 * 1024
+
+
+async def iter_body(reader: asyncio.StreamReader, headers: dict):
+    """Yield the body in pieces as it arrives (chunked, Content-Length or until EOF)."""
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return
+            yield await reader.readexactly(size)
+            await reader.readline()
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining:
+            piece = await reader.read(min(remaining, SSE_READ_BYTES))
+            if not piece:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(piece)
+            yield piece
+    else:
+        while piece := await reader.read(SSE_READ_BYTES):
+            yield piece
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpUpstream:
+    """
+    MCP Streamable HTTP client that looks like a TCP connection to the
+    bridge: `writer` takes newline-delimited frames as the TCP pipe writes
+    them and POSTs each one; `reader` returns the responses and server
+    messages, from JSON bodies or SSE streams, as newline-delimited frames.
+    So the tracker, supervisor, capture etc. work the same on both transports.
+
+    - POSTs go over a pool of keep-alive connections (at most pool_size
+      at once; an SSE response holds its connection until it ends).
+      One sender task writes them in the order the bridge wrote the
+      frames; after a notification it waits for the 202 before writing
+      the next frame, since Unity serves each connection on its own
+      thread. Responses to requests are read concurrently.
+    - Responses and server messages are not read while the bridge has
+      more than twice READ_LIMIT unread (the reader pauses its
+      "transport", as a socket's would).
+    - The Mcp-Session-Id from the initialize response is sent on every
+      later request; frames written after an initialize wait for it.
+      A 404 for the session ends the "connection", so the bridge
+      reconnects and replays the handshake into a new session.
+    - A GET stream carries server-initiated messages (if the server has one).
+    - close() ends the session with DELETE.
+    """
+
+    def __init__(self, host: str, port: int, path: str = MCP_PATH,
+                 pool_size: int = POOL_SIZE, first: tuple | None = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.reader = asyncio.StreamReader(limit=READ_LIMIT)
+        self.writer = _UpstreamWriter(self)
+        self.reader.set_transport(self.writer)
+        self.session_id: str | None = None
+        self.protocol_version: str | None = None
+        self.closed = False
+        # metrics
+        self.posts = 0
+        self.opened = 0
+        self.reused = 0
+        self.events = 0
+        self._idle: list[_Connection] = [_Connection(*first)] if first else []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._tasks: set[asyncio.Task] = set()
+        self._outbox: asyncio.Queue = asyncio.Queue()   # (frame, wait, done) in write order
+        self._task_send: asyncio.Task | None = None
+        self._flowing = asyncio.Event()   # cleared while the bridge's reader is over its limit
+        self._flowing.set()
+        self._handshake: asyncio.Future | None = None   # done once initialize was answered
+        self._negotiating = False
+        self._task_listen: asyncio.Task | None = None
+        self._task_close: asyncio.Task | None = None
+        self.unsent = 0
+        self.room = asyncio.Event()
+        self.room.set()
+
+    # --- frames from the bridge ---
+    def send(self, data: bytes):
+        for frame in data.split(b"\n"):
+            if not frame.strip() or self.closed:
+                continue
+            frame += b"\n"
+            wait = self._handshake
+            done = None
+            if b'"initialize"' in frame[:PEEK_PREFIX] and peek_frame(frame).method == "initialize":
+                done = self._handshake = asyncio.get_running_loop().create_future()
+            self.unsent += 1
+            if self.unsent > MAX_UNSENT:
+                self.room.clear()
+            self._outbox.put_nowait((frame, None if done else wait, done))
+        if self._task_send is None and not self.closed:
+            self._task_send = asyncio.create_task(self._send_frames())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _sent(self):
+        self.unsent -= 1
+        if self.unsent <= MAX_UNSENT:
+            self.room.set()
+
+    # --- connections ---
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.writer.is_closing() and not conn.reader.at_eof():
+                conn.reused = True
+                self.reused += 1
+                return conn
+            conn.close()
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=READ_LIMIT)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def _release(self, conn: _Connection, reusable: bool):
+        if reusable and not self.closed:
+            conn.reused = False
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _request(self, method: str, accept: str, body: bytes = b"") -> bytes:
+        lines = [f"{method} {self.path} HTTP/1.1",
+                 f"Host: {self.host}:{self.port}",
+                 f"Accept: {accept}"]
+        if body:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        if self.session_id:
+            lines.append(f"Mcp-Session-Id: {self.session_id}")
+        if self.protocol_version:
+            lines.append(f"MCP-Protocol-Version: {self.protocol_version}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _exchange(self, request: bytes) -> tuple[_Connection, int, dict]:
+        return await self._reply(await self._write(request), request)
+
+    async def _write(self, request: bytes) -> _Connection:
+        """Send request on a pooled connection; a stale keep-alive one is retried."""
+        while True:
+            conn = await self._acquire()
+            try:
+                conn.writer.write(request)
+                await conn.writer.drain()
+                return conn
+            except ConnectionError:
+                conn.close()
+                if not conn.reused:
+                    raise ConnectionError("Unity closed the HTTP connection")
+
+    async def _reply(self, conn: _Connection, request: bytes) -> tuple[_Connection, int, dict]:
+        """The response head; a keep-alive connection closed under the request sends it again."""
+        while True:
+            try:
+                head = await read_head(conn.reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                head = None
+            if head is not None:
+                (_, status, *_), headers = head
+                return conn, int(status), headers
+            conn.close()
+            if not conn.reused:
+                raise ConnectionError("Unity closed the HTTP connection")
+            conn = await self._write(request)
+
+    # --- POST: one message, answered by JSON, an SSE stream, or 202 ---
+    async def _send_frames(self):
+        """Write the POSTs one after another; each response is read by its own task."""
+        while not self.closed:
+            frame, wait, done = await self._outbox.get()
+            try:
+                if wait is not None:
+                    await asyncio.shield(wait)   # the session id of the initialize response
+                await self._slots.acquire()
+                if self.closed:
+                    self._slots.release()
+                    return
+                self.posts += 1
+                request = self._request("POST", "application/json, text/event-stream", frame.rstrip(b"\n"))
+                try:
+                    conn = await self._write(request)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                finally:
+                    self._sent()
+            except OSError as e:
+                if done is not None:
+                    done.set_result(None)
+                self.lose(f"HTTP POST failed: {e}")
+                return
+            task = self._spawn(self._post(conn, request, frame, done))
+            info = peek_frame(frame)
+            if info.method and not has_id(info):
+                await task   # accepted before anything written after it
+
+    async def _post(self, conn: _Connection, request: bytes, frame: bytes, done: asyncio.Future | None):
+        try:
+            try:
+                conn, status, headers = await self._reply(conn, request)
+                if done is not None:
+                    self._on_initialize(headers)
+                try:
+                    reusable = await self._response(conn, status, headers, frame)
+                except BaseException:
+                    conn.close()
+                    raise
+                self._release(conn, reusable)
+            finally:
+                self._slots.release()
+        except (OSError, asyncio.IncompleteReadError, HttpError, ValueError) as e:
+            self.lose(f"HTTP POST failed: {e}")
+        finally:
+            if done is not None and not done.done():
+                done.set_result(None)
+
+    def _on_initialize(self, headers: dict):
+        self.session_id = headers.get("mcp-session-id") or self.session_id
+        self._negotiating = True
+        if self.session_id:
+            debug(f"MCP session {self.session_id}")
+        if self._task_listen is None:
+            self._task_listen = asyncio.create_task(self._listen())
+
+    async def _response(self, conn: _Connection, status: int, headers: dict, frame: bytes) -> bool:
+        """Feed what the server answered; True if the connection can be reused."""
+        keep = headers.get("connection", "").lower() != "close"
+        content_type = headers.get("content-type", "").lower()
+        if status == 404 and self.session_id:
+            await read_body(conn.reader, headers)
+            self.lose("MCP session expired")
+            return False
+        if status in (202, 204):
+            await read_body(conn.reader, headers)
+            return keep
+        await self._flowing.wait()   # the bridge has not taken what was fed yet
+        if content_type.startswith("text/event-stream"):
+            await self._read_events(conn.reader, headers)
+            return keep and ("chunked" in headers.get("transfer-encoding", "").lower()
+                             or "content-length" in headers)
+        body = await read_body(conn.reader, headers, until_eof="content-length" not in headers
+                               and "chunked" not in headers.get("transfer-encoding", "").lower())
+        if 200 <= status < 300 or body.lstrip().startswith((b"{", b"[")):
+            self._feed_json(body)
+        else:
+            info = peek_frame(frame)
+            if info.method and has_id(info):
+                self._feed(framing.error_frame(info.id, -32000,
+                                               f"Unity HTTP {status}: {body[:200].decode('utf-8', 'replace')}"))
+        return keep and ("content-length" in headers or "chunked" in headers.get("transfer-encoding", "").lower())
+
+    # --- server -> bridge ---
+    async def _read_events(self, reader: asyncio.StreamReader, headers: dict):
+        """SSE: each event's data lines are one JSON-RPC message."""
+        buffer, data = bytearray(), []
+        async for piece in iter_body(reader, headers):
+            buffer += piece
+            start = 0
+            while (end := buffer.find(b"\n", start)) >= 0:
+                line = bytes(buffer[start:end]).rstrip(b"\r")
+                start = end + 1
+                if not line:
+                    if data:
+                        self.events += 1
+                        self._feed_json(b"\n".join(data))
+                        data = []
+                elif line.startswith(b"data:"):
+                    data.append(line[6:] if line[5:6] == b" " else line[5:])
+                # "event:", "id:", "retry:" and ": comments" are not needed here
+            del buffer[:start]
+            await self._flowing.wait()
+
+    def _feed_json(self, body: bytes):
+        body = body.strip()
+        if not body:
+            return
+        if body[:1] == b"[" or b"\n" in body:
+            # a batch, or pretty-printed: one compact frame per message
+            msg = framing.loads(body)
+            for item in msg if isinstance(msg, list) else [msg]:
+                self._feed(framing.dumps_line(item))
+        else:
+            self._feed(body + b"\n")
+
+    def _feed(self, frame: bytes):
+        if self.closed:
+            return
+        if self._negotiating and b'"protocolVersion"' in frame:
+            # later requests carry the version the initialize response settled on
+            self._negotiating = False
+            try:
+                self.protocol_version = framing.loads(frame)["result"]["protocolVersion"]
+            except (ValueError, KeyError, TypeError):
+                pass
+        self.reader.feed_data(frame)
+
+    async def _listen(self):
+        """GET stream for messages the server sends outside of a request."""
+        while not self.closed:
+            conn = None
+            try:
+                conn, status, headers = await self._exchange(self._request("GET", "text/event-stream"))
+                if status != 200:
+                    await read_body(conn.reader, headers)
+                    conn.close()
+                    if status == 404 and self.session_id:
+                        self.lose("MCP session expired")
+                    else:
+                        debug(f"Unity has no server message stream (HTTP {status})")
+                    return
+                await self._read_events(conn.reader, headers)
+            except (OSError, asyncio.IncompleteReadError, HttpError, ValueError) as e:
+                debug(f"Server message stream ended: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+            await asyncio.sleep(LISTEN_RETRY_SEC)
+
+    # --- end ---
+    def lose(self, reason: str):
+        """The upstream is unusable: the bridge sees the connection close."""
+        if self.closed:
+            return
+        log(f"{reason}; closing the Unity connection")
+        self.close(end_session=False)
+
+    def close(self, end_session: bool = True):
+        if self.closed:
+            return
+        self.closed = True
+        self.room.set()
+        for task in list(self._tasks) + [self._task_send, self._task_listen]:
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        self.reader.feed_eof()
+        if end_session and self.session_id:
+            self._task_close = asyncio.create_task(self._end_session())
+        else:
+            self._close_idle()
+        log(f"HTTP upstream: {self.posts} POST(s), {self.opened} connection(s) opened, "
+            f"{self.reused} reused, {self.events} SSE event(s)")
+
+    async def _end_session(self):
+        try:
+            conn, status, headers = await asyncio.wait_for(
+                self._exchange(self._request("DELETE", "application/json")), CLOSE_TIMEOUT_SEC)
+            conn.close()
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, HttpError):
+            pass
+        finally:
+            self._close_idle()
+
+    def _close_idle(self):
+        while self._idle:
+            self._idle.pop().close()
+
+    async def wait_closed(self):
+        if self._task_close is not None:
+            await asyncio.gather(self._task_close, return_exceptions=True)
+
+
+class _UpstreamWriter:
+    """
+    The StreamWriter calls the bridge makes on its Unity connection, and
+    the transport of the upstream's StreamReader.
+    """
+
+    def __init__(self, upstream: HttpUpstream):
+        self._upstream = upstream
+
+    def write(self, data: bytes):
+        self._upstream.send(data)
+
+    async def drain(self):
+        if self._upstream.closed:
+            raise ConnectionResetError("Unity HTTP connection closed")
+        await self._upstream.room.wait()
+
+    def close(self):
+        self._upstream.close()
+
+    def is_closing(self) -> bool:
+        return self._upstream.closed
+
+    # flow control from the bridge's StreamReader (the Transport calls it makes)
+    def pause_reading(self):
+        self._upstream._flowing.clear()
+
+    def resume_reading(self):
+        self._upstream._flowing.set()
+
+    async def wait_closed(self):
+        await self._upstream.wait_closed()
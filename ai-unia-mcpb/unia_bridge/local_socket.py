@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import tempfile
+import zlib
+
+from .logger import debug
+
+# ------------------------------------------------------------------------------
+# Local (non-TCP) endpoint: AF_UNIX socket on Linux/macOS, named pipe on Windows
+# ------------------------------------------------------------------------------
+PIPE_PREFIX = "\\\\.\\pipe\\"
+SOCKET_NAME = "ai-unia-mcp.sock"
+MAX_SOCKET_PATH = 100           # sun_path is 104 (macOS) / 108 (Linux) bytes
+CONNECT_TIMEOUT_SEC = 1.0
+
+
+def default_endpoint(work_dir: str, pipe_name: str | None = None) -> str:
+    """
+    Named pipe on Windows, otherwise a socket file in work_dir (or the temp
+    dir if too long). Pipe names are global: the default one is derived
+    from work_dir, so bridges sharing a work dir (and its Unity) meet on
+    the same pipe and other installs do not collide with it.
+    """
+    if sys.platform == "win32":
+        if pipe_name is None:
+            key = os.path.normcase(os.path.abspath(work_dir))
+            pipe_name = f"ai-unia-mcp-{zlib.crc32(os.fsencode(key)):08x}"
+        return PIPE_PREFIX + pipe_name
+    path = os.path.join(work_dir, SOCKET_NAME)
+    if len(os.fsencode(path)) > MAX_SOCKET_PATH:
+        # one per work dir, like the file it replaces
+        path = os.path.join(tempfile.gettempdir(), f"ai-unia-mcp-{zlib.crc32(os.fsencode(path)):08x}.sock")
+    return path
+
+
+def is_pipe(endpoint: str) -> bool:
+    return endpoint.startswith(PIPE_PREFIX)
+
+
+async def open_local_connection(endpoint: str, limit: int = 2 ** 16):
+    """(reader, writer) on a named pipe or an AF_UNIX socket, like asyncio.open_connection."""
+    if not is_pipe(endpoint):
+        return await asyncio.open_unix_connection(endpoint, limit=limit)
+    loop = asyncio.get_running_loop()
+    if not hasattr(loop, "create_pipe_connection"):
+        raise OSError("Named pipes need the Proactor event loop")
+    reader = asyncio.StreamReader(limit=limit, loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    transport, _ = await loop.create_pipe_connection(lambda: protocol, endpoint)
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+
+async def open_upstream(host: str, port: int, local: str | None = None,
+                        limit: int = 2 ** 16, timeout: float = CONNECT_TIMEOUT_SEC):
+    """
+    Connect to Unity: the local endpoint when it is set and listening,
+    otherwise TCP host:port (a Unity build without the local listener,
+    or a daemon/multiplexer on TCP). Raises what the TCP connect raises.
+    """
+    if local:
+        try:
+            conn = await asyncio.wait_for(open_local_connection(local, limit), timeout)
+            debug(f"Connected to Unity on {local}")
+            return conn
+        except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+            debug(f"Local endpoint {local} not available ({e}); using TCP")
+    return await asyncio.wait_for(asyncio.open_connection(host, port, limit=limit), timeout)
+
+
+def describe(writer) -> str:
+    """Where a connection from open_upstream() goes, for log lines."""
+    peer = writer.get_extra_info("peername")
+    if isinstance(peer, tuple):
+        return f"{peer[0]}:{peer[1]}"
+    if peer:
+        return str(peer)
+    return "named pipe" if writer.get_extra_info("pipe") is not None else "local endpoint"
@@ -0,0 +1,186 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import deque
+
+# ------------------------------------------------------------------------------
+# Logging settings (env, or --log-level=... / --log-sample=... on the command line)
+# ------------------------------------------------------------------------------
+LOG_QUEUE_MAX = 10000       # Records waiting for the writer thread; more are dropped
+PAYLOAD_MAX_BYTES = 512     # Traced frames are cut to this
+RING_FRAMES = 200           # Last frames kept in memory for the error dump
+RING_FRAME_BYTES = 4096     # Bytes kept per frame in the ring at debug level
+RING_HEAD_BYTES = 160       # ... and at info level (enough for the method and id)
+
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO,
+          "warning": logging.WARNING, "error": logging.ERROR}
+
+
+def _option(name: str, env: str, default: str) -> str:
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return os.environ.get(env, default)
+
+
+def _parse_sampling(text: str) -> dict[str, int]:
+    """'notifications/progress=100,tools/call=1' -> log 1 in N per message type."""
+    sampling = {}
+    for item in filter(None, text.split(",")):
+        kind, _, every = item.partition("=")
+        try:
+            sampling[kind.strip()] = max(1, int(every))
+        except ValueError:
+            pass
+    return sampling
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the writer falls behind, records are dropped."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # formatting happens on the writer thread
+        return record
+
+
+class _DumpHandler(logging.Handler):
+    """Writes the frames attached to an error() record, on the writer thread."""
+
+    def emit(self, record):
+        dump = getattr(record, "dump", None)
+        if not dump:
+            return
+        directory, frames = dump
+        path = dump_frames(directory, frames, record.getMessage())
+        if path:
+            _stderr_handler.handle(logging.makeLogRecord({
+                "msg": f"Last {len(frames)} frame(s) written to {path}",
+                "levelno": logging.ERROR, "levelname": "ERROR"}))
+
+
+class _BridgeFormatter(logging.Formatter):
+    def format(self, record):
+        msg = record.getMessage()
+        if record.levelno >= logging.WARNING:
+            msg = f"{record.levelname}: {msg}"
+        return f"[Bridge] {msg}"
+
+
+_logger = logging.getLogger("unia_bridge")
+_logger.propagate = False
+_logger.setLevel(LEVELS.get(_option("log-level", "UNIA_LOG_LEVEL", "info").lower(), logging.INFO))
+_stderr_handler = logging.StreamHandler(sys.stderr)
+_stderr_handler.setFormatter(_BridgeFormatter())
+_listener = logging.handlers.QueueListener(queue.Queue(LOG_QUEUE_MAX), _stderr_handler, _DumpHandler())
+_logger.addHandler(_DroppingQueueHandler(_listener.queue))
+_listener.start()
+
+_sampling = _parse_sampling(_option("log-sample", "UNIA_LOG_SAMPLE", ""))
+_sample_counts: dict[str, int] = {}
+_ring: deque = deque(maxlen=RING_FRAMES)
+_dump_dir: str | None = None
+_frames_seen = 0      # frames recorded so far
+_frames_dumped = 0    # ... at the last dump
+
+
+def _shutdown():
+    _listener.stop()   # writes out everything still queued
+    if _DroppingQueueHandler.dropped:
+        sys.stderr.write(f"[Bridge] {_DroppingQueueHandler.dropped} log record(s) dropped\n")
+
+
+atexit.register(_shutdown)
+
+
+# ------------------------------------------------------------------------------
+# API
+# ------------------------------------------------------------------------------
+def log(msg):
+    """
+    Output debug log to stderr.
+    Important: stdout must not be used for debug messages,
+    because stdout is used for the MCP protocol.
+    The write happens on a background thread; this only enqueues.
+    """
+    _logger.info(msg)
+
+
+def debug(msg):
+    _logger.debug(msg)
+
+
+def error(msg):
+    """
+    Log an error and dump the recent frames (see set_dump_dir).
+    Only the ring is copied here; the file is written on the writer
+    thread. Nothing is dumped if no frame was recorded since the last dump.
+    """
+    global _frames_dumped
+    dump = None
+    if _dump_dir and _frames_seen != _frames_dumped:
+        _frames_dumped = _frames_seen
+        dump = (_dump_dir, list(_ring))
+    _logger.error(msg, extra={"dump": dump})
+
+
+def set_dump_dir(path: str | None):
+    """Directory for the frame dumps written by error()."""
+    global _dump_dir
+    _dump_dir = path
+
+
+def truncate(frame: bytes, limit: int = PAYLOAD_MAX_BYTES) -> str:
+    text = frame[:limit].decode("utf-8", "replace").rstrip("\r\n")
+    return text if len(frame) <= limit else f"{text}... ({len(frame)} bytes)"
+
+
+def trace_frame(direction: str, frame: bytes, kind: str | None):
+    """
+    Record a frame in the ring buffer and, at debug level, log it
+    (truncated, and only 1 in N for the message types in --log-sample).
+    At info level the ring keeps just the head of each frame.
+    kind is the method name, or None for a response.
+    """
+    global _frames_seen
+    debugging = _logger.isEnabledFor(logging.DEBUG)
+    _ring.append((time.time(), direction,
+                  frame[:RING_FRAME_BYTES if debugging else RING_HEAD_BYTES], len(frame)))
+    _frames_seen += 1
+    if not debugging:
+        return
+    kind = kind or "response"
+    every = _sampling.get(kind)
+    if every:
+        seen = _sample_counts.get(kind, 0)
+        _sample_counts[kind] = seen + 1
+        if seen % every:
+            return
+    _logger.debug(f"{direction} {truncate(frame)}")
+
+
+def dump_frames(directory: str, frames: list, reason: str) -> str | None:
+    """Write ring entries to <directory>/ai-unia-frames-<time>.log; returns the path."""
+    path = os.path.join(directory, time.strftime("ai-unia-frames-%Y%m%d-%H%M%S.log"))
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# {reason}\n")
+            for stamp, direction, head, size in frames:
+                when = time.strftime("%H:%M:%S", time.localtime(stamp)) + f".{int(stamp % 1 * 1000):03d}"
+                f.write(f"{when} {direction} {truncate(head, len(head))}"
+                        f"{'' if size <= len(head) else f' ... ({size} bytes)'}\n")
+    except OSError:
+        return None
+    return path
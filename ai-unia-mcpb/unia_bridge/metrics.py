@@ -0,0 +1,246 @@
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import namedtuple
+
+from .logger import log
+
+# ------------------------------------------------------------------------------
+# Cheap frame peek: id / method / params.name without a full JSON load
+# ------------------------------------------------------------------------------
+PEEK_PREFIX = 256   # Bytes scanned at the start (and end) of a frame
+
+_STR = rb'"((?:[^"\\]|\\.)*)"'
+_ID_RE = re.compile(rb'"id"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|"(?:[^"\\]|\\.)*"|null)')
+_METHOD_RE = re.compile(rb'"method"\s*:\s*' + _STR)
+_NAME_RE = re.compile(rb'"name"\s*:\s*' + _STR)
+_BODY_KEYS = (b'"params"', b'"result"', b'"error"')
+
+FrameInfo = namedtuple("FrameInfo", "id method tool")
+_NO_ID = object()
+
+
+def _decode_token(token: bytes):
+    # non-integer ids (1.5, 1e3) are kept as the JSON parser reads them
+    return int(token) if token.lstrip(b"-").isdigit() else json.loads(token)
+
+
+def _tail_id(frame: bytes):
+    # last "id" in the tail, accepted only if it is at the top level:
+    # exactly one closing brace may follow it
+    tail_at = max(0, len(frame) - PEEK_PREFIX)
+    last = None
+    for last in _ID_RE.finditer(frame, tail_at):
+        pass
+    if last is not None and frame.count(b"}", last.end()) == 1:
+        return last
+    return None
+
+
+def peek_frame(frame: bytes, complete: bool = True) -> FrameInfo:
+    """
+    Extract the top-level id, method and (for tools/call) params.name.
+
+    Only the first PEEK_PREFIX bytes are searched, up to the first body
+    key, so a large payload is never parsed. Serializers that put "id"
+    last (e.g. the JS SDK) are handled by checking the frame tail.
+    A request with "params" ahead of "method" is parsed in full.
+    id is _NO_ID when the frame has none (notification).
+    complete=False: frame is only the start of one, it has no tail.
+    """
+    head = frame[:PEEK_PREFIX]
+    body_at, body_key = len(head), None
+    for key in _BODY_KEYS:
+        pos = head.find(key)
+        if 0 <= pos < body_at:
+            body_at, body_key = pos, key
+
+    m = _ID_RE.search(head, 0, body_at)
+    if m is None and complete:
+        m = _tail_id(frame)
+    msg_id = _decode_token(m.group(1)) if m and m.group(1) != b"null" else (None if m else _NO_ID)
+
+    m = _METHOD_RE.search(head, 0, body_at)
+    method = m.group(1).decode("utf-8", "replace") if m else None
+    if method is None and body_key == b'"params"' and complete and b'"method"' in frame:
+        return _parse_frame(frame, msg_id)
+
+    tool = None
+    if method == "tools/call":
+        params_at = frame.find(b'"params"', body_at)
+        if params_at >= 0:
+            m = _NAME_RE.search(frame, params_at, params_at + PEEK_PREFIX)
+            tool = m.group(1).decode("utf-8", "replace") if m else None
+
+    return FrameInfo(msg_id, method, tool)
+
+
+def _parse_frame(frame: bytes, msg_id) -> FrameInfo:
+    """peek_frame the slow way, for frames whose method is not up front."""
+    try:
+        msg = json.loads(frame)
+    except ValueError:
+        return FrameInfo(msg_id, None, None)
+    if not isinstance(msg, dict):
+        return FrameInfo(msg_id, None, None)
+    method = msg.get("method") if isinstance(msg.get("method"), str) else None
+    params = msg.get("params")
+    tool = params.get("name") if method == "tools/call" and isinstance(params, dict) else None
+    return FrameInfo(msg.get("id", _NO_ID), method, tool if isinstance(tool, str) else None)
+
+
+def has_id(info: FrameInfo) -> bool:
+    return info.id is not _NO_ID
+
+
+# ------------------------------------------------------------------------------
+# Latency histogram (log-scale buckets, O(1) record)
+# ------------------------------------------------------------------------------
+class LatencyHistogram:
+    """Millisecond latencies in buckets growing by 2^(1/4) (~19% wide)."""
+
+    STEPS_PER_DOUBLING = 4
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        index = int(math.floor(math.log2(max(ms, 0.01)) * self.STEPS_PER_DOUBLING))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # upper edge of the bucket, capped by the real max
+                return min(2 ** ((index + 1) / self.STEPS_PER_DOUBLING), self.max_ms)
+        return self.max_ms
+
+
+# ------------------------------------------------------------------------------
+# Request / response correlation
+# ------------------------------------------------------------------------------
+class RequestTracker:
+    """
+    In-flight table of host requests keyed by JSON-RPC id, with latency
+    histograms per method and per tool (key "tools/call:<name>").
+    """
+
+    STALE_SEC = 30.0   # Outstanding longer than this is reported as stuck
+
+    def __init__(self):
+        self.inflight: dict = {}    # id -> (start, key)
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.queues: list = []      # objects with .name and .stats() (FrameQueue)
+        self.stages: list = []      # objects with .name, .snapshot() and .summary_lines()
+        self._activity = 0
+
+    @staticmethod
+    def _key(info: FrameInfo) -> str:
+        return f"{info.method}:{info.tool}" if info.tool else info.method
+
+    def on_request(self, frame: bytes) -> FrameInfo:
+        """Host -> Unity frame."""
+        info = peek_frame(frame)
+        if info.method and has_id(info):
+            self.inflight[info.id] = (time.monotonic(), self._key(info))
+        return info
+
+    def on_response(self, frame: bytes) -> FrameInfo:
+        """Unity -> host frame."""
+        info = peek_frame(frame)
+        if info.method is None and has_id(info):
+            entry = self.inflight.pop(info.id, None)
+            if entry is not None:
+                start, key = entry
+                self.histograms.setdefault(key, LatencyHistogram()).record(
+                    (time.monotonic() - start) * 1000.0)
+                self._activity += 1
+        return info
+
+    def watch_queue(self, queue):
+        """Include a queue's depth and overflow counters in the snapshot."""
+        self.queues.append(queue)
+
+    def watch_stage(self, stage):
+        """Include a bridge stage's own counters (e.g. the action scheduler)."""
+        self.stages.append(stage)
+
+    def drop_inflight(self) -> list:
+        """Forget every outstanding request (connection lost); returns their ids."""
+        ids = list(self.inflight)
+        self.inflight.clear()
+        return ids
+
+    def outstanding(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for _, key in self.inflight.values():
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        stuck = [{"id": req_id, "key": key, "age_sec": round(now - start, 1)}
+                 for req_id, (start, key) in self.inflight.items()
+                 if now - start > self.STALE_SEC]
+        return {
+            "outstanding": self.outstanding(),
+            "stuck": stuck,
+            "latency_ms": {
+                key: {"count": h.count,
+                      "mean": round(h.total_ms / h.count, 2),
+                      "p50": round(h.percentile(50), 2),
+                      "p95": round(h.percentile(95), 2),
+                      "p99": round(h.percentile(99), 2),
+                      "max": round(h.max_ms, 2)}
+                for key, h in sorted(self.histograms.items())},
+            "queues": {q.name: q.stats() for q in self.queues},
+            "stages": {stage.name: stage.snapshot() for stage in self.stages},
+        }
+
+    def summary_lines(self) -> list[str]:
+        snap = self.snapshot()
+        lines = [f"Stats: {len(self.inflight)} outstanding {snap['outstanding']}"]
+        for key, s in snap["latency_ms"].items():
+            lines.append(f"  {key:<32} n={s['count']:<6} p50={s['p50']:.1f}ms "
+                         f"p95={s['p95']:.1f}ms p99={s['p99']:.1f}ms max={s['max']:.1f}ms")
+        for name, q in snap["queues"].items():
+            lines.append(f"  queue {name:<26} depth={q['depth']} peak={q['peak']} "
+                         f"blocked={q['blocked']} rejected={q['rejected']} dropped={q['dropped']}")
+        for stage in self.stages:
+            lines.extend(stage.summary_lines())
+        for s in snap["stuck"]:
+            lines.append(f"  no response yet: id={s['id']} {s['key']} ({s['age_sec']}s)")
+        return lines
+
+    async def report_periodically(self, interval_sec: float, stats_file: str | None = None):
+        """stderr summary (and JSON snapshot file) whenever there was traffic."""
+        last_activity = 0
+        while True:
+            await asyncio.sleep(interval_sec)
+            if self._activity == last_activity and not self.inflight:
+                continue
+            last_activity = self._activity
+            for line in self.summary_lines():
+                log(line)
+            if stats_file:
+                try:
+                    tmp_path = stats_file + ".tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+                    os.replace(tmp_path, stats_file)
+                except OSError as e:
+                    log(f"Could not write stats file: {e}")
@@ -0,0 +1,346 @@
+import asyncio
+import itertools
+import json
+import sys
+import time
+
+from .handshake import dumps_line
+from .logger import log
+from .readiness import connect_when_ready
+from .relay import FrameReader
+
+# ------------------------------------------------------------------------------
+# Multiplexer settings
+# ------------------------------------------------------------------------------
+UPSTREAM_CONNECTIONS = 2          # Unity connections shared by all clients
+CLIENT_WRITE_BUFFER_MAX = 16 * 1024 * 1024  # A client this far behind is dropped
+NOTIFY_DEDUP_SEC = 1.0            # Same list_changed from several upstreams -> sent once
+PROTOCOL_VERSION = "2024-11-05"
+
+
+def parse_endpoint(text: str):
+    """'host:port' -> ("tcp", host, port); 'unix:/path' -> ("unix", path, None)."""
+    if text.startswith("unix:"):
+        return "unix", text[len("unix:"):], None
+    host, _, port = text.rpartition(":")
+    return "tcp", host or "127.0.0.1", int(port)
+
+
+def error_frame(req_id, code: int, message: str) -> bytes:
+    return dumps_line({"jsonrpc": "2.0", "id": req_id,
+                       "error": {"code": code, "message": message}})
+
+
+class MuxClient:
+    """One downstream MCP client connected to the multiplexer."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.id = next(self._ids)
+        self.writer = writer
+        self.routes: set[int] = set()   # mux ids this client is waiting on
+
+    def send(self, frame: bytes) -> bool:
+        if self.writer.is_closing():
+            return False
+        if self.writer.transport.get_write_buffer_size() > CLIENT_WRITE_BUFFER_MAX:
+            log(f"Mux client #{self.id} is not reading; disconnecting it")
+            self.writer.close()
+            return False
+        self.writer.write(frame)
+        return True
+
+
+class Upstream:
+    """One initialized MCP session on Unity's TCP server."""
+
+    def __init__(self, index: int, reader, writer):
+        self.index = index
+        self.reader = reader
+        self.writer = writer
+        self.inflight = 0
+        self.alive = True
+
+
+class Multiplexer:
+    """
+    Serves many MCP clients over a few Unity connections.
+
+    Each upstream connection is initialized once by the multiplexer; the
+    clients' `initialize` / `ping` are answered locally. Request ids are
+    rewritten to mux-unique ids and mapped back on the response, so
+    clients never see each other's traffic. Progress tokens are rewritten
+    the same way (two clients may both use token 1), and progress
+    notifications go back to the client that asked, under its own token.
+    Other Unity notifications go to every client.
+    A */list_changed arrives once per upstream session and is passed on
+    once; any other notification is passed on every time.
+    """
+
+    def __init__(self, upstream_host: str, upstream_port: int,
+                 connections: int = UPSTREAM_CONNECTIONS):
+        self.upstream_host = upstream_host
+        self.upstream_port = upstream_port
+        self.connections = connections
+        self.upstreams: list[Upstream] = []
+        self.clients: set[MuxClient] = set()
+        self.init_result = None
+        self._next_id = itertools.count(1)
+        # mux id -> (client, original id, upstream, mux progress token)
+        self._routes: dict[int, tuple[MuxClient, object, Upstream, object]] = {}
+        self._progress: dict[str, tuple[MuxClient, object]] = {}   # mux token -> client, its token
+        self._recent_notify: dict[bytes, float] = {}
+        self._server = None
+        self._tasks: list[asyncio.Task] = []
+
+    # --- upstream side ---
+    async def connect(self, process=None, timeout: float = 60.0):
+        for index in range(self.connections):
+            reader, writer = await connect_when_ready(
+                self.upstream_host, self.upstream_port,
+                process=process, timeout=timeout, limit=256 * 1024)
+            upstream = Upstream(index, reader, writer)
+            await self._initialize_upstream(upstream)
+            self.upstreams.append(upstream)
+            self._tasks.append(asyncio.create_task(self._read_upstream(upstream)))
+        log(f"Mux connected {len(self.upstreams)} upstream session(s)")
+
+    async def _initialize_upstream(self, upstream: Upstream):
+        upstream.writer.write(dumps_line({
+            "jsonrpc": "2.0", "id": f"mux-init-{upstream.index}", "method": "initialize",
+            "params": {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                       "clientInfo": {"name": "ai-unia-mux", "version": "0.0.1"}}}))
+        await upstream.writer.drain()
+        while True:
+            line = await upstream.reader.readline()
+            if not line:
+                raise ConnectionError("Unity closed the connection during initialize")
+            msg = json.loads(line)
+            if msg.get("id") == f"mux-init-{upstream.index}":
+                break
+        if "result" not in msg:
+            raise ConnectionError(f"Unity rejected initialize: {msg.get('error')}")
+        self.init_result = msg["result"]
+        upstream.writer.write(dumps_line({"jsonrpc": "2.0", "method": "notifications/initialized"}))
+        await upstream.writer.drain()
+
+    def _pick_upstream(self) -> Upstream | None:
+        alive = [u for u in self.upstreams if u.alive]
+        return min(alive, key=lambda u: u.inflight) if alive else None
+
+    async def _read_upstream(self, upstream: Upstream):
+        frames_in = FrameReader(upstream.reader)
+        try:
+            while True:
+                frames = await frames_in.read_frames()
+                if not frames:
+                    break
+                for frame in frames:
+                    self._on_upstream_frame(upstream, frame)
+        except Exception as e:
+            log(f"Mux upstream #{upstream.index} error: {e}")
+        finally:
+            upstream.alive = False
+            log(f"Mux upstream #{upstream.index} closed")
+            self._fail_routes(upstream)
+            if not any(u.alive for u in self.upstreams):
+                self.close()
+
+    def _on_upstream_frame(self, upstream: Upstream, frame: bytes):
+        try:
+            msg = json.loads(frame)
+        except ValueError:
+            log(f"Mux: dropping malformed frame from Unity ({len(frame)} bytes)")
+            return
+        if not isinstance(msg, dict):
+            return
+
+        if "method" not in msg:
+            # response to a client request
+            route = self._end_route(msg.get("id"))
+            if route is None:
+                return
+            client, original_id, _, _ = route
+            msg["id"] = original_id
+            client.send(dumps_line(msg))
+            return
+
+        if "id" in msg:
+            # server -> client request: answer it here
+            reply = ({"jsonrpc": "2.0", "id": msg["id"], "result": {}}
+                     if msg["method"] == "ping" else
+                     {"jsonrpc": "2.0", "id": msg["id"],
+                      "error": {"code": -32601, "message": "Method not supported by multiplexer"}})
+            upstream.writer.write(dumps_line(reply))
+            return
+
+        params = msg.get("params") or {}
+        progress = self._progress.get(params.get("progressToken")) \
+            if isinstance(params.get("progressToken"), str) else None
+        if progress is not None:
+            client, params["progressToken"] = progress
+            client.send(dumps_line(msg))
+            return
+
+        if str(msg["method"]).endswith("/list_changed"):
+            # every upstream session announces the same change
+            now = time.monotonic()
+            if now - self._recent_notify.get(frame, -NOTIFY_DEDUP_SEC) < NOTIFY_DEDUP_SEC:
+                return
+            self._recent_notify = {f: t for f, t in self._recent_notify.items()
+                                   if now - t < NOTIFY_DEDUP_SEC}
+            self._recent_notify[frame] = now
+        for client in list(self.clients):
+            client.send(frame)
+
+    def _end_route(self, mux_id):
+        """Forget a request (answered, cancelled or lost): its route and progress token."""
+        route = self._routes.pop(mux_id, None)
+        if route is None:
+            return None
+        client, _, upstream, token = route
+        client.routes.discard(mux_id)
+        upstream.inflight -= 1
+        if token is not None:
+            self._progress.pop(token, None)
+        return route
+
+    def _fail_routes(self, upstream: Upstream):
+        for mux_id, (client, original_id, owner, _) in list(self._routes.items()):
+            if owner is upstream:
+                self._end_route(mux_id)
+                client.send(error_frame(original_id, -32603, "Unity connection lost"))
+
+    # --- client side ---
+    async def serve(self, endpoint: str):
+        kind, host, port = parse_endpoint(endpoint)
+        if kind == "unix":
+            self._server = await asyncio.start_unix_server(self._handle_client, path=host)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        log(f"Mux listening on {endpoint}")
+
+    async def _handle_client(self, reader, writer):
+        client = MuxClient(writer)
+        self.clients.add(client)
+        log(f"Mux client #{client.id} connected ({len(self.clients)} total)")
+        frames_in = FrameReader(reader)
+        try:
+            while True:
+                frames = await frames_in.read_frames()
+                if not frames:
+                    break
+                for frame in frames:
+                    self._on_client_frame(client, frame)
+                for upstream in self.upstreams:
+                    if upstream.alive:
+                        await upstream.writer.drain()
+        except Exception as e:
+            log(f"Mux client #{client.id} error: {e}")
+        finally:
+            self._drop_client(client)
+            if not writer.is_closing():
+                writer.close()
+            log(f"Mux client #{client.id} disconnected ({len(self.clients)} left)")
+
+    def _on_client_frame(self, client: MuxClient, frame: bytes):
+        try:
+            msg = json.loads(frame)
+        except ValueError:
+            client.send(error_frame(None, -32700, "Parse error"))
+            return
+        if not isinstance(msg, dict) or "method" not in msg:
+            return  # responses to server requests are answered by the mux itself
+
+        method = msg["method"]
+        if "id" not in msg:
+            if method == "notifications/initialized":
+                return
+            if method == "notifications/cancelled":
+                self._forward_cancel(client, msg)
+                return
+            upstream = self._pick_upstream()
+            if upstream:
+                upstream.writer.write(frame)
+            return
+
+        if method == "initialize":
+            client.send(dumps_line({"jsonrpc": "2.0", "id": msg["id"], "result": self.init_result}))
+            return
+        if method == "ping":
+            client.send(dumps_line({"jsonrpc": "2.0", "id": msg["id"], "result": {}}))
+            return
+
+        upstream = self._pick_upstream()
+        if upstream is None:
+            client.send(error_frame(msg["id"], -32603, "Unity connection lost"))
+            return
+        mux_id = next(self._next_id)
+        meta = (msg.get("params") or {}).get("_meta")
+        token = None
+        if isinstance(meta, dict) and meta.get("progressToken") is not None:
+            token = f"mux-progress-{mux_id}"
+            self._progress[token] = (client, meta["progressToken"])
+            meta["progressToken"] = token
+        self._routes[mux_id] = (client, msg["id"], upstream, token)
+        client.routes.add(mux_id)
+        upstream.inflight += 1
+        msg["id"] = mux_id
+        upstream.writer.write(dumps_line(msg))
+
+    def _forward_cancel(self, client: MuxClient, msg: dict):
+        params = msg.get("params") or {}
+        for mux_id in client.routes:
+            _, original_id, upstream, _ = self._routes[mux_id]
+            if original_id == params.get("requestId"):
+                params["requestId"] = mux_id
+                upstream.writer.write(dumps_line(msg))
+                # the client no longer expects a response for it
+                self._end_route(mux_id)
+                return
+
+    def _drop_client(self, client: MuxClient):
+        self.clients.discard(client)
+        for mux_id in list(client.routes):
+            _, _, upstream, _ = self._end_route(mux_id)
+            if upstream.alive:
+                # nobody is waiting for this answer anymore
+                upstream.writer.write(dumps_line({
+                    "jsonrpc": "2.0", "method": "notifications/cancelled",
+                    "params": {"requestId": mux_id, "reason": "client disconnected"}}))
+
+    def close(self):
+        if self._server:
+            self._server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        for upstream in self.upstreams:
+            if not upstream.writer.is_closing():
+                upstream.writer.close()
+        for task in self._tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    async def wait_closed(self):
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def run_mux(listen: str, upstream: str, connections: int = UPSTREAM_CONNECTIONS):
+    _, host, port = parse_endpoint(upstream)
+    mux = Multiplexer(host, port, connections)
+    await mux.connect()
+    await mux.serve(listen)
+    await mux.wait_closed()
+
+
+if __name__ == "__main__":
+    # python -m unia_bridge.mux LISTEN UPSTREAM [CONNECTIONS]
+    #   e.g. python -m unia_bridge.mux 127.0.0.1:8081 127.0.0.1:8080 2
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(run_mux(sys.argv[1], sys.argv[2],
+                            int(sys.argv[3]) if len(sys.argv) >= 4 else UPSTREAM_CONNECTIONS))
+    except KeyboardInterrupt:
+        pass
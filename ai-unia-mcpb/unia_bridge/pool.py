@@ -0,0 +1,637 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from contextlib import AsyncExitStack
+
+from . import framing
+from .handshake import BRIDGE_INIT_ID, dumps_line
+from .local_socket import default_endpoint, describe
+from .logger import debug, error, log
+from .metrics import has_id, peek_frame
+from .readiness import LogMarkerWatcher, UnityStartupError, connect_when_ready
+from .relay import FrameReader
+
+# ------------------------------------------------------------------------------
+# Pool settings
+# ------------------------------------------------------------------------------
+START_TIMEOUT_SEC = 60
+START_ATTEMPTS = 3              # A replica that fails to start this often in a row is dropped
+START_BACKOFF_SEC = 2.0
+PING_SEC = 10                   # Health ping per replica
+PING_TIMEOUT_SEC = 5
+PING_MISSES = 3                 # Unanswered pings in a row before the replica is restarted
+SCALE_CHECK_SEC = 1.0
+SCALE_UP_OUTSTANDING = 4        # Average outstanding requests per replica that adds one
+SCALE_DOWN_IDLE_SEC = 120       # An avatar idle this long gives back a replica
+PORT_SCAN = 200                 # Ports tried from the base port
+READ_LIMIT = 256 * 1024
+POOL_ID_PREFIX = "unia-pool-"   # Ids of the pool's own initialize / ping
+MAX_SERVER_REQUESTS = 1024      # Unity -> host request ids remembered for routing the answer
+
+ROUTING_POLICIES = ("least", "sticky")
+
+
+def parse_sizes(text: str) -> dict:
+    """Replica counts: "mikuru=1-3,asuka=1" -> {"mikuru": (1, 3), "asuka": (1, 1)}"""
+    sizes = {}
+    for item in text.split(","):
+        name, _, size = item.strip().partition("=")
+        if not name or not size:
+            continue
+        low, _, high = size.partition("-")
+        try:
+            sizes[name.strip()] = (int(low), int(high or low))
+        except ValueError:
+            log(f"Ignoring pool size {item!r}")
+    return sizes
+
+
+def allocate_port(host: str, start: int, used: set) -> int:
+    """First port from start that no replica uses and nothing else listens on."""
+    for port in range(start, start + PORT_SCAN):
+        if port in used:
+            continue
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            try:
+                probe.bind((host, port))
+            except OSError:
+                continue
+        return port
+    raise UnityStartupError(f"No free port in {start}-{start + PORT_SCAN - 1}")
+
+
+# ------------------------------------------------------------------------------
+# Avatars and replicas
+# ------------------------------------------------------------------------------
+class Avatar:
+    """One avatar (a Unity executable + arguments) and how many replicas of it may run."""
+
+    def __init__(self, name: str, exe: str, args: list | None = None,
+                 min_replicas: int = 1, max_replicas: int = 1):
+        self.name = name
+        self.exe = exe
+        self.args = list(args or [])
+        self.min_replicas = min_replicas
+        self.max_replicas = max(min_replicas, max_replicas)
+        self.next_index = 0
+        self.last_busy = time.monotonic()
+
+
+class Replica:
+    """One Unity process of an avatar, with its own port, log file and work dir."""
+
+    def __init__(self, avatar: Avatar, index: int, port: int, work_dir: str):
+        self.avatar = avatar
+        self.name = f"{avatar.name}-{index}"
+        self.port = port
+        self.work_dir = work_dir
+        self.log_file = os.path.join(work_dir, "ai-unity-avatar.log")
+        self.local: str | None = None
+        self.state = "starting"   # starting -> ready -> (draining) -> stopped
+        self.process = None
+        self.stack = AsyncExitStack()
+        self.reader = None
+        self.writer = None
+        self.frames: FrameReader | None = None
+        self.outstanding: set = set()
+        self.requests = 0
+        self.restarts = 0
+        self.failures = 0         # failed starts in a row
+        self.ping_id = None
+        self.pong = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def stats(self) -> dict:
+        return {"avatar": self.avatar.name, "port": self.port, "endpoint": self.local,
+                "pid": self.process.pid if self.process is not None else None,
+                "state": self.state, "outstanding": len(self.outstanding),
+                "requests": self.requests, "restarts": self.restarts}
+
+
+# ------------------------------------------------------------------------------
+# Pool
+# ------------------------------------------------------------------------------
+class UnityPool:
+    """
+    Several Unity processes behind one bridge, standing in for the
+    UnityConnector: connect() returns a (reader, writer) pair like a
+    single Unity connection, and each frame written to it goes to one
+    replica.
+
+    - requests go to the avatar named in params._meta.avatar (else the
+      default avatar), and among its ready replicas to the one with the
+      fewest outstanding requests ("least"), or always to the same one
+      while it is healthy ("sticky", the session stays on one Unity)
+    - cancels follow their request; other notifications go to every replica
+    - initialize goes to every replica; only one answer reaches the host,
+      and replicas started later get the same handshake from the pool
+    - each replica is pinged; one that stops answering, exits or drops its
+      connection is restarted (its outstanding requests get an error)
+    - an avatar whose replicas average SCALE_UP_OUTSTANDING outstanding
+      requests gets another (up to max); one idle for SCALE_DOWN_IDLE_SEC
+      gives one back (down to min) after it has drained
+
+    process_context(exe, args) launches Unity (unity_process_context).
+    """
+
+    name = "pool"
+
+    def __init__(self, avatars: list[Avatar], process_context, work_dir: str,
+                 host: str = "127.0.0.1", base_port: int = 8100, routing: str = "least",
+                 default_avatar: str | None = None, local_endpoints: bool = True,
+                 base_args: list | None = None):
+        self.avatars = {avatar.name: avatar for avatar in avatars}
+        self.process_context = process_context
+        self.work_dir = os.path.join(work_dir, "pool")
+        self.host = host
+        self.base_port = base_port
+        self.routing = routing if routing in ROUTING_POLICIES else "least"
+        self.default_avatar = default_avatar if default_avatar in self.avatars else avatars[0].name
+        self.local_endpoints = local_endpoints
+        self.base_args = list(base_args or [])
+        self.replicas: list[Replica] = []
+        self.connects = 0
+        self.closed = False
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: _PoolWriter | None = None
+        self._routes: dict = {}            # request id -> replica
+        self._server_requests: dict = {}   # Unity -> host request id -> replica
+        self._sticky: dict = {}            # avatar name -> replica
+        self._waiting: list = []           # (avatar, frame, request id) until a replica is ready
+        self._init_msg = None              # host initialize, for replicas started later
+        self._init_pending = None          # its id, while no replica has it yet
+        self._initialized = False
+        self._ready = asyncio.Event()
+        self._flowing = asyncio.Event()    # cleared while the bridge's reader is over its limit
+        self._flowing.set()
+        self._task_scale: asyncio.Task | None = None
+        self._state_file = os.path.join(self.work_dir, "pool.json")
+        self._last_state = None
+        self.restarts = 0
+        self.scaled_up = 0
+        self.scaled_down = 0
+
+    # --- connector interface ---
+    async def connect(self):
+        self.reader = asyncio.StreamReader(limit=READ_LIMIT)
+        self.writer = _PoolWriter(self)
+        # the reader pauses "its transport" (the replica reads) when the
+        # bridge falls behind, like a socket's StreamReaderProtocol would
+        self.reader.set_transport(self.writer)
+        self._flowing.set()
+        if self._task_scale is None:
+            os.makedirs(self.work_dir, exist_ok=True)
+            self._task_scale = asyncio.create_task(self._autoscale())
+        for avatar in self.avatars.values():
+            while self._group(avatar) < avatar.min_replicas:
+                self._add(avatar)
+        while not any(r.state == "ready" for r in self.replicas):
+            starting = [r.task for r in self.replicas if not r.task.done()]
+            if not starting:
+                raise UnityStartupError("No Unity replica of the pool started")
+            self._ready.clear()
+            waiter = asyncio.create_task(self._ready.wait())
+            await asyncio.wait([waiter] + starting, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+        self.connects += 1
+        return self.reader, self.writer
+
+    def unity_pid(self) -> int | None:
+        return None   # each replica is health-checked by the pool
+
+    async def restart_unity(self):
+        for replica in self.replicas:
+            if replica.writer is not None:
+                replica.writer.close()
+
+    async def close(self, timeout: float = 5.0):
+        self.closed = True
+        if self._task_scale is not None:
+            self._task_scale.cancel()
+        tasks = [r.task for r in self.replicas if r.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.replicas:
+            log(f"Stopping {len(self.replicas)} Unity replica(s)")
+        await asyncio.gather(*(self._stop(r) for r in self.replicas), return_exceptions=True)
+        self._write_state()
+
+    # --- replicas ---
+    def _group(self, avatar: Avatar) -> int:
+        return sum(1 for r in self.replicas if r.avatar is avatar and r.state != "draining")
+
+    def _add(self, avatar: Avatar) -> Replica:
+        port = allocate_port(self.host, self.base_port, {r.port for r in self.replicas})
+        index = avatar.next_index
+        avatar.next_index += 1
+        work_dir = os.path.join(self.work_dir, f"{avatar.name}-{index}")
+        os.makedirs(work_dir, exist_ok=True)
+        replica = Replica(avatar, index, port, work_dir)
+        self.replicas.append(replica)
+        replica.task = asyncio.create_task(self._run(replica))
+        self._write_state()
+        return replica
+
+    async def _run(self, replica: Replica):
+        """Start, serve, restart on failure; until drained, dropped or closed."""
+        try:
+            while not self.closed:
+                try:
+                    await self._start(replica)
+                except (UnityStartupError, ConnectionError, OSError, asyncio.TimeoutError, ValueError) as e:
+                    replica.failures += 1
+                    error(f"Replica {replica.name} failed to start: {e}")
+                    await self._stop(replica)
+                    if replica.failures >= START_ATTEMPTS:
+                        error(f"Giving up on replica {replica.name}")
+                        break
+                    await asyncio.sleep(START_BACKOFF_SEC * replica.failures)
+                    continue
+                replica.failures = 0
+                reason = await self._serve(replica)
+                draining = replica.state == "draining"
+                replica.state = "stopped"   # nothing is routed to it while it stops
+                self._write_state()
+                self._fail_outstanding(replica, reason)
+                await self._stop(replica)
+                if draining:
+                    log(f"Replica {replica.name} stopped ({reason})")
+                    break
+                replica.restarts += 1
+                self.restarts += 1
+                error(f"Restarting replica {replica.name}: {reason}")
+        finally:
+            replica.state = "stopped"
+            self._fail_outstanding(replica, "replica stopped")
+            if not self.closed:
+                await self._stop(replica)   # e.g. drained while still starting
+            if replica in self.replicas and not self.closed:
+                self.replicas.remove(replica)
+                self._write_state()
+                if not any(r.state in ("starting", "ready") for r in self.replicas):
+                    self._end("no Unity replica left")
+
+    async def _start(self, replica: Replica):
+        replica.state = "starting"
+        self._write_state()
+        # pipe names are global: one per bridge and replica
+        replica.local = (default_endpoint(replica.work_dir, f"ai-unia-mcp-{os.getpid()}-{replica.name}")
+                         if self.local_endpoints else None)
+        args = ["-logFile", replica.log_file, "-mcpPort", str(replica.port)]
+        if replica.local:
+            args += ["-mcpPipe", replica.local]
+        watcher = LogMarkerWatcher(replica.log_file)   # before the spawn: Unity may be quick
+        replica.process = await replica.stack.enter_async_context(
+            self.process_context(replica.avatar.exe, replica.avatar.args + args + self.base_args))
+        replica.reader, replica.writer = await connect_when_ready(
+            self.host, replica.port, process=replica.process, watcher=watcher,
+            timeout=START_TIMEOUT_SEC, limit=READ_LIMIT, local=replica.local)
+        replica.frames = FrameReader(replica.reader)
+        if self._init_msg is not None:
+            await asyncio.wait_for(self._handshake(replica), START_TIMEOUT_SEC)
+        replica.state = "ready"
+        log(f"Replica {replica.name} ready on {describe(replica.writer)}")
+        self._write_state()
+        self._ready.set()
+        self._flush_waiting()
+
+    async def _handshake(self, replica: Replica):
+        """The host's initialize (its own id if still unanswered), then initialized."""
+        request_id = self._init_pending or f"{POOL_ID_PREFIX}init-{replica.name}"
+        self._init_pending = None
+        answered = False
+        try:
+            replica.writer.write(dumps_line(dict(self._init_msg, id=request_id)))
+            await replica.writer.drain()
+            while not answered:
+                frames = await replica.frames.read_frames()
+                if not frames:
+                    raise ConnectionError("Unity closed the connection during initialize")
+                for frame in frames:
+                    info = peek_frame(frame)
+                    if info.method is None and has_id(info) and info.id == request_id:
+                        answered = True
+                        if not str(request_id).startswith(POOL_ID_PREFIX):
+                            self._feed(frame)
+                    else:
+                        self._feed(frame)
+        finally:
+            if not answered and not str(request_id).startswith(POOL_ID_PREFIX):
+                self._init_pending = request_id   # the next replica to start answers it
+        if self._initialized:
+            replica.writer.write(dumps_line({"jsonrpc": "2.0", "method": "notifications/initialized"}))
+
+    async def _serve(self, replica: Replica) -> str:
+        """Relay the replica's frames until it is lost; returns why."""
+        tasks = [asyncio.create_task(self._read(replica)), asyncio.create_task(self._ping(replica))]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            task = done.pop()
+            return task.result() if task.exception() is None else str(task.exception())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _read(self, replica: Replica) -> str:
+        while True:
+            await self._flowing.wait()   # the bridge has not taken what was fed yet
+            frames = await replica.frames.read_frames()
+            if not frames:
+                return "connection lost"
+            out = []
+            for frame in frames:
+                info = peek_frame(frame)
+                if info.method is None and has_id(info):
+                    if isinstance(info.id, str) and info.id.startswith(POOL_ID_PREFIX):
+                        if info.id == replica.ping_id:
+                            replica.pong.set()
+                        continue   # the pool's own ping / initialize
+                    replica.outstanding.discard(info.id)
+                    self._routes.pop(info.id, None)
+                elif info.method is not None and has_id(info):
+                    # a request from Unity: the host's answer goes back to this replica
+                    if len(self._server_requests) >= MAX_SERVER_REQUESTS:
+                        self._server_requests.pop(next(iter(self._server_requests)))
+                    self._server_requests[info.id] = replica
+                out.append(frame)
+            if out:
+                self._feed(b"".join(out))
+            if replica.state == "draining" and not replica.outstanding:
+                return "scaled down"
+
+    async def _ping(self, replica: Replica) -> str:
+        misses = 0
+        count = 0
+        while True:
+            await asyncio.sleep(PING_SEC)
+            if replica.process is not None and replica.process.returncode is not None:
+                return f"process exited (code {replica.process.returncode})"
+            count += 1
+            replica.ping_id = f"{POOL_ID_PREFIX}ping-{replica.name}-{count}"
+            replica.pong.clear()
+            replica.writer.write(dumps_line({"jsonrpc": "2.0", "id": replica.ping_id, "method": "ping"}))
+            try:
+                await asyncio.wait_for(replica.pong.wait(), PING_TIMEOUT_SEC)
+                misses = 0
+            except asyncio.TimeoutError:
+                if not self._flowing.is_set():
+                    continue   # the answer waits behind a host that is not reading
+                misses += 1
+                debug(f"Replica {replica.name} missed ping {misses}/{PING_MISSES}")
+                if misses >= PING_MISSES:
+                    return f"no answer to {misses} pings"
+
+    async def _stop(self, replica: Replica):
+        if replica.writer is not None:
+            replica.writer.close()
+            replica.writer = None
+        try:
+            await replica.stack.aclose()   # unity_process_context stops the process
+        finally:
+            replica.stack = AsyncExitStack()
+            replica.process = None
+
+    def _fail_outstanding(self, replica: Replica, reason: str):
+        for request_id in list(replica.outstanding):
+            self._routes.pop(request_id, None)
+            if request_id != BRIDGE_INIT_ID:
+                self._feed(framing.error_frame(
+                    request_id, -32000, f"Unity replica {replica.name} lost before the request completed ({reason})"))
+        replica.outstanding.clear()
+        for avatar, replica_ in list(self._sticky.items()):
+            if replica_ is replica:
+                del self._sticky[avatar]
+
+    # --- scaling ---
+    async def _autoscale(self):
+        while True:
+            await asyncio.sleep(SCALE_CHECK_SEC)
+            now = time.monotonic()
+            for avatar in self.avatars.values():
+                group = [r for r in self.replicas if r.avatar is avatar and r.state != "draining"]
+                ready = [r for r in group if r.state == "ready"]
+                load = sum(len(r.outstanding) for r in group) \
+                    + sum(1 for waiting in self._waiting if waiting[0] is avatar)
+                if load:
+                    avatar.last_busy = now
+                if len(group) < avatar.min_replicas:
+                    self._add(avatar)
+                elif (ready and len(ready) == len(group) and len(group) < avatar.max_replicas
+                        and load / len(ready) >= SCALE_UP_OUTSTANDING):
+                    log(f"Scaling up {avatar.name}: {load} outstanding on {len(ready)} replica(s)")
+                    self.scaled_up += 1
+                    self._add(avatar)
+                elif len(group) > avatar.min_replicas and now - avatar.last_busy >= SCALE_DOWN_IDLE_SEC:
+                    replica = min(ready or group, key=lambda r: (len(r.outstanding), -r.avatar.next_index))
+                    self._drain(replica)
+                    avatar.last_busy = now
+            self._write_state()
+
+    def _drain(self, replica: Replica):
+        log(f"Scaling down {replica.avatar.name}: stopping replica {replica.name}")
+        self.scaled_down += 1
+        replica.state = "draining"
+        if not replica.outstanding:
+            if replica.writer is not None:
+                replica.writer.close()   # _read sees EOF and the replica stops
+            elif replica.task is not None:
+                replica.task.cancel()   # still starting
+
+    # --- host -> Unity ---
+    def send(self, data: bytes):
+        for frame in data.split(b"\n"):
+            if not frame.strip():
+                continue
+            frame += b"\n"
+            info = peek_frame(frame)
+            if info.method is None:
+                if has_id(info):
+                    # the host answering a request from Unity
+                    replica = self._server_requests.pop(info.id, None) or self._any_ready()
+                    if replica is not None and replica.writer is not None:
+                        replica.writer.write(frame)
+            elif not has_id(info):
+                self._notify(frame, info.method)
+            elif info.method == "initialize":
+                self._initialize(frame, info.id)
+            else:
+                self._request(frame, info.id)
+
+    def _any_ready(self) -> Replica | None:
+        return next((r for r in self.replicas if r.state == "ready"), None)
+
+    def _avatar_of(self, frame: bytes) -> Avatar | None:
+        name = self.default_avatar
+        if b'"_meta"' in frame and b'"avatar"' in frame:
+            try:
+                meta = framing.loads(frame)["params"].get("_meta") or {}
+                name = meta.get("avatar") or name
+            except (ValueError, KeyError, TypeError, AttributeError):
+                pass
+        return self.avatars.get(name)
+
+    def _pick(self, avatar: Avatar) -> Replica | None:
+        ready = [r for r in self.replicas if r.avatar is avatar and r.state == "ready"]
+        if not ready:
+            return None
+        if self.routing == "sticky":
+            pinned = self._sticky.get(avatar.name)
+            if pinned in ready:
+                return pinned
+        choice = min(ready, key=lambda r: (len(r.outstanding), r.requests))
+        if self.routing == "sticky":
+            debug(f"Session pinned to replica {choice.name}")
+            self._sticky[avatar.name] = choice
+        return choice
+
+    def _request(self, frame: bytes, request_id):
+        avatar = self._avatar_of(frame)
+        if avatar is None:
+            self._feed(framing.error_frame(request_id, -32602, "Unknown avatar"))
+            return
+        replica = self._pick(avatar)
+        if replica is None:
+            self._waiting.append((avatar, frame, request_id))
+            return
+        self._send_to(replica, frame, request_id)
+
+    def _send_to(self, replica: Replica, frame: bytes, request_id):
+        if replica.writer is None:   # lost meanwhile: wait for a ready replica
+            self._waiting.append((replica.avatar, frame, request_id))
+            return
+        replica.outstanding.add(request_id)
+        replica.requests += 1
+        self._routes[request_id] = replica
+        replica.writer.write(frame)
+
+    def _flush_waiting(self):
+        waiting, self._waiting = self._waiting, []
+        for avatar, frame, request_id in waiting:
+            replica = self._pick(avatar)
+            if replica is None:
+                self._waiting.append((avatar, frame, request_id))
+            else:
+                self._send_to(replica, frame, request_id)
+
+    def _initialize(self, frame: bytes, request_id):
+        self._init_msg = framing.loads(frame)
+        ready = [r for r in self.replicas if r.state == "ready"]
+        if not ready:
+            self._init_pending = request_id   # the first replica to start answers it
+            return
+        primary = self._pick(self.avatars[self.default_avatar]) or ready[0]
+        for replica in ready:
+            if replica is primary:
+                self._send_to(replica, frame, request_id)
+            elif replica.writer is not None:
+                replica.writer.write(dumps_line(dict(self._init_msg, id=f"{POOL_ID_PREFIX}init-{replica.name}")))
+
+    def _notify(self, frame: bytes, method: str):
+        if method == "notifications/cancelled":
+            try:
+                request_id = (framing.loads(frame).get("params") or {}).get("requestId")
+            except (ValueError, AttributeError):
+                return
+            replica = self._routes.get(request_id) if isinstance(request_id, (str, int)) else None
+            if replica is not None and replica.writer is not None:
+                replica.writer.write(frame)
+            else:
+                self._waiting = [w for w in self._waiting if w[2] != request_id]
+            return
+        if method == "notifications/initialized":
+            self._initialized = True
+        for replica in self.replicas:
+            if replica.state in ("ready", "draining") and replica.writer is not None:
+                replica.writer.write(frame)
+
+    async def drain(self):
+        for replica in self.replicas:
+            if replica.state == "ready" and replica.writer is not None:
+                try:
+                    await replica.writer.drain()
+                except ConnectionError:
+                    pass   # the replica's reader notices and restarts it
+
+    # --- Unity -> host ---
+    def _feed(self, data: bytes):
+        if self.reader is not None and not self.reader.at_eof() and not self.writer.closed:
+            self.reader.feed_data(data)
+
+    def _end(self, reason: str | None = None):
+        if self.reader is not None and self.writer is not None and not self.writer.closed:
+            if reason:
+                error(f"Unity pool: {reason}")
+            self.writer.closed = True
+            self.reader.feed_eof()
+
+    # --- reporting ---
+    def snapshot(self) -> dict:
+        return {"routing": self.routing, "restarts": self.restarts,
+                "scaled_up": self.scaled_up, "scaled_down": self.scaled_down,
+                "waiting": len(self._waiting),
+                "replicas": {r.name: r.stats() for r in self.replicas}}
+
+    def summary_lines(self) -> list[str]:
+        lines = [f"  pool ({self.routing})                    restarts={self.restarts} "
+                 f"scaled up={self.scaled_up} down={self.scaled_down}"]
+        for replica in self.replicas:
+            s = replica.stats()
+            lines.append(f"    replica {replica.name:<22} port={s['port']} {s['state']:<8} "
+                         f"requests={s['requests']} outstanding={s['outstanding']} restarts={s['restarts']}")
+        return lines
+
+    def _write_state(self):
+        """WORK_DIR/pool/pool.json: the replicas and their health, for tools and the smoke test."""
+        state = self.snapshot()
+        if state == self._last_state:
+            return
+        self._last_state = state
+        try:
+            tmp_path = self._state_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=1)
+            os.replace(tmp_path, self._state_file)
+        except OSError as e:
+            debug(f"Could not write pool state: {e}")
+
+
+class _PoolWriter:
+    """
+    The StreamWriter calls the bridge makes on its Unity connection, and
+    the transport of the pool's StreamReader: replicas are not read
+    while the bridge has more than twice READ_LIMIT unread.
+    """
+
+    def __init__(self, pool: UnityPool):
+        self._pool = pool
+        self.closed = False
+
+    def write(self, data: bytes):
+        if not self.closed:
+            self._pool.send(data)
+
+    async def drain(self):
+        if self.closed:
+            raise ConnectionResetError("Unity pool connection closed")
+        await self._pool.drain()
+
+    def close(self):
+        # the session ends; the replicas keep running until the pool is closed
+        self._pool._end()
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    # flow control from the bridge's StreamReader (the Transport calls it makes)
+    def pause_reading(self):
+        self._pool._flowing.clear()
+
+    def resume_reading(self):
+        self._pool._flowing.set()
+
+    async def wait_closed(self):
+        pass
@@ -0,0 +1,76 @@
+import asyncio
+import subprocess
+import time
+
+from .logger import log
+
+POLL_SEC = 0.1       # Exit check interval when the loop cannot watch children
+KILL_WAIT_SEC = 2.0  # After kill(), wait at most this long for the exit
+
+
+class ChildProcess:
+    """
+    A child process with non-blocking waits.
+
+    Wraps asyncio.subprocess.Process, or subprocess.Popen where the event
+    loop cannot spawn processes (WindowsSelectorEventLoopPolicy); then
+    wait() polls with asyncio.sleep instead of blocking the loop.
+    """
+
+    def __init__(self, proc):
+        self._proc = proc
+        self._popen = isinstance(proc, subprocess.Popen)
+        self.pid = proc.pid
+        self.started_at = time.monotonic()
+
+    @property
+    def returncode(self) -> int | None:
+        return self._proc.poll() if self._popen else self._proc.returncode
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    async def wait(self) -> int:
+        if not self._popen:
+            return await self._proc.wait()
+        while self._proc.poll() is None:
+            await asyncio.sleep(POLL_SEC)
+        return self._proc.returncode
+
+    def terminate(self):
+        try:
+            self._proc.terminate()
+        except ProcessLookupError:
+            pass
+
+    def kill(self):
+        try:
+            self._proc.kill()
+        except ProcessLookupError:
+            pass
+
+    async def stop(self, timeout: float) -> int | None:
+        """terminate(), then kill() if it is still running after timeout."""
+        if self.returncode is not None:
+            return self.returncode
+        self.terminate()
+        try:
+            return await asyncio.wait_for(self.wait(), max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            log(f"PID {self.pid} did not exit within {timeout:.1f}s; killing it")
+        self.kill()
+        try:
+            return await asyncio.wait_for(self.wait(), KILL_WAIT_SEC)
+        except asyncio.TimeoutError:
+            log(f"PID {self.pid} is still running after kill")
+            return None
+
+
+async def spawn(cmd: list, **kwargs) -> ChildProcess:
+    """Start cmd without blocking the loop (asyncio subprocess when available)."""
+    try:
+        proc = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+    except NotImplementedError:
+        # e.g. Windows with the selector event loop
+        proc = subprocess.Popen(cmd, **kwargs)
+    return ChildProcess(proc)
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+from .local_socket import describe, open_upstream
+from .logger import log
+
+# ------------------------------------------------------------------------------
+# Readiness settings
+# ------------------------------------------------------------------------------
+PROBE_INITIAL_DELAY_SEC = 0.1   # First backoff step between connect probes
+PROBE_MAX_DELAY_SEC = 1.0       # Backoff cap while Unity is far from ready
+PROBE_NEAR_DELAY_SEC = 0.1      # Backoff cap around the expected startup time
+PROBE_BACKOFF_FACTOR = 1.6
+PROBE_JITTER = 0.2              # +/- ratio applied to every delay
+PROBE_CONNECT_TIMEOUT_SEC = 2.0
+LOG_MARKER = b"TCP Listener started"
+STATS_ALPHA = 0.3               # EWMA weight of the newest startup sample
+
+
+class UnityStartupError(Exception):
+    """Unity did not become ready (process exited or deadline passed)."""
+
+
+# ------------------------------------------------------------------------------
+# Startup time estimate (per install, persisted in WORK_DIR)
+# ------------------------------------------------------------------------------
+class StartupStats:
+    """
+    Rolling estimate of how long this Unity install takes until its
+    TCP server accepts connections. Stored as a small JSON file.
+    """
+
+    def __init__(self, path: str, default_sec: float = 10.0):
+        self.path = path
+        self.default_sec = default_sec
+        self.estimate_sec: float | None = None
+        self.samples = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.estimate_sec = float(data["estimate_sec"])
+            self.samples = int(data.get("samples", 1))
+        except (OSError, ValueError, KeyError, TypeError):
+            self.estimate_sec = None
+            self.samples = 0
+
+    def estimate(self) -> float:
+        if self.estimate_sec is None:
+            return self.default_sec
+        return self.estimate_sec
+
+    def record(self, elapsed_sec: float):
+        if self.estimate_sec is None:
+            self.estimate_sec = elapsed_sec
+        else:
+            self.estimate_sec = (STATS_ALPHA * elapsed_sec
+                                 + (1 - STATS_ALPHA) * self.estimate_sec)
+        self.samples += 1
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"estimate_sec": round(self.estimate_sec, 3),
+                           "samples": self.samples,
+                           "last_sec": round(elapsed_sec, 3)}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log(f"Could not save startup stats: {e}")
+
+
+# ------------------------------------------------------------------------------
+# Log tail: look for the "server started" marker written by Unity
+# ------------------------------------------------------------------------------
+class LogMarkerWatcher:
+    """
+    Incrementally reads the Unity player log and reports whether the
+    marker line has appeared. Create it just before the launch: the
+    size and mtime the log has then are recorded, and only bytes written
+    after that are scanned, so a marker left by the previous run never
+    counts and one written right after the spawn is not missed.
+    Unity truncates the log on launch, so a shrinking file restarts the
+    scan from the top.
+    """
+
+    def __init__(self, path: str, marker: bytes = LOG_MARKER):
+        self.path = path
+        self.marker = marker
+        try:
+            st = os.stat(path)
+            self._offset, self._mtime = st.st_size, st.st_mtime_ns
+        except OSError:
+            self._offset, self._mtime = 0, None
+        self._tail = b""
+        self.seen = False
+
+    def poll(self) -> bool:
+        if self.seen:
+            return True
+        try:
+            st = os.stat(self.path)
+            if st.st_mtime_ns == self._mtime and st.st_size == self._offset:
+                return False   # untouched since launch (or the last poll)
+            self._mtime = st.st_mtime_ns
+            if st.st_size < self._offset:
+                self._offset = 0
+                self._tail = b""
+            if st.st_size == self._offset:
+                return False
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+        except OSError:
+            return False
+
+        self._offset += len(chunk)
+        data = self._tail + chunk
+        if self.marker in data:
+            self.seen = True
+        else:
+            # keep enough bytes to match a marker split across reads
+            self._tail = data[-len(self.marker):]
+        return self.seen
+
+
+# ------------------------------------------------------------------------------
+# Connect probing
+# ------------------------------------------------------------------------------
+def _jitter(delay: float) -> float:
+    return delay * (1.0 + random.uniform(-PROBE_JITTER, PROBE_JITTER))
+
+
+async def connect_when_ready(host: str, port: int, *,
+                             process=None,
+                             log_file: str | None = None,
+                             watcher: LogMarkerWatcher | None = None,
+                             stats: StartupStats | None = None,
+                             timeout: float = 60.0,
+                             started_at: float | None = None,
+                             limit: int = 2 ** 16,
+                             local: str | None = None):
+    """
+    Probe host:port until Unity accepts the connection and return the
+    (reader, writer) of that connection, so the probe itself becomes
+    the bridge connection. With `local` (socket path / pipe name) each
+    probe tries that endpoint first; Unity opens it before the TCP port.
+
+    Probes use exponential backoff with jitter. The backoff is tightened
+    around the expected startup time (from `stats`) and as soon as the
+    log marker is seen, so the connect lands shortly after Unity is up.
+    Pass the `watcher` created before the launch; with only `log_file`
+    the log is watched from this call on.
+    Raises UnityStartupError if the process exits or the deadline passes.
+    """
+    started_at = started_at if started_at is not None else time.monotonic()
+    deadline = started_at + timeout
+    expected = stats.estimate() if stats else None
+    if watcher is None and log_file:
+        watcher = LogMarkerWatcher(log_file)
+    delay = PROBE_INITIAL_DELAY_SEC
+    attempts = 0
+
+    while True:
+        if process is not None and process.poll() is not None:
+            raise UnityStartupError(
+                f"Unity exited during startup (code {process.returncode})")
+
+        attempts += 1
+        try:
+            reader, writer = await open_upstream(host, port, local, limit,
+                                                 timeout=PROBE_CONNECT_TIMEOUT_SEC)
+            elapsed = time.monotonic() - started_at
+            log(f"Unity ready after {elapsed:.2f}s ({attempts} probes) on {describe(writer)}")
+            if stats is not None and process is not None:
+                # only launches we timed from the start are useful samples
+                stats.record(elapsed)
+            return reader, writer
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            pass
+
+        now = time.monotonic()
+        if now >= deadline:
+            raise UnityStartupError(
+                f"Unity not reachable on {host}:{port} after {timeout:.0f}s")
+
+        elapsed = now - started_at
+        marker_seen = watcher.poll() if watcher else False
+        near_expected = (expected is not None
+                         and expected * 0.8 <= elapsed <= expected * 1.5)
+        cap = PROBE_NEAR_DELAY_SEC if (marker_seen or near_expected) else PROBE_MAX_DELAY_SEC
+        if expected is not None and elapsed < expected * 0.8:
+            # don't sleep past the start of the expected window
+            cap = min(cap, max(expected * 0.8 - elapsed, PROBE_NEAR_DELAY_SEC))
+
+        await asyncio.sleep(min(_jitter(min(delay, cap)), deadline - now))
+        delay = min(delay * PROBE_BACKOFF_FACTOR, PROBE_MAX_DELAY_SEC)
+        if marker_seen or near_expected:
+            delay = PROBE_INITIAL_DELAY_SEC
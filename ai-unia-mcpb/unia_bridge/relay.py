@@ -0,0 +1,123 @@
+import asyncio
+import sys
+
+from .framing import error_frame
+from .logger import log
+from .metrics import PEEK_PREFIX, has_id, peek_frame
+
+READ_CHUNK_BYTES = 256 * 1024          # Max bytes taken from the socket per read
+MAX_FRAME_BYTES = 256 * 1024 * 1024    # Larger frames are dropped (a response: answered with an error)
+FRAME_TOO_LARGE = -32603
+
+
+class FrameReader:
+    """
+    Splits a byte stream into newline-terminated frames without decoding.
+
+    Each read_frames() call takes whatever is already buffered on the
+    socket (up to READ_CHUNK_BYTES) and returns all complete frames in it.
+    A single interactive message comes back as soon as it arrives; a burst
+    comes back as one batch, so the caller can write it with one syscall.
+    Frames may be far larger than the StreamReader limit: partial data is
+    accumulated across reads up to max_frame bytes. A larger response is
+    replaced by an error response for the id in its first bytes, so the
+    request it answers does not wait forever; any other frame is dropped.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 max_frame: int = MAX_FRAME_BYTES,
+                 chunk_size: int = READ_CHUNK_BYTES):
+        self._reader = reader
+        self._max_frame = max_frame
+        self._chunk_size = chunk_size
+        self._parts: list[bytes] = []   # pieces of the current partial frame
+        self._partial_len = 0
+        self._discarding = False        # skipping the rest of an oversized frame
+        self._oversized: bytes | None = None   # what replaces it (an error response)
+
+    async def read_frames(self) -> list[bytes]:
+        """Return the next batch of complete frames, or [] on EOF."""
+        while True:
+            chunk = await self._reader.read(self._chunk_size)
+            if not chunk:
+                if self._partial_len:
+                    log(f"Dropping {self._partial_len} bytes of unterminated frame at EOF")
+                return []
+            frames = self._feed(chunk)
+            if frames:
+                return frames
+
+    def _feed(self, chunk: bytes) -> list[bytes]:
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            self._append_partial(chunk)
+            return []
+
+        head, rest = chunk[:end + 1], chunk[end + 1:]
+        if self._parts or self._discarding:
+            first = head.find(b"\n") + 1
+            self._append_partial(head[:first])
+            completed = b"".join(self._parts)
+            if self._discarding:
+                frames = [self._oversized] if self._oversized else []
+            else:
+                frames = [completed]
+            self._parts, self._partial_len, self._discarding, self._oversized = [], 0, False, None
+            head = head[first:]
+        else:
+            frames = []
+
+        if head:
+            if head.count(b"\n") == 1:
+                frames.append(head)
+            else:
+                frames.extend(line + b"\n" for line in head[:-1].split(b"\n"))
+
+        if rest:
+            self._append_partial(rest)
+        return frames
+
+    def _append_partial(self, data: bytes):
+        if self._discarding:
+            return
+        self._partial_len += len(data)
+        if self._partial_len > self._max_frame:
+            self._oversized = self._reject(self._parts + [data])
+            self._parts, self._partial_len, self._discarding = [], 0, True
+            return
+        self._parts.append(data)
+
+    def _reject(self, parts: list[bytes]) -> bytes | None:
+        """The error response standing in for an oversized response, from its first bytes."""
+        head = b""
+        for part in parts:
+            head += part[:PEEK_PREFIX - len(head)]
+            if len(head) >= PEEK_PREFIX:
+                break
+        info = peek_frame(head, complete=False)
+        if info.method is not None or not has_id(info) or info.id is None:
+            log(f"Frame exceeds {self._max_frame} bytes; dropping it")
+            return None
+        log(f"Response to {info.id!r} exceeds {self._max_frame} bytes; answering with an error")
+        return error_frame(info.id, FRAME_TOO_LARGE,
+                           f"Response exceeds the bridge's {self._max_frame}-byte frame limit")
+
+
+class StdoutWriter:
+    """
+    Writes frames to the binary stdout. A batch of frames is written
+    with one write and one flush; a single frame is flushed immediately.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream if stream is not None else sys.stdout.buffer
+
+    def write_frames(self, frames: list[bytes]):
+        if not frames:
+            return
+        self._stream.write(frames[0] if len(frames) == 1 else b"".join(frames))
+        self._stream.flush()
+
+    def write_frame(self, frame: bytes):
+        self._stream.write(frame)
+        self._stream.flush()
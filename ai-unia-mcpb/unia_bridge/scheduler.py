@@ -0,0 +1,289 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from .handshake import dumps_line
+from .logger import debug, log
+from .metrics import PEEK_PREFIX, LatencyHistogram, has_id, peek_frame
+
+
+# ------------------------------------------------------------------------------
+# Lanes
+# ------------------------------------------------------------------------------
+class _Action:
+    def __init__(self, request_id, tool: str, frame: bytes, text_chars: int, interrupt: bool):
+        self.request_id = request_id
+        self.tool = tool
+        self.frame = frame
+        self.text_chars = text_chars
+        self.interrupt = interrupt
+        self.queued_at = time.monotonic()
+
+
+class Lane:
+    """
+    One kind of avatar action (speech, expression, motion ...).
+
+    Calls of the lane's tools go to Unity one at a time, in arrival order.
+    Unity answers as soon as an action has started, so after the response
+    the lane stays busy for hold_sec + hold_sec_per_char * len(text), the
+    time the avatar is still acting it out.
+    coalesce: a queued call is replaced by a newer call of the same tool.
+    """
+
+    def __init__(self, name: str, tools: list[str], priority: int = 0, coalesce: bool = False,
+                 hold_sec: float = 0.0, hold_sec_per_char: float = 0.0):
+        self.name = name
+        self.tools = tools
+        self.priority = priority
+        self.coalesce = coalesce
+        self.hold_sec = hold_sec
+        self.hold_sec_per_char = hold_sec_per_char
+        self.queued: deque[_Action] = deque()
+        self.current: _Action | None = None   # sent to Unity, not answered yet
+        self.busy_until = 0.0
+        self.waits = LatencyHistogram()       # queued -> sent, ms
+        self.peak = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def copy(self, name: str) -> "Lane":
+        """The same kind of lane for another avatar."""
+        return Lane(name, self.tools, self.priority, self.coalesce, self.hold_sec, self.hold_sec_per_char)
+
+    def ready(self, now: float) -> bool:
+        # an interrupting call does not wait for the previous action to finish
+        return bool(self.queued) and self.current is None \
+            and (now >= self.busy_until or self.queued[0].interrupt)
+
+    def hold(self, action: _Action) -> float:
+        return self.hold_sec + self.hold_sec_per_char * action.text_chars
+
+    def stats(self) -> dict:
+        return {"depth": len(self.queued), "peak": self.peak,
+                "inflight": self.current is not None,
+                "merged": self.merged, "dropped": self.dropped,
+                "wait_ms": {"count": self.waits.count,
+                            "p50": round(self.waits.percentile(50), 2),
+                            "p95": round(self.waits.percentile(95), 2),
+                            "max": round(self.waits.max_ms, 2)}}
+
+
+# ------------------------------------------------------------------------------
+# Bridge stage
+# ------------------------------------------------------------------------------
+class ActionScheduler:
+    """
+    Holds back avatar tool calls from the host so the avatar acts them
+    out in order instead of overlapping (Unity starts every speak and
+    smile right away, interrupting the previous one).
+
+    Each call goes to the lane of its tool and is forwarded when the lane
+    is free; when several lanes are, the lower priority number goes first.
+    - coalescing lanes keep only the latest queued call of a tool; the
+      replaced call is answered here
+    - a call with {"interrupt": true} drops the calls still queued in its
+      lane (answered as skipped) and does not wait for the hold
+    - a host cancel of a queued call removes it (it never reaches Unity);
+      a cancel of a call already sent frees its lane (the host expects no
+      response), and so does release() when the call times out
+    Skipped calls never ran and say so (isError: true); a merged call
+    gets a normal result, since the later call acts it out.
+
+    by_avatar (the avatar pool): every avatar acts on its own, so each
+    gets its own copy of the lanes ("speech@mikuru"), keyed by
+    params._meta.avatar, else default_avatar.
+
+    forward(frame) hands a released call on (speech chunker / Unity queue).
+    A lane becomes free when the response reaches the host, which covers
+    Unity's answer, the speech chunker's merged one and the bridge's own
+    errors (timeout, connection lost): see on_delivered().
+    """
+
+    name = "actions"
+
+    def __init__(self, lanes: list[Lane], forward, out_queue,
+                 by_avatar: bool = False, default_avatar: str | None = None):
+        self.forward = forward
+        self.out_queue = out_queue
+        self.by_avatar = by_avatar
+        self.default_avatar = default_avatar
+        self.lanes: list[Lane] = []
+        self._templates = lanes
+        self._tools = {tool for lane in lanes for tool in lane.tools}
+        self._by_tool: dict = {}    # (avatar, tool) -> lane
+        if not by_avatar:
+            self._add_lanes(None)
+        self._queued: dict = {}     # request id -> lane (waiting here)
+        self._sent: dict = {}       # request id -> lane (waiting for the response)
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _add_lanes(self, avatar: str | None):
+        for template in self._templates:
+            lane = template if avatar is None else template.copy(f"{template.name}@{avatar}")
+            self.lanes.append(lane)
+            self._by_tool.update({(avatar, tool): lane for tool in lane.tools})
+        self.lanes.sort(key=lambda lane: lane.priority)
+
+    def _lane(self, tool: str, params: dict) -> Lane:
+        avatar = None
+        if self.by_avatar:
+            meta = params.get("_meta")
+            avatar = meta.get("avatar") if isinstance(meta, dict) else None
+            if not isinstance(avatar, str) or not avatar:
+                avatar = self.default_avatar
+        if (avatar, tool) not in self._by_tool:
+            self._add_lanes(avatar)
+        return self._by_tool[(avatar, tool)]
+
+    # --- host -> Unity ---
+    def intercept(self, frame: bytes) -> bool:
+        """True if the frame was taken over (an avatar action, or a cancel of a queued one)."""
+        head = frame[:PEEK_PREFIX]
+        if b'"notifications/cancelled"' in head:
+            return self._cancel(frame)
+        if b'"tools/call"' not in head:
+            return False
+        info = peek_frame(frame)
+        if info.tool not in self._tools or info.method != "tools/call" or not has_id(info):
+            return False
+        try:
+            params = json.loads(frame)["params"]
+            arguments = params.get("arguments") or {}
+            text = arguments.get("text")
+            interrupt = arguments.get("interrupt") is True
+        except (ValueError, KeyError, AttributeError):
+            return False   # malformed: Unity reports it
+        lane = self._lane(info.tool, params)
+
+        action = _Action(info.id, info.tool, frame, len(text) if isinstance(text, str) else 0, interrupt)
+        if interrupt:
+            while lane.queued:
+                self._skip(lane, lane.queued.popleft(), f"Skipped: interrupted by a newer {info.tool} call")
+            lane.busy_until = 0.0
+        elif lane.coalesce:
+            for index, old in enumerate(lane.queued):
+                if old.tool == action.tool:
+                    # the latest call takes the queued one's place
+                    lane.queued[index] = action
+                    lane.merged += 1
+                    self._answer(old, f"Merged into a later {old.tool} call (id={action.request_id})",
+                                 is_error=False)
+                    self._queued[action.request_id] = lane
+                    return True
+        lane.queued.append(action)
+        lane.peak = max(lane.peak, len(lane.queued))
+        self._queued[action.request_id] = lane
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._wake.set()
+        return True
+
+    def _cancel(self, frame: bytes) -> bool:
+        try:
+            request_id = (json.loads(frame).get("params") or {}).get("requestId")
+        except (ValueError, AttributeError):
+            return False
+        if not isinstance(request_id, (str, int)):
+            return False
+        lane = self._queued.pop(request_id, None)
+        if lane is None:
+            self.release(request_id)
+            return False   # already sent (or not an action): the cancel goes on to Unity
+        for action in lane.queued:
+            if action.request_id == request_id:
+                lane.queued.remove(action)
+                break
+        return True
+
+    def _answer(self, action: _Action, text: str, is_error: bool = True):
+        self._queued.pop(action.request_id, None)
+        self.out_queue.put_nowait(dumps_line({
+            "jsonrpc": "2.0", "id": action.request_id,
+            "result": {"content": [{"type": "text", "text": text}], "isError": is_error}}))
+
+    def _skip(self, lane: Lane, action: _Action, text: str):
+        lane.dropped += 1
+        debug(f"{text} (id={action.request_id})")
+        self._answer(action, f"{text}; this call did not run")
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            wait = None
+            for lane in self.lanes:
+                if lane.ready(now):
+                    action = lane.queued.popleft()
+                    del self._queued[action.request_id]
+                    lane.current = action
+                    self._sent[action.request_id] = lane
+                    lane.waits.record((now - action.queued_at) * 1000.0)
+                    await self.forward(action.frame)
+                elif lane.queued and lane.current is None:
+                    # held: look again when the hold ends
+                    remaining = lane.busy_until - now
+                    wait = remaining if wait is None else min(wait, remaining)
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Unity -> host ---
+    def on_delivered(self, frames: list[bytes]):
+        """Frames about to be written to the host: a response frees its lane."""
+        if not self._sent:
+            return
+        for frame in frames:
+            info = peek_frame(frame)
+            if info.method is not None or not has_id(info):
+                continue
+            self.release(info.id)
+
+    def release(self, request_id):
+        """A sent action is answered, cancelled or timed out: its lane takes the next one after the hold."""
+        lane = self._sent.pop(request_id, None)
+        if lane is None or lane.current is None or lane.current.request_id != request_id:
+            return
+        lane.busy_until = time.monotonic() + lane.hold(lane.current)
+        lane.current = None
+        self._wake.set()
+
+    # --- end of session ---
+    async def drain(self, timeout: float):
+        """Keep releasing queued actions (at their pace) for at most timeout seconds."""
+        if self._queued:
+            log(f"Waiting for {len(self._queued)} queued avatar action(s)")
+        deadline = time.monotonic() + timeout
+        while self._queued and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.close()
+
+    def close(self):
+        """Stop releasing; what is still queued is answered as skipped."""
+        if self._task is not None:
+            self._task.cancel()
+        skipped = 0
+        for lane in self.lanes:
+            while lane.queued:
+                self._skip(lane, lane.queued.popleft(), "Skipped: the session ended first")
+                skipped += 1
+        if skipped:
+            log(f"Skipped {skipped} avatar action(s) still queued at the end of the session")
+
+    def snapshot(self) -> dict:
+        return {lane.name: lane.stats() for lane in self.lanes}
+
+    def summary_lines(self) -> list[str]:
+        lines = []
+        for lane in self.lanes:
+            s = lane.stats()
+            if not (s["wait_ms"]["count"] or s["depth"] or s["merged"] or s["dropped"]):
+                continue
+            w = s["wait_ms"]
+            lines.append(f"  lane {lane.name:<27} depth={s['depth']} peak={s['peak']} "
+                         f"merged={s['merged']} dropped={s['dropped']} "
+                         f"wait p50={w['p50']:.1f}ms p95={w['p95']:.1f}ms max={w['max']:.1f}ms")
+        return lines
@@ -0,0 +1,232 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+
+from .handshake import dumps_line
+from .logger import log
+from .metrics import PEEK_PREFIX, FrameInfo
+
+# ------------------------------------------------------------------------------
+# Sentence chunking settings
+# ------------------------------------------------------------------------------
+SPEAK_TOOL = "ai-unia-speak"
+CHUNK_MIN_TEXT_CHARS = 40   # Shorter texts are spoken as one unit
+CHUNK_MIN_CHARS = 8         # A shorter sentence is joined to the next one
+CHUNK_MAX_CHARS = 80        # Longer sentences are split again at 、/,
+READ_AHEAD = 2              # Sentences being synthesized at the same time
+
+# End of sentence (plus closing brackets/quotes and spaces after it)
+_SENTENCE_END = re.compile(r'(?:[。！？!?…‥]+|\.(?=\s|$)|\n)+[」』）)”’"\'♪～]*\s*')
+_CLAUSE_END = re.compile(r'[、，,]\s*')
+# Same as VoicevoxClient.RemoveBracketText: dropped before speaking anyway,
+# and a split inside brackets would leave them unmatched
+_BRACKETS = re.compile(r'（.*?）|\(.*?\)')
+
+
+def _cut(text: str, pattern: re.Pattern) -> list[str]:
+    pieces, start = [], 0
+    for m in pattern.finditer(text):
+        if m.end() > start:
+            pieces.append(text[start:m.end()])
+            start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Split on Japanese / English sentence ends, then split long
+    sentences at clause commas; very short pieces are merged forward.
+    """
+    text = _BRACKETS.sub("", text).strip()
+    pieces = []
+    for sentence in _cut(text, _SENTENCE_END):
+        if len(sentence) > CHUNK_MAX_CHARS:
+            pieces.extend(_cut(sentence, _CLAUSE_END))
+        else:
+            pieces.append(sentence)
+
+    chunks, pending = [], ""
+    for piece in pieces:
+        pending += piece
+        if len(pending.strip()) >= CHUNK_MIN_CHARS:
+            chunks.append(pending)
+            pending = ""
+    if pending.strip():
+        if chunks:
+            chunks[-1] += pending   # keeps the space between "working? Yes."
+        else:
+            chunks.append(pending)
+    return [chunk.strip() for chunk in chunks]
+
+
+# ------------------------------------------------------------------------------
+# Bridge stage
+# ------------------------------------------------------------------------------
+class _Utterance:
+    def __init__(self, request: dict, chunks: list[str], utterance_id: str):
+        self.request = request
+        self.chunks = chunks
+        self.utterance_id = utterance_id
+        self.waiting: dict[str, asyncio.Future] = {}   # chunk request id -> response
+        self.task: asyncio.Task | None = None
+
+
+class SpeechChunker:
+    """
+    Intercepts long `ai-unia-speak` calls from the host and speaks them
+    sentence by sentence: chunk i is sent as its own tools/call with
+    `utterance` / `index` arguments, at most READ_AHEAD in flight, so
+    Unity starts playing sentence 0 while the rest is synthesized and
+    queues the others in order. The host gets one response with the
+    chunk results merged (isError if any chunk failed).
+
+    Chunk requests go through the normal host -> Unity queue and their
+    responses are taken out of the Unity -> host stream by on_response().
+    """
+
+    _ids = itertools.count(1)   # utterance ids are unique per bridge process
+
+    def __init__(self, queue, out_queue, read_ahead: int = READ_AHEAD):
+        self.queue = queue
+        self.out_queue = out_queue
+        self.read_ahead = read_ahead
+        self._by_request: dict = {}     # host request id -> _Utterance
+        self._by_chunk: dict = {}       # chunk request id -> _Utterance
+
+    # --- host -> Unity ---
+    def intercept(self, frame: bytes) -> bool:
+        """True if the frame was taken over (a long speak call, or a cancel of one)."""
+        head = frame[:PEEK_PREFIX]
+        if b'"notifications/cancelled"' in head:
+            return self._cancel(frame)
+        if SPEAK_TOOL.encode() not in frame or b'"tools/call"' not in head:
+            return False
+        try:
+            msg = json.loads(frame)
+            params = msg["params"]
+            text = params["arguments"]["text"]
+        except (ValueError, KeyError, TypeError):
+            return False
+        if params.get("name") != SPEAK_TOOL or "id" not in msg \
+                or not isinstance(text, str) or len(text) < CHUNK_MIN_TEXT_CHARS:
+            return False
+        chunks = split_sentences(text)
+        if len(chunks) < 2:
+            return False
+
+        utterance = _Utterance(msg, chunks, f"unia-{os.getpid()}-{next(self._ids)}")
+        self._by_request[msg["id"]] = utterance
+        utterance.task = asyncio.create_task(self._speak(utterance))
+        log(f"Speaking {len(text)} chars as {len(chunks)} sentence(s)")
+        return True
+
+    def _cancel(self, frame: bytes) -> bool:
+        try:
+            request_id = (json.loads(frame).get("params") or {}).get("requestId")
+        except (ValueError, AttributeError):
+            return False
+        utterance = self._by_request.get(request_id)
+        if utterance is None:
+            return False
+        utterance.task.cancel()
+        return True
+
+    async def _speak(self, utterance: _Utterance):
+        request_id = utterance.request["id"]
+        slots = asyncio.Semaphore(self.read_ahead)
+        try:
+            async def one(index: int, text: str):
+                async with slots:
+                    return await self._send_chunk(utterance, index, text)
+
+            # the semaphore is FIFO: sentence i is sent after sentence i-1
+            tasks = [asyncio.create_task(one(index, text))
+                     for index, text in enumerate(utterance.chunks)]
+            try:
+                responses = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            await self.out_queue.put(self._merge(request_id, responses))
+        except asyncio.CancelledError:
+            pass   # the host cancelled: no response is expected
+        except ConnectionError as e:
+            await self.out_queue.put(dumps_line({
+                "jsonrpc": "2.0", "id": request_id,
+                "error": {"code": -32000, "message": str(e)}}))
+        finally:
+            self._by_request.pop(request_id, None)
+            for chunk_id in utterance.waiting:
+                self._by_chunk.pop(chunk_id, None)
+
+    async def _send_chunk(self, utterance: _Utterance, index: int, text: str) -> dict:
+        chunk_id = f"{utterance.utterance_id}-{index}"
+        params = dict(utterance.request["params"])
+        params["arguments"] = dict(params["arguments"], text=text,
+                                   utterance=utterance.utterance_id, index=index)
+        future = asyncio.get_running_loop().create_future()
+        utterance.waiting[chunk_id] = future
+        self._by_chunk[chunk_id] = utterance
+        frame = dumps_line({"jsonrpc": "2.0", "id": chunk_id,
+                            "method": "tools/call", "params": params})
+        if not await self.queue.put(frame):
+            raise ConnectionError("Server busy: too many requests queued for Unity")
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # cancelling this task cancels the future too; a result that
+            # arrived just before the cancel means Unity is done with it
+            if future.cancelled() or not future.done():
+                self.queue.put_nowait(dumps_line({
+                    "jsonrpc": "2.0", "method": "notifications/cancelled",
+                    "params": {"requestId": chunk_id, "reason": "utterance cancelled"}}))
+            raise
+
+    @staticmethod
+    def _merge(request_id, responses: list[dict]) -> bytes:
+        for response in responses:
+            if "error" in response:
+                # e.g. a Unity build without the tool: report it as is
+                return dumps_line({"jsonrpc": "2.0", "id": request_id, "error": response["error"]})
+        content, is_error = [], False
+        for response in responses:
+            result = response.get("result") or {}
+            content.extend(result.get("content") or [])
+            is_error = is_error or bool(result.get("isError"))
+        return dumps_line({"jsonrpc": "2.0", "id": request_id,
+                           "result": {"content": content, "isError": is_error}})
+
+    # --- Unity -> host ---
+    def on_response(self, info: FrameInfo, frame: bytes) -> bool:
+        """True if the frame answers a chunk request (and must not reach the host)."""
+        utterance = self._by_chunk.pop(info.id, None) if isinstance(info.id, str) else None
+        if utterance is None:
+            return False
+        future = utterance.waiting.get(info.id)
+        if future is not None and not future.done():
+            try:
+                future.set_result(json.loads(frame))
+            except ValueError:
+                future.set_result({"error": {"code": -32700, "message": "Malformed chunk response"}})
+        return True
+
+    def owns(self, request_id) -> bool:
+        return request_id in self._by_chunk
+
+    def on_lost(self, request_id, message: str = "Unity connection lost before the request completed"):
+        """A chunk request was lost with the Unity connection (or timed out)."""
+        utterance = self._by_chunk.pop(request_id, None)
+        if utterance is None:
+            return
+        future = utterance.waiting.get(request_id)
+        if future is not None and not future.done():
+            future.set_exception(ConnectionError(message))
+
+    def close(self):
+        for utterance in list(self._by_request.values()):
+            utterance.task.cancel()
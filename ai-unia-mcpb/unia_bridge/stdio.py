@@ -0,0 +1,176 @@
+import asyncio
+import queue
+import sys
+import threading
+
+from .framing import INVALID_REQUEST, error_frame
+from .logger import log
+from .metrics import PEEK_PREFIX, has_id, peek_frame
+from .relay import StdoutWriter
+
+STDIN_LINE_LIMIT = 64 * 1024 * 1024  # Largest single JSON-RPC line accepted from the host
+
+
+class LineTooLong(Exception):
+    """
+    Raised by readline() for a host line over the limit. The line has
+    been skipped up to its newline, so reading can go on.
+    """
+
+    def __init__(self, head: bytes, size: int, limit: int):
+        super().__init__(f"Stdin line of {size} bytes exceeds the {limit}-byte limit")
+        self.head = head[:PEEK_PREFIX]
+        self.size = size
+        self.limit = limit
+
+    def reply(self) -> bytes | None:
+        """The error response for the skipped request (None for a notification or no id)."""
+        info = peek_frame(self.head, complete=False)
+        if info.method is None or not has_id(info) or info.id is None:
+            return None
+        return error_frame(info.id, INVALID_REQUEST,
+                           f"Request exceeds the bridge's {self.limit}-byte line limit")
+
+
+class PipeStdinReader:
+    """
+    POSIX stdin transport: stdin is registered with the event loop via
+    connect_read_pipe, so lines are read without any thread hop.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, limit: int = STDIN_LINE_LIMIT):
+        self._reader = reader
+        self._limit = limit
+
+    async def readline(self) -> bytes:
+        try:
+            return await self._reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial   # EOF (a last line without its newline, or b"")
+        except asyncio.LimitOverrunError as e:
+            head = await self._reader.readexactly(e.consumed)
+        size = len(head)
+        while True:   # drop the rest of the line
+            try:
+                size += len(await self._reader.readuntil(b"\n"))
+                break
+            except asyncio.IncompleteReadError as e:
+                size += len(e.partial)
+                break
+            except asyncio.LimitOverrunError as e:
+                size += len(await self._reader.readexactly(e.consumed))
+        raise LineTooLong(head, size, self._limit)
+
+
+class ThreadStdinReader:
+    """
+    Fallback stdin transport (Windows, or stdin that is not a pipe):
+    one long-lived daemon thread reads raw lines and hands them to the
+    loop through a bounded queue. b"" marks EOF; an over-long line is
+    skipped and handed over as a LineTooLong.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stream, maxsize: int = 256,
+                 limit: int = STDIN_LINE_LIMIT):
+        self._loop = loop
+        self._stream = stream
+        self._limit = limit
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="stdin-reader", daemon=True)
+        self._thread.start()
+
+    def _put(self, line: bytes):
+        # blocks the reader thread while the queue is full (backpressure)
+        asyncio.run_coroutine_threadsafe(self._queue.put(line), self._loop).result()
+
+    def _run(self):
+        try:
+            while True:
+                line = self._stream.readline(self._limit)
+                if len(line) == self._limit and not line.endswith(b"\n"):
+                    line = self._skip_line(line)
+                self._put(line)
+                if not line:
+                    break
+        except Exception as e:
+            if not self._loop.is_closed():
+                log(f"Stdin reader thread error: {e}")
+                self._put(b"")
+
+    def _skip_line(self, head: bytes) -> "LineTooLong":
+        size = len(head)
+        while chunk := self._stream.readline(self._limit):
+            size += len(chunk)
+            if chunk.endswith(b"\n"):
+                break
+        return LineTooLong(head, size, self._limit)
+
+    async def readline(self) -> bytes:
+        line = await self._queue.get()
+        if isinstance(line, LineTooLong):
+            raise line
+        return line
+
+
+async def open_stdin(limit: int = STDIN_LINE_LIMIT):
+    """
+    Return an object with `async readline() -> bytes` over the raw stdin
+    bytes. Lines keep their trailing newline and are never decoded.
+    """
+    loop = asyncio.get_running_loop()
+    stream = sys.stdin.buffer
+
+    if sys.platform != "win32":
+        reader = asyncio.StreamReader(limit=limit, loop=loop)
+        protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+        try:
+            await loop.connect_read_pipe(lambda: protocol, stream)
+            return PipeStdinReader(reader, limit)
+        except (ValueError, NotImplementedError, OSError) as e:
+            # e.g. stdin redirected from a regular file
+            log(f"Stdin is not pollable ({e}); using reader thread")
+
+    return ThreadStdinReader(loop, stream, limit=limit)
+
+
+class ThreadStdoutWriter:
+    """
+    stdout transport: one long-lived daemon thread performs the blocking
+    writes, so a host that stops reading stalls only that thread and
+    the frames queued for it, never the event loop (or Unity -> host
+    reads, or the host -> Unity direction).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: StdoutWriter | None = None):
+        self._loop = loop
+        self._writer = writer if writer is not None else StdoutWriter()
+        self._jobs = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="stdout-writer", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _settle(future: asyncio.Future, error: Exception | None):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def _run(self):
+        while True:
+            frames, future = self._jobs.get()
+            error = None
+            try:
+                self._writer.write_frames(frames)
+            except Exception as e:
+                error = e
+            try:
+                self._loop.call_soon_threadsafe(self._settle, future, error)
+            except RuntimeError:  # loop closed while writing
+                break
+
+    async def write_frames(self, frames: list[bytes]):
+        future = self._loop.create_future()
+        self._jobs.put((frames, future))
+        await future
@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import os
+import signal
+import sys
+import time
+from collections import namedtuple
+
+from .handshake import dumps_line
+from .logger import log
+from .metrics import FrameInfo
+
+try:
+    import psutil   # optional: pip install psutil
+except ImportError:
+    psutil = None
+
+# ------------------------------------------------------------------------------
+# Process sampling: psutil, else /proc (Linux), else the Win32 API
+# ------------------------------------------------------------------------------
+ProcessSample = namedtuple("ProcessSample", "time cpu_sec rss_bytes threads")
+
+KILL_WAIT_SEC = 5.0   # After the kill, wait this long for the process to go away
+
+
+def _sample_psutil(pid: int) -> ProcessSample | None:
+    try:
+        process = psutil.Process(pid)
+        with process.oneshot():
+            if process.status() == psutil.STATUS_ZOMBIE:
+                return None
+            cpu = process.cpu_times()
+            return ProcessSample(time.monotonic(), cpu.user + cpu.system,
+                                 process.memory_info().rss, process.num_threads())
+    except psutil.Error:
+        return None
+
+
+def _sample_proc(pid: int) -> ProcessSample | None:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # the command name may contain spaces: fields start after the last ')'
+    fields = data.rsplit(b")", 1)[1].split()
+    if fields[0] == b"Z":
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return ProcessSample(time.monotonic(), (int(fields[11]) + int(fields[12])) / ticks,
+                         int(fields[21]) * os.sysconf("SC_PAGE_SIZE"), int(fields[17]))
+
+
+def _sample_win32(pid: int) -> ProcessSample | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value != 259:
+            return None   # not STILL_ACTIVE
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if not kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+            return None
+        kernel, user = ((t.dwHighDateTime << 32 | t.dwLowDateTime) / 1e7 for t in times[2:])
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if not kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        # thread count needs a toolhelp snapshot; psutil reports it
+        return ProcessSample(time.monotonic(), kernel + user, counters.WorkingSetSize, None)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+if psutil is not None:
+    SAMPLER = "psutil"
+    sample_process = _sample_psutil
+elif os.path.exists("/proc/self/stat"):
+    SAMPLER = "/proc"
+    sample_process = _sample_proc
+elif sys.platform == "win32":
+    SAMPLER = "win32"
+    sample_process = _sample_win32
+else:
+    SAMPLER = None
+
+    def sample_process(pid: int) -> ProcessSample | None:
+        return None
+
+sample_process.__doc__ = "CPU seconds, RSS and thread count of pid; None if it is gone (or unreadable)."
+
+
+async def kill_process(pid: int, timeout: float = KILL_WAIT_SEC):
+    """Kill pid (no graceful stop: it is hung) and wait until it is gone."""
+    try:
+        os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))   # TerminateProcess on Windows
+    except OSError:
+        return
+    deadline = time.monotonic() + timeout
+    while sample_process(pid) is not None and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+
+# ------------------------------------------------------------------------------
+# Watchdog
+# ------------------------------------------------------------------------------
+class UnitySupervisor:
+    """
+    Watches Unity while a bridge connection is up.
+
+    - Every sample_sec: CPU time, RSS and thread count of the player.
+    - Every ping_sec: an MCP `ping` written straight to the Unity
+      connection (not queued behind the host's frames, not tracked as
+      a host request), answered within ping_timeout or counted as a miss.
+
+    watch() returns a diagnosis when Unity should be restarted:
+    ping_misses pings in a row unanswered, or RSS above rss_limit.
+    A ping that goes unanswered while the Unity -> host queue is full
+    is not a miss: its answer waits behind frames the host has not read.
+    Ping responses are taken out of the Unity -> host stream by
+    on_response(), like the speech chunker's.
+    Only for a Unity this bridge owns: a shared daemon's Unity (or the
+    multiplexer, which answers ping itself) is not this bridge's to restart.
+    """
+
+    _ids = itertools.count(1)
+    MAX_WAITING = 64   # unanswered pings remembered (a late answer is swallowed)
+
+    def __init__(self, pid_fn, sample_sec: float, ping_sec: float,
+                 ping_timeout: float, ping_misses: int, rss_limit: int):
+        self.pid_fn = pid_fn
+        self.sample_sec = sample_sec
+        self.ping_sec = ping_sec
+        self.ping_timeout = ping_timeout
+        self.ping_misses = ping_misses
+        self.rss_limit = rss_limit
+        self.restarts = 0
+        self.last_rtt_ms: float | None = None
+        self.peak_rss = 0
+        self._samples: list[ProcessSample] = []   # the last two
+        self._waiting: dict[str, asyncio.Future] = {}
+
+    async def watch(self, writer, out_queue=None) -> str:
+        """Watch until Unity should be restarted; pings go out on writer."""
+        self._samples = []
+        tasks = [asyncio.create_task(self._ping_loop(writer, out_queue)),
+                 asyncio.create_task(self._sample_loop())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            return self.diagnose(done.pop().result())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _ping_loop(self, writer, out_queue) -> str:
+        misses = 0
+        while True:
+            await asyncio.sleep(self.ping_sec)
+            blocked = out_queue.blocked if out_queue is not None else 0
+            rtt = await self._ping(writer)
+            if rtt is not None:
+                misses, self.last_rtt_ms = 0, rtt
+                continue
+            if out_queue is not None and (out_queue.full or out_queue.blocked != blocked):
+                continue   # the host is not reading; Unity may be fine
+            misses += 1
+            log(f"Unity did not answer ping within {self.ping_timeout:g}s "
+                f"({misses}/{self.ping_misses})")
+            if misses >= self.ping_misses:
+                return f"{misses} pings in a row unanswered"
+
+    async def _ping(self, writer) -> float | None:
+        ping_id = f"unia-ping-{os.getpid()}-{next(self._ids)}"
+        future = asyncio.get_running_loop().create_future()
+        # stays registered after a timeout, so a late answer is still swallowed
+        self._waiting[ping_id] = future
+        while len(self._waiting) > self.MAX_WAITING:
+            del self._waiting[next(iter(self._waiting))]
+        start = time.monotonic()
+        # one small line, written whole: it cannot split a host frame, and
+        # the host -> Unity task drains the connection
+        writer.write(dumps_line({"jsonrpc": "2.0", "id": ping_id, "method": "ping"}))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.ping_timeout)
+        except asyncio.TimeoutError:
+            return None
+        return (time.monotonic() - start) * 1000.0
+
+    async def _sample_loop(self) -> str:
+        while True:
+            pid = self.pid_fn()
+            sample = sample_process(pid) if pid else None
+            if sample is not None:
+                self._samples = (self._samples + [sample])[-2:]
+                self.peak_rss = max(self.peak_rss, sample.rss_bytes)
+                if self.rss_limit and sample.rss_bytes > self.rss_limit:
+                    return f"RSS {sample.rss_bytes >> 20} MB over the {self.rss_limit >> 20} MB limit"
+            await asyncio.sleep(self.sample_sec)
+
+    def diagnose(self, reason: str) -> str:
+        """reason plus what the last samples say about the process."""
+        parts = [reason]
+        if self._samples:
+            last = self._samples[-1]
+            parts.append(f"pid {self.pid_fn()}, rss {last.rss_bytes >> 20} MB"
+                         + (f", {last.threads} threads" if last.threads is not None else ""))
+            if len(self._samples) == 2:
+                first = self._samples[0]
+                usage = (last.cpu_sec - first.cpu_sec) / max(last.time - first.time, 1e-6)
+                state = ("busy: stuck in a loop?" if usage > 0.9
+                         else "idle: deadlocked?" if usage < 0.01 else "running")
+                parts.append(f"cpu {usage:.0%} of a core ({state})")
+        elif SAMPLER is None:
+            parts.append("no process sampling on this platform (pip install psutil)")
+        return "; ".join(parts)
+
+    # --- Unity -> host ---
+    def on_response(self, info: FrameInfo) -> bool:
+        """True if the frame answers one of our pings (and must not reach the host)."""
+        future = self._waiting.pop(info.id, None) if isinstance(info.id, str) else None
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(None)
+        return True
+
+    def summary_lines(self) -> list[str]:
+        if not self._samples and self.last_rtt_ms is None and not self.restarts:
+            return []
+        line = f"  unity ({SAMPLER or 'no sampler'})"
+        if self._samples:
+            last = self._samples[-1]
+            line += f" cpu={last.cpu_sec:.1f}s rss={last.rss_bytes >> 20}MB peak={self.peak_rss >> 20}MB"
+            if last.threads is not None:
+                line += f" threads={last.threads}"
+        if self.last_rtt_ms is not None:
+            line += f" ping={self.last_rtt_ms:.1f}ms"
+        return [f"{line} restarts={self.restarts}"]
@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlsplit
+
+from .logger import log
+
+# ------------------------------------------------------------------------------
+# VOICEVOX proxy settings
+# ------------------------------------------------------------------------------
+VOICEVOX_URL = "http://127.0.0.1:50021"     # The real engine
+PROXY_LISTEN = "127.0.0.1:50022"            # Unity is pointed here (-voicevoxUrl)
+CACHE_DIR_NAME = "voicevox-cache"           # Under WORK_DIR
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024       # In-memory LRU
+DISK_CACHE_BYTES = 1024 * 1024 * 1024       # Least recently used files are removed above this
+UPSTREAM_TIMEOUT_SEC = 60
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Scales that change the synthesized audio (besides text and speaker)
+VOICE_PARAMS = ("speedScale", "pitchScale", "intonationScale", "volumeScale")
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "content-length"}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           422: "Unprocessable Entity", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+class HttpError(Exception):
+    pass
+
+
+# ------------------------------------------------------------------------------
+# Minimal HTTP/1.1 (Content-Length and chunked bodies, keep-alive)
+# ------------------------------------------------------------------------------
+async def read_head(reader: asyncio.StreamReader):
+    """Start line split on spaces and lower-cased headers, or None at EOF."""
+    line = await reader.readline()
+    while line in (b"\r\n", b"\n"):
+        line = await reader.readline()
+    if not line:
+        return None
+    start = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    if len(start) < 2:
+        raise HttpError(f"Malformed start line: {line[:80]!r}")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return start, headers
+
+
+async def read_body(reader: asyncio.StreamReader, headers: dict, until_eof: bool = False) -> bytes:
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        parts, total = [], 0
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return b"".join(parts)
+            total += size
+            if total > MAX_BODY_BYTES:
+                raise HttpError("Body too large")
+            parts.append(await reader.readexactly(size))
+            await reader.readline()
+    length = int(headers.get("content-length", "0"))
+    if length > MAX_BODY_BYTES:
+        raise HttpError("Body too large")
+    if length:
+        return await reader.readexactly(length)
+    return await reader.read(MAX_BODY_BYTES) if until_eof else b""
+
+
+def format_response(status: int, headers: dict, body: bytes) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+# ------------------------------------------------------------------------------
+# Cache: in-memory LRU over a content-addressed disk store
+# ------------------------------------------------------------------------------
+def cache_key(path: str, query: dict, body: bytes) -> str | None:
+    """
+    sha256 over (text, speaker, speed, pitch, intonation, volume) plus
+    any other field that changes the output. For /synthesis the text is
+    the audio query's kana reading. None: not cacheable.
+    """
+    query = dict(query)
+    speaker = query.pop("speaker", None)
+    if path == "/audio_query":
+        parts = {"kind": "audio_query", "text": query.pop("text", None), "speaker": speaker}
+    elif path == "/synthesis":
+        try:
+            audio_query = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(audio_query, dict):
+            return None
+        parts = {"kind": "synthesis", "text": audio_query.pop("kana", None), "speaker": speaker}
+        for name in VOICE_PARAMS:
+            parts[name] = audio_query.pop(name, None)
+        parts["query_rest"] = audio_query   # accent phrases, sampling rate, ...
+    else:
+        return None
+    parts["params_rest"] = query
+    digest = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(digest.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Responses by cache key. Files live in <dir>/<key[:2]>/<key>; the
+    disk index is kept in LRU order (mtime at load, touched on hit) and
+    trimmed to disk_bytes. The hottest entries also stay in memory.
+    """
+
+    def __init__(self, directory: str, memory_bytes: int = MEMORY_CACHE_BYTES,
+                 disk_bytes: int = DISK_CACHE_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()   # key -> size
+        self._disk_size = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self):
+        """Index the files already on disk (oldest first)."""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name, st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._trim_disk()
+
+    async def get(self, key: str) -> bytes | None:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            return data
+        if key not in self._disk:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_file, key)
+        except OSError:
+            self._forget_disk(key)
+            return None
+        self._disk.move_to_end(key)
+        self._remember(key, data)
+        return data
+
+    async def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        try:
+            await asyncio.to_thread(self._write_file, key, data)
+        except OSError as e:
+            log(f"VOICEVOX cache write failed: {e}")
+            return
+        self._disk_size += len(data) - self._disk.get(key, 0)
+        self._disk[key] = len(data)
+        self._disk.move_to_end(key)
+        self._trim_disk()
+
+    def _read_file(self, key: str) -> bytes:
+        path = self._path(key)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path, None)
+        return data
+
+    def _write_file(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_bytes // 4:
+            return   # one huge clip would flush everything else
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _forget_disk(self, key: str):
+        self._disk_size -= self._disk.pop(key, 0)
+
+    def _trim_disk(self):
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+# ------------------------------------------------------------------------------
+# Proxy
+# ------------------------------------------------------------------------------
+class VoicevoxProxy:
+    """
+    HTTP proxy in front of the VOICEVOX engine. /audio_query and
+    /synthesis are answered from the cache; concurrent misses for the
+    same key share one upstream request. Everything else is passed through.
+    """
+
+    def __init__(self, upstream: str = VOICEVOX_URL, cache: AudioCache | None = None):
+        url = urlsplit(upstream)
+        self.upstream_host = url.hostname or "127.0.0.1"
+        self.upstream_port = url.port or 80
+        self.cache = cache
+        self._pending: dict[str, asyncio.Task] = {}
+        self._server = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def start(self, listen: str = PROXY_LISTEN) -> bool:
+        host, _, port = listen.rpartition(":")
+        if self.cache:
+            await asyncio.to_thread(self.cache.load)
+        try:
+            self._server = await asyncio.start_server(self._handle_client, host or "127.0.0.1", int(port))
+        except OSError as e:
+            log(f"VOICEVOX proxy could not listen on {listen}: {e}")
+            return False
+        log(f"VOICEVOX proxy on {listen} -> {self.upstream_host}:{self.upstream_port}")
+        return True
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    def close(self):
+        if self._server:
+            self._server.close()
+            log(f"VOICEVOX proxy: {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.coalesced} coalesced")
+
+    async def wait_closed(self):
+        if self._server:
+            await self._server.wait_closed()
+
+    # --- downstream (Unity) ---
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                head = await read_head(reader)
+                if head is None:
+                    break
+                (method, target, *rest), headers = head
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                body = await read_body(reader, headers)
+                status, resp_headers, resp_body = await self._dispatch(method, target, headers, body)
+                writer.write(format_response(status, resp_headers, resp_body))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close" or rest == ["HTTP/1.0"]:
+                    break
+        except HttpError as e:
+            writer.write(format_response(400, {"Content-Type": "text/plain"}, str(e).encode()))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, headers: dict, body: bytes):
+        url = urlsplit(target)
+        key = None
+        if method == "POST" and self.cache:
+            key = cache_key(url.path, dict(parse_qsl(url.query)), body)
+        try:
+            if key is None:
+                return await self._fetch(method, target, headers, body)
+            return await self._cached(key, lambda: self._fetch(method, target, headers, body))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HttpError) as e:
+            log(f"VOICEVOX upstream error: {e}")
+            return 502, {"Content-Type": "text/plain"}, f"VOICEVOX unreachable: {e}".encode()
+
+    async def _cached(self, key: str, fetch):
+        data = await self.cache.get(key)
+        if data is not None:
+            self.hits += 1
+            return 200, {"Content-Type": _content_type(data), "X-Unia-Cache": "HIT"}, data
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._fill(key, fetch))
+            self._pending[key] = task
+        # shielded: a client going away does not abort the shared request
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, fetch):
+        try:
+            status, headers, body = await fetch()
+            if status == 200:
+                await self.cache.put(key, body)
+            headers["X-Unia-Cache"] = "MISS"
+            return status, headers, body
+        finally:
+            del self._pending[key]
+
+    # --- upstream (VOICEVOX engine) ---
+    async def _fetch(self, method: str, target: str, headers: dict, body: bytes):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.upstream_host, self.upstream_port),
+            timeout=UPSTREAM_TIMEOUT_SEC)
+        try:
+            lines = [f"{method} {target} HTTP/1.1",
+                     f"Host: {self.upstream_host}:{self.upstream_port}",
+                     f"Content-Length: {len(body)}",
+                     "Connection: close"]
+            if "content-type" in headers:
+                lines.append(f"Content-Type: {headers['content-type']}")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+
+            async def read_response():
+                head = await read_head(reader)
+                if head is None:
+                    raise HttpError("VOICEVOX closed the connection")
+                (_, status, *_), resp_headers = head
+                return int(status), resp_headers, await read_body(reader, resp_headers, until_eof=True)
+
+            status, resp_headers, resp_body = await asyncio.wait_for(read_response(), UPSTREAM_TIMEOUT_SEC)
+        finally:
+            writer.close()
+        out_headers = {name.title(): value for name, value in resp_headers.items()
+                       if name not in HOP_BY_HOP}
+        return status, out_headers, resp_body
+
+
+def _content_type(data: bytes) -> str:
+    return "audio/wav" if data[:4] == b"RIFF" else "application/json"
+
+
+async def start_proxy(work_dir: str, listen: str = PROXY_LISTEN,
+                      upstream: str = VOICEVOX_URL) -> VoicevoxProxy | None:
+    """Start a proxy with its disk cache in WORK_DIR; None if it could not listen."""
+    proxy = VoicevoxProxy(upstream, AudioCache(os.path.join(work_dir, CACHE_DIR_NAME)))
+    return proxy if await proxy.start(listen) else None
+
+
+def unity_args(proxy: VoicevoxProxy | None, listen: str = PROXY_LISTEN,
+               upstream: str = VOICEVOX_URL) -> list:
+    """-voicevoxUrl for Unity: the proxy once it listens, the real engine otherwise."""
+    return ["-voicevoxUrl", f"http://{listen}" if proxy else upstream]
+
+
+@asynccontextmanager
+async def voicevox_proxy_context(work_dir: str, listen: str = PROXY_LISTEN,
+                                 upstream: str = VOICEVOX_URL):
+    """Run the proxy for the lifetime of the block (i.e. of the Unity process)."""
+    proxy = await start_proxy(work_dir, listen, upstream)
+    try:
+        yield proxy
+    finally:
+        if proxy:
+            proxy.close()
+            await proxy.wait_closed()
+
+
+if __name__ == "__main__":
+    # python -m unia_bridge.voicevox_proxy WORK_DIR [--listen H:P] [--upstream URL]
+    parser = argparse.ArgumentParser(prog="unia_bridge.voicevox_proxy")
+    parser.add_argument("work_dir")
+    parser.add_argument("--listen", default=PROXY_LISTEN)
+    parser.add_argument("--upstream", default=VOICEVOX_URL)
+    opts = parser.parse_args()
+
+    async def serve():
+        proxy = await start_proxy(opts.work_dir, opts.listen, opts.upstream)
+        if proxy:
+            try:
+                await proxy.serve_forever()
+            finally:
+                proxy.close()
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -2,6 +2,7 @@ using UnityEngine;
 using Cysharp.Threading.Tasks;
 using UniVRM10;
 using System; // BitConverterなどに必要
+using System.Collections.Generic;
 
 /// <summary>
 /// アバターの表情や動作、音声を制御するマネージャークラス
@@ -33,6 +34,12 @@ public class AvatarController : MonoBehaviour
 
     private ExpressionKey mouthBlendKey;
 
+    // 文単位のキュー再生（ブリッジが長文を分割して送る場合）
+    private string _utteranceId;
+    private int _nextChunkIndex;
+    private readonly Dictionary<int, AudioClip> _pendingChunks = new Dictionary<int, AudioClip>();
+    private bool _chunkPlayerRunning;
+
     public static AvatarController Instance
     {
         get
@@ -194,6 +201,10 @@ public class AvatarController : MonoBehaviour
 
         await UniTask.SwitchToMainThread();
 
+        // 分割発話の途中でも、通常の発話が来たらそちらを優先する
+        _utteranceId = null;
+        _pendingChunks.Clear();
+
         Debug.Log("🗣️ Avatar: Start speaking...");
         if (_audioSource.isPlaying) _audioSource.Stop();
         
@@ -203,6 +214,57 @@ public class AvatarController : MonoBehaviour
         await LipSyncAsync();
     }
 
+    /// <summary>
+    /// 分割された発話の 1 文を受け取り、index 順に途切れなく再生する。
+    /// 合成は並行して進むため、届く順番は index 順とは限らない。
+    /// 新しい utteranceId が来たら、それまでの発話は止めて破棄する。
+    /// wavData が null の文（合成失敗）は飛ばす。
+    /// </summary>
+    public async UniTask EnqueueSpeechChunkAsync(string utteranceId, int index, byte[] wavData)
+    {
+        await UniTask.SwitchToMainThread();
+
+        if (_audioSource == null)
+        {
+            Debug.LogError("AvatarController: VRMインスタンスのAudioSourceが設定されていません。VRMインスタンスの登録を確認してください。");
+            return;
+        }
+
+        AudioClip clip = wavData != null ? ToAudioClip(wavData) : null;
+
+        if (utteranceId != _utteranceId)
+        {
+            _utteranceId = utteranceId;
+            _nextChunkIndex = 0;
+            _pendingChunks.Clear();
+            if (_audioSource.isPlaying) _audioSource.Stop();
+        }
+        _pendingChunks[index] = clip;
+
+        if (_chunkPlayerRunning) return;  // 再生ループが拾う
+        _chunkPlayerRunning = true;
+        try
+        {
+            while (_pendingChunks.TryGetValue(_nextChunkIndex, out AudioClip next))
+            {
+                _pendingChunks.Remove(_nextChunkIndex);
+                _nextChunkIndex++;
+                if (next == null) continue;
+
+                // 直前の文（または通常の発話）が終わるまで待つ
+                while (_audioSource.isPlaying) await UniTask.Yield();
+
+                Debug.Log($"🗣️ Avatar: Speaking chunk {_nextChunkIndex - 1}...");
+                _audioSource.clip = next;
+                await LipSyncAsync();
+            }
+        }
+        finally
+        {
+            _chunkPlayerRunning = false;
+        }
+    }
+
     private async UniTask LipSyncAsync()
     {
         await UniTask.SwitchToMainThread();
@@ -0,0 +1,95 @@
+using System;
+using System.IO;
+using System.Security.Cryptography;
+using ModelContextProtocol.Protocol;
+
+/// <summary>
+/// 大きなバイナリ結果（WAV、スクリーンショット、モーションデータ）をツールから返すためのヘルパー。
+/// 起動引数 -blobDir <dir> があれば、データをそのディレクトリ（ブリッジの WORK_DIR/blobs）に
+/// ファイルとして書き、JSON には resource_link（unia-blob:&lt;file&gt;?offset=..&amp;length=..&amp;sha256=..）だけを載せる。
+/// base64 で 33% 膨らんだ本体が JSON-RPC の 1 行に乗らないので、TCP もパースも軽くなる。
+/// ブリッジ（unia_bridge.blobs）がホストに渡す直前に中身を読み出す。古いファイルはブリッジが消す。
+/// -blobDir がなければ（ブリッジなしで直接つないだ場合など）従来どおり base64 で埋め込む。
+/// </summary>
+public static class BlobSpool
+{
+    private static readonly string _dir = TestMcpStreamServer.GetArgValue("-blobDir");
+
+    public static bool Enabled => !string.IsNullOrEmpty(_dir);
+
+    /// <summary>
+    /// data を返すコンテンツ。suffix はファイル名の拡張子（".wav" など）。
+    /// </summary>
+    public static ContentBlock ToContent(byte[] data, string mimeType, string suffix = "")
+    {
+        if (!Enabled)
+        {
+            return Inline(data, mimeType);
+        }
+        try
+        {
+            return Write(data, mimeType, suffix);
+        }
+        catch (IOException ex)
+        {
+            UnityEngine.Debug.LogWarning($"[BlobSpool] write failed, sending inline: {ex.Message}");
+            return Inline(data, mimeType);
+        }
+    }
+
+    private static ResourceLinkBlock Write(byte[] data, string mimeType, string suffix)
+    {
+        string hash;
+        using (var sha = SHA256.Create())
+        {
+            hash = BitConverter.ToString(sha.ComputeHash(data)).Replace("-", "").ToLowerInvariant();
+        }
+
+        // 内容アドレス：同じデータは同じファイル。書きかけを読まれないよう tmp に書いてから rename
+        string name = hash.Substring(0, 32) + suffix;
+        string path = Path.Combine(_dir, name);
+        if (File.Exists(path))
+        {
+            File.SetLastWriteTimeUtc(path, DateTime.UtcNow); // ブリッジの LRU / TTL 用
+        }
+        else
+        {
+            Directory.CreateDirectory(_dir);
+            string tmpPath = path + "." + Guid.NewGuid().ToString("N") + ".tmp";
+            File.WriteAllBytes(tmpPath, data);
+            try
+            {
+                File.Move(tmpPath, path);
+            }
+            catch (IOException) when (File.Exists(path))
+            {
+                File.Delete(tmpPath); // 同じ内容を別スレッドが先に書いた
+            }
+        }
+
+        return new ResourceLinkBlock
+        {
+            Uri = $"unia-blob:{Uri.EscapeDataString(name)}?offset=0&length={data.Length}&sha256={hash}&type={Uri.EscapeDataString(mimeType)}",
+            Name = name,
+            MimeType = mimeType,
+            Size = data.Length
+        };
+    }
+
+    private static ContentBlock Inline(byte[] data, string mimeType)
+    {
+        string base64 = Convert.ToBase64String(data);
+        if (mimeType.StartsWith("audio/"))
+        {
+            return new AudioContentBlock { Data = base64, MimeType = mimeType };
+        }
+        if (mimeType.StartsWith("image/"))
+        {
+            return new ImageContentBlock { Data = base64, MimeType = mimeType };
+        }
+        return new EmbeddedResourceBlock
+        {
+            Resource = new BlobResourceContents { Uri = "unia-blob:inline", MimeType = mimeType, Blob = base64 }
+        };
+    }
+}
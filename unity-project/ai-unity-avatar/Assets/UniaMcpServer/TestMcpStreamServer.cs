@@ -1,4 +1,6 @@
 using System;
+using System.IO;
+using System.IO.Pipes;
 using System.Net;
 using System.Net.Sockets;
 using System.Threading;
@@ -132,7 +134,7 @@ public class TestMcpStreamServer
                                 Name = "ai-unia-speak",
                                 Description = "Makes the avatar speak a given text using AI voice.",
                                 InputSchema = JsonDocument
-                                    .Parse(@"{""type"":""object"",""properties"":{""text"":{""type"":""string"",""description"":""The text for the avatar to speak.""}},""required"":[""text""]}")
+                                    .Parse(@"{""type"":""object"",""properties"":{""text"":{""type"":""string"",""description"":""The text for the avatar to speak.""},""interrupt"":{""type"":""boolean"",""description"":""Drop the speech still waiting in the bridge and say this right away.""},""returnAudio"":{""type"":""boolean"",""description"":""Also return the synthesized speech as audio/wav.""}},""required"":[""text""]}")
                                     .RootElement
                             }
                             // --- 追加ここまで ---
@@ -210,6 +212,23 @@ public class TestMcpStreamServer
                             };
                         }
 
+                        // ブリッジが長文を文単位に分割したときだけ付く内部引数（スキーマには載せない）。
+                        // utterance: 発話ID / index: 文の順番。Unity 側は index 順に続けて再生する。
+                        string utteranceId = null;
+                        int chunkIndex = 0;
+                        if (req.Params.Arguments.TryGetValue("utterance", out var utteranceElement) &&
+                            utteranceElement.ValueKind == JsonValueKind.String &&
+                            req.Params.Arguments.TryGetValue("index", out var indexElement) &&
+                            indexElement.ValueKind == JsonValueKind.Number)
+                        {
+                            utteranceId = utteranceElement.GetString();
+                            chunkIndex = indexElement.GetInt32();
+                        }
+
+                        // returnAudio: 合成した WAV も結果に載せる。-blobDir があれば BlobSpool 経由でリンクだけ送る
+                        bool returnAudio = req.Params.Arguments.TryGetValue("returnAudio", out var returnAudioElement) &&
+                                           returnAudioElement.ValueKind == JsonValueKind.True;
+
                         try
                         {
                             Debug.Log($"[MCP] Received 'ai-unia-speak' request for: \"{textToSpeak}\"");
@@ -218,7 +237,8 @@ public class TestMcpStreamServer
                             // ここはMCPサーバーのスレッド（サブスレッド）で実行される
                             (string queryJson, byte[] wavBytes) = await VoicevoxClient.Instance.GenerateAudioAsync(
                                 _defaultVoiceVoxSpeakerId, 
-                                textToSpeak
+                                textToSpeak,
+                                cancellationToken: ct // notifications/cancelled で HTTP 通信も中断
                             );
 
                             if (wavBytes == null || wavBytes.Length == 0)
@@ -229,7 +249,14 @@ public class TestMcpStreamServer
                             // AvatarControllerのSpeakAsyncを呼び出す。
                             // SpeakAsync内部でUniTask.SwitchToMainThread() が行われるため、
                             // サブスレッドから呼び出しても安全。Forget() で待たない。
-                            AvatarController.Instance.SpeakAsync(wavBytes).Forget();
+                            if (utteranceId != null)
+                            {
+                                AvatarController.Instance.EnqueueSpeechChunkAsync(utteranceId, chunkIndex, wavBytes).Forget();
+                            }
+                            else
+                            {
+                                AvatarController.Instance.SpeakAsync(wavBytes).Forget();
+                            }
                             
                             var textBlock = new TextContentBlock { Text = $"Avatar speaking: \"{textToSpeak}\"" };
                             var result = new CallToolResult
@@ -237,11 +264,30 @@ public class TestMcpStreamServer
                                 Content = new List<ContentBlock> { textBlock },
                                 IsError = false
                             };
+                            if (returnAudio)
+                            {
+                                result.Content.Add(BlobSpool.ToContent(wavBytes, "audio/wav", ".wav"));
+                            }
                             return result;
                         }
+                        catch (OperationCanceledException) when (ct.IsCancellationRequested)
+                        {
+                            // ブリッジのタイムアウトやホストのキャンセル。応答は不要
+                            Debug.Log($"[MCP] 'ai-unia-speak' cancelled: \"{textToSpeak}\"");
+                            if (utteranceId != null)
+                            {
+                                AvatarController.Instance.EnqueueSpeechChunkAsync(utteranceId, chunkIndex, null).Forget();
+                            }
+                            throw;
+                        }
                         catch (Exception ex)
                         {
                             Debug.LogError($"Error in ai-unia-speak tool: {ex}");
+                            if (utteranceId != null)
+                            {
+                                // 後続の文が止まらないよう、この文は飛ばす
+                                AvatarController.Instance.EnqueueSpeechChunkAsync(utteranceId, chunkIndex, null).Forget();
+                            }
                             var errBlock = new TextContentBlock { Text = $"Error in speaking: {ex.Message}" };
                             return new CallToolResult
                             {
@@ -263,11 +309,28 @@ public class TestMcpStreamServer
             }
         };
 
-        // TCP リスナーを生成（ポート8080）
-        var listener = new TcpListener(IPAddress.Loopback, 8080);
+        // ローカル接続（起動引数 -mcpPipe <名前/パス>）。TCP より先に開いておく
+        // （ブリッジは TCP が開いた時点でこちらも使えるものとして試す）
+        string localEndpoint = GetArgValue("-mcpPipe");
+        if (!string.IsNullOrEmpty(localEndpoint))
+        {
+            try
+            {
+                StartLocalListener(localEndpoint, options, cancellationToken);
+            }
+            catch (Exception ex)
+            {
+                // 使えなければ TCP のみ（ブリッジも TCP にフォールバックする）
+                Debug.LogError($"Local MCP endpoint {localEndpoint} failed: {ex.Message}");
+            }
+        }
+
+        // TCP リスナーを生成（ポート8080、起動引数 -mcpPort <port> で変更。複数起動するアバタープール用）
+        int port = int.TryParse(GetArgValue("-mcpPort"), out var argPort) ? argPort : 8080;
+        var listener = new TcpListener(IPAddress.Loopback, port);
         listener.Start();
 
-        Debug.Log("TCP Listener started on port 8080");
+        Debug.Log($"TCP Listener started on port {port}");
         
         while (!cancellationToken.IsCancellationRequested)
         {
@@ -316,4 +379,122 @@ public class TestMcpStreamServer
         listener.Stop();
         Debug.Log("TCP Listener stopped");
     }
+
+    internal static string GetArgValue(string name)
+    {
+        string[] args = Environment.GetCommandLineArgs();
+        for (int i = 0; i < args.Length - 1; i++)
+        {
+            if (args[i] == name) return args[i + 1];
+        }
+        return null;
+    }
+
+    // Windows は名前付きパイプ（\\.\pipe\名前）、それ以外は UNIX ドメインソケット（ファイルパス）。
+    // どちらも TCP と同じ改行区切りの JSON-RPC
+    private const string PipePrefix = @"\\.\pipe\";
+
+    private static void StartLocalListener(string endpoint, McpServerOptions options, CancellationToken ct)
+    {
+        if (endpoint.StartsWith(PipePrefix))
+        {
+            string pipeName = endpoint.Substring(PipePrefix.Length);
+            var first = CreatePipe(pipeName);
+            _ = Task.Run(() => AcceptPipesAsync(pipeName, first, options, ct), ct);
+        }
+        else
+        {
+            if (File.Exists(endpoint)) File.Delete(endpoint); // 前回のソケットファイル
+            var socket = new Socket(AddressFamily.Unix, SocketType.Stream, ProtocolType.Unspecified);
+            socket.Bind(new UnixDomainSocketEndPoint(endpoint));
+            socket.Listen(16);
+            _ = Task.Run(() => AcceptUnixAsync(socket, endpoint, options, ct), ct);
+        }
+        Debug.Log($"Local MCP endpoint started on {endpoint}");
+    }
+
+    private static NamedPipeServerStream CreatePipe(string pipeName)
+    {
+        return new NamedPipeServerStream(pipeName, PipeDirection.InOut,
+            NamedPipeServerStream.MaxAllowedServerInstances, PipeTransmissionMode.Byte, PipeOptions.Asynchronous);
+    }
+
+    private static async Task AcceptPipesAsync(string pipeName, NamedPipeServerStream pipe,
+                                               McpServerOptions options, CancellationToken ct)
+    {
+        while (!ct.IsCancellationRequested)
+        {
+            try
+            {
+                await pipe.WaitForConnectionAsync(ct);
+            }
+            catch (OperationCanceledException)
+            {
+                break;
+            }
+            catch (Exception ex)
+            {
+                Debug.LogError($"Named pipe error: {ex}");
+                pipe.Dispose();
+                pipe = CreatePipe(pipeName);
+                continue;
+            }
+            var connected = pipe;
+            pipe = CreatePipe(pipeName); // 次の接続用のインスタンスを先に用意
+            _ = Task.Run(() => ServeStreamAsync(connected, "named pipe", options, ct), ct);
+        }
+        pipe.Dispose();
+        Debug.Log("Local MCP endpoint stopped");
+    }
+
+    private static async Task AcceptUnixAsync(Socket listener, string path,
+                                              McpServerOptions options, CancellationToken ct)
+    {
+        using (ct.Register(() => listener.Close())) // 停止時に AcceptAsync を抜ける
+        {
+            while (!ct.IsCancellationRequested)
+            {
+                Socket client;
+                try
+                {
+                    client = await listener.AcceptAsync();
+                }
+                catch (Exception) when (ct.IsCancellationRequested)
+                {
+                    break;
+                }
+                catch (Exception ex)
+                {
+                    Debug.LogError($"Unix socket error: {ex}");
+                    await Task.Delay(50);
+                    continue;
+                }
+                _ = Task.Run(() => ServeStreamAsync(new NetworkStream(client, true), "unix socket", options, ct), ct);
+            }
+        }
+        try { File.Delete(path); } catch (IOException) { }
+        Debug.Log("Local MCP endpoint stopped");
+    }
+
+    private static async Task ServeStreamAsync(Stream stream, string kind, McpServerOptions options, CancellationToken ct)
+    {
+        Debug.Log($"Client connected: {kind}");
+        try
+        {
+            using (stream)
+            {
+                var transport = new StreamServerTransport(stream, stream);
+                var server = McpServer.Create(transport, options);
+                await server.RunAsync(ct);
+            }
+        }
+        catch (Exception clientEx)
+        {
+            Debug.LogError($"Error handling client connection: {clientEx}");
+        }
+        finally
+        {
+            Debug.Log($"Client disconnected: {kind}");
+        }
+    }
 }
\ No newline at end of file
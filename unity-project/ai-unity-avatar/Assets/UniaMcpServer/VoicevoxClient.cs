@@ -1,6 +1,7 @@
 using System;
 using System.Net.Http;
 using System.Text;
+using System.Threading;
 using System.Threading.Tasks;
 using UnityEngine;
 
@@ -20,16 +21,37 @@ public sealed class VoicevoxClient
 
     private readonly HttpClient _http;
 
-    private const string BASE_URL = "http://127.0.0.1:50021";
+    private const string DEFAULT_BASE_URL = "http://127.0.0.1:50021";
+
+    // 起動引数 -voicevoxUrl <url>（なければ環境変数 VOICEVOX_URL）で差し替え可能。
+    // ブリッジはキャッシュ付きプロキシ（unia_bridge.voicevox_proxy）を指定して起動する。
+    private readonly string _baseUrl;
 
     private VoicevoxClient()
     {
         _http = new HttpClient();
+        _baseUrl = ResolveBaseUrl();
+    }
+
+    private static string ResolveBaseUrl()
+    {
+        string[] args = Environment.GetCommandLineArgs();
+        for (int i = 0; i < args.Length - 1; i++)
+        {
+            if (args[i].ToLower() == "-voicevoxurl")
+            {
+                return args[i + 1].TrimEnd('/');
+            }
+        }
+
+        string env = Environment.GetEnvironmentVariable("VOICEVOX_URL");
+        return string.IsNullOrEmpty(env) ? DEFAULT_BASE_URL : env.TrimEnd('/');
     }
 
     /// <summary>
     /// VOICEVOXに問い合わせて、UniVRMに渡すための
     /// queryJson と wavBytes を生成する。
+    /// cancellationToken: MCP リクエストがキャンセルされたら HTTP 通信も止める。
     /// </summary>
     public async Task<(string queryJson, byte[] wavBytes)> GenerateAudioAsync(
         int styleId,
@@ -37,15 +59,17 @@ public sealed class VoicevoxClient
         float speedScale = 1.0f,
         float pitchScale = 0.0f,
         float intonationScale = 1.0f,
-        float volumeScale = 1.0f
+        float volumeScale = 1.0f,
+        CancellationToken cancellationToken = default
     )
     {
         text = RemoveBracketText(text);
 
         // --- 1) audio_query ---
         var queryResponse = await _http.PostAsync(
-            $"{BASE_URL}/audio_query?text={Uri.EscapeDataString(text)}&speaker={styleId}",
-            null
+            $"{_baseUrl}/audio_query?text={Uri.EscapeDataString(text)}&speaker={styleId}",
+            null,
+            cancellationToken
         );
 
         if (!queryResponse.IsSuccessStatusCode)
@@ -68,8 +92,9 @@ public sealed class VoicevoxClient
         var content = new StringContent(modifiedQueryJson, Encoding.UTF8, "application/json");
 
         var synthesisResponse = await _http.PostAsync(
-            $"{BASE_URL}/synthesis?speaker={styleId}",
-            content
+            $"{_baseUrl}/synthesis?speaker={styleId}",
+            content,
+            cancellationToken
         );
 
         if (!synthesisResponse.IsSuccessStatusCode)
@@ -1,153 +1,32 @@
 import asyncio
 import sys
 import os
-import subprocess
-from contextlib import asynccontextmanager
 
 #
-# global setting.
+# Development launcher for the bridge.
+# Runs the shipped bridge (ai-unia-mcpb/ai_unia_mcp_server.py) against the
+# local Unity build, so the mock clients in this folder always test the
+# same code that gets packed into the .mcpb.
 #
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(line_buffering=False, write_through=True)
+BRIDGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ai-unia-mcpb"))
+sys.path.insert(0, BRIDGE_DIR)
 
 # --- Settings ---
-# 1. Path to Unity executable
-UNITY_EXE_PATH = "C:\\work\\lambda-tuber\\ai-unity-avatar\\unity-project\\build\\ai-unity-avatar.exe"
-# 2. Path to log file (Unity output)
-LOG_FILE = "C:\\work\\lambda-tuber\\ai-unity-avatar\\unity-project\\build\\mcp-stdio.log"
+WORK_DIR = "C:\\work\\lambda-tuber\\ai-unity-avatar\\unity-project\\build"
+sys.argv[1:] = [WORK_DIR] + [arg for arg in sys.argv[1:] if arg.startswith("--log-")]
+# Trace every frame on stderr (truncated); override with --log-level=info
+os.environ.setdefault("UNIA_LOG_LEVEL", "debug")
 
-# 3. TCP configuration
-TCP_HOST = "127.0.0.1"
-TCP_PORT = 8080
-STARTUP_WAIT_SEC = 5  # Wait time for Unity startup
-# ---
-
-def log(msg):
-    """
-    Output debug log to stderr.
-    Important: stdout must not be used for debug messages,
-    because stdout is used for the MCP protocol.
-    """
-    sys.stderr.write(f"[Bridge] {msg}\n")
-    sys.stderr.flush()
-
-# ------------------------------------------------------------------------------
-# 1. Process management: Launch Unity
-# ------------------------------------------------------------------------------
-@asynccontextmanager
-async def unity_process_context(exe_path: str, args: list):
-    process: subprocess.Popen | None = None
-    try:
-        log(f"Launching Unity: {os.path.basename(exe_path)}")
-
-        # Launch Unity as an independent process
-        cmd = [exe_path] + args
-        process = subprocess.Popen(cmd)
-
-        log(f"Waiting {STARTUP_WAIT_SEC} seconds for TCP server to be ready...")
-        await asyncio.sleep(STARTUP_WAIT_SEC)
-
-        yield process
-
-    finally:
-        if process:
-            log(f"Terminating Unity process (PID: {process.pid})")
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            log("Process terminated")
-
-# ------------------------------------------------------------------------------
-# 2. Bridge: Stdin <-> TCP <-> Stdout
-# ------------------------------------------------------------------------------
-async def pipe_stdin_to_tcp(writer: asyncio.StreamWriter):
-    """
-    Read from stdin (MCP client request) and forward to TCP (Unity)
-    """
-    loop = asyncio.get_running_loop()
-    try:
-        while True:
-            # Use executor for cross-platform blocking readline
-            line = await loop.run_in_executor(None, sys.stdin.readline)
-
-            if not line:  # EOF detected
-                break
-
-            send_line = line.encode('utf-8')
-            log(f"Stdin->TCP : {send_line}")
-            writer.write(send_line)
-            await writer.drain()
-
-    except Exception as e:
-        log(f"Stdin->TCP Error: {e}")
-    finally:
-        log("Stdin closed -> closing TCP writer")
-        if not writer.is_closing():
-            writer.close()
+import ai_unia_mcp_server as bridge
 
-async def pipe_tcp_to_stdout(reader: asyncio.StreamReader):
-    """
-    Read from TCP (Unity response) and write to stdout (MCP client)
-    """
-    try:
-        while True:
-            line = await reader.readline()
-            if not line:  # TCP closed
-                break
-
-            sys.stdout.write(line.decode('utf-8'))
-            sys.stdout.flush()
-
-    except Exception as e:
-        log(f"TCP->Stdout Error: {e}")
-    finally:
-        log("TCP connection closed")
-
-# ------------------------------------------------------------------------------
-# Main
-# ------------------------------------------------------------------------------
-async def main():
-    # Unity launch arguments
-    args = ["-logFile", LOG_FILE]
-
-    try:
-        # 1. Start Unity
-        async with unity_process_context(UNITY_EXE_PATH, args):
-
-            # 2. Connect to Unity TCP server
-            log(f"Attempting TCP connection: {TCP_HOST}:{TCP_PORT}")
-            try:
-                reader, writer = await asyncio.open_connection(TCP_HOST, TCP_PORT)
-                log("TCP connection established. Starting bridge.")
-
-                # 3. Start bidirectional piping
-                task_in = asyncio.create_task(pipe_stdin_to_tcp(writer))
-                task_out = asyncio.create_task(pipe_tcp_to_stdout(reader))
-
-                done, pending = await asyncio.wait(
-                    [task_in, task_out],
-                    return_when=asyncio.FIRST_COMPLETED
-                )
-
-                for t in pending:
-                    t.cancel()
-
-            except ConnectionRefusedError:
-                log("Connection refused: Unity may not be running or port is closed.")
-            except Exception as e:
-                log(f"Bridge error: {e}")
-
-    except Exception as e:
-        log(f"Fatal error: {e}")
+# Path to log file (Unity output)
+bridge.LOG_FILE = os.path.join(WORK_DIR, "mcp-stdio.log")
+# ---
 
 if __name__ == "__main__":
-    if sys.platform == 'win32':
-         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    bridge.set_event_loop_policy()
 
     try:
-        asyncio.run(main())
+        asyncio.run(bridge.main())
     except KeyboardInterrupt:
         pass
@@ -0,0 +1,121 @@
+import asyncio
+import sys
+import os
+import json
+import argparse
+import platform
+import shutil
+import tempfile
+import time
+
+#
+# Large tool results: inline base64 vs the bridge's blob side channel.
+#
+#   inline : Unity sends the audio as base64 inside the JSON-RPC line
+#   spool  : Unity writes it to the blob dir and sends a unia-blob: link;
+#            the bridge inlines it on the way to stdout
+#
+# mock_unity_server.py answers echo {"blob": n} (different bytes every call), the
+# frames are read with the bridge's FrameReader and resolved with
+# unia_bridge.blobs, so the time is from the request until the frame is ready
+# for stdout, Unity's encoding / file write included. Also reports the bytes
+# that cross the Unity connection per call.
+#
+#   python bench_blob_spool.py
+#   python bench_blob_spool.py --sizes 65536,1048576,16777216 --count 20 --out new.json
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEST_PY_DIR)
+sys.path.insert(0, os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb"))
+
+from bench_mcp_load import percentiles
+from mock_unity_server import start_mock_server
+from unia_bridge.blobs import BlobSpool
+from unia_bridge.relay import FrameReader
+
+MODES = ("inline", "spool")
+
+
+def request(request_id, size, mode):
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                       "params": {"name": "echo",
+                                  "arguments": {"message": "x", "blob": size,
+                                                "spool": mode != "inline"}}}).encode() + b"\n"
+
+
+async def measure(frames_in, writer, spool, size, mode, count):
+    samples, wire = [], 0
+    for i in range(count):
+        start = time.perf_counter()
+        writer.write(request(i, size, mode))
+        await writer.drain()
+        frames = await frames_in.read_frames()
+        if not frames:
+            raise ConnectionError("closed by the server")
+        wire += sum(len(frame) for frame in frames)
+        if mode == "spool":
+            frames = await spool.deliver(frames)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, wire // count
+
+
+async def run(opts):
+    blob_dir = tempfile.mkdtemp(prefix="unia-blobs-")
+    server, _ = await start_mock_server(port=opts.port, blob_dir=blob_dir)
+    spool = BlobSpool(blob_dir, ttl_sec=60)
+    results = []
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", opts.port, limit=2 ** 16)
+        frames_in = FrameReader(reader, max_frame=1 << 30)
+        try:
+            for size in opts.sizes:
+                for mode in MODES:
+                    await measure(frames_in, writer, spool, size, mode, 2)   # warm up
+                    samples, wire = await measure(frames_in, writer, spool, size, mode, opts.count)
+                    results.append({"size": size, "mode": mode, "wire_bytes": wire,
+                                    "ms": percentiles(samples)})
+                    print(f"   {size:>9} {mode:<6} done")
+                await asyncio.to_thread(spool.sweep)
+        finally:
+            writer.close()
+            await asyncio.gather(writer.wait_closed(), return_exceptions=True)
+    finally:
+        server.close()
+        await asyncio.sleep(0.1)
+        shutil.rmtree(blob_dir, ignore_errors=True)
+    return {"count": opts.count, "results": results,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def print_report(result):
+    print(f"\n📊 echo with a blob, {result['count']} calls per row")
+    print(f"   {'size':>9} {'mode':<6} {'on the wire':>12} {'p50':>9} {'p95':>9}")
+    for r in result["results"]:
+        print(f"   {r['size']:>9} {r['mode']:<6} {r['wire_bytes']:>12} "
+              f"{r['ms']['p50']:>7.2f}ms {r['ms']['p95']:>7.2f}ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Blob side channel benchmark")
+    parser.add_argument("--sizes", default="65536,1048576,8388608",
+                        type=lambda text: [int(s) for s in text.split(",") if s])
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8092)
+    parser.add_argument("--out", help="write the result JSON here")
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    result = asyncio.run(run(opts))
+    print_report(result)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"💾 saved {opts.out}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
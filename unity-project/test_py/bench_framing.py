@@ -0,0 +1,77 @@
+import json
+import sys
+import os
+import time
+
+#
+# Host message validation cost: unia_bridge.framing.FrameValidator.on_line()
+# per frame, for each installed JSON backend (stdlib json, orjson),
+# next to the cheap peek_frame() the bridge does anyway.
+#
+#   python bench_framing.py [--seconds 0.5]
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb"))
+
+from unia_bridge import framing
+from unia_bridge.metrics import peek_frame
+
+
+def line(msg) -> bytes:
+    return json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def call(n, text):
+    return {"jsonrpc": "2.0", "id": n, "method": "tools/call",
+            "params": {"name": "ai-unia-speak", "arguments": {"text": text}}}
+
+
+FRAMES = {
+    "notification": line({"jsonrpc": "2.0", "method": "notifications/progress",
+                          "params": {"progressToken": 1, "progress": 50, "total": 100}}),
+    "tools/call 100B": line(call(1, "こんにちは")),
+    "tools/call 4KB": line(call(2, "あ" * 1300)),
+    "tools/call 64KB": line(call(3, "a" * 65000)),
+    "batch of 10": line([call(n, "はい") for n in range(10)]),
+}
+
+
+def per_frame_us(fn, frame, seconds) -> float:
+    count, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(100):
+            fn(frame)
+        count += 100
+        now = time.perf_counter()
+        if now >= deadline:
+            return (now - start) / count * 1e6
+
+
+def main():
+    seconds = float(sys.argv[sys.argv.index("--seconds") + 1]) if "--seconds" in sys.argv else 0.5
+    backends = list(framing.BACKENDS)
+    print(f"{'frame':<18}{'bytes':>8}{'peek':>10}" + "".join(f"{name:>10}" for name in backends) + "  (us/frame)")
+    for name, frame in FRAMES.items():
+        row = f"{name:<18}{len(frame):>8}{per_frame_us(peek_frame, frame, seconds):>10.2f}"
+        for backend in backends:
+            framing.use_backend(backend)
+            validator = framing.FrameValidator()
+            # batches: split, then answer every member so nothing piles up
+            if frame[:1] == b"[":
+                replies = [framing.dumps_line({"jsonrpc": "2.0", "id": n, "result": {}}) for n in range(10)]
+
+                def run(f):
+                    validator.on_line(f)
+                    validator.collect(replies)
+            else:
+                run = validator.on_line
+            row += f"{per_frame_us(run, frame, seconds):>10.2f}"
+        print(row)
+    if "orjson" not in framing.BACKENDS:
+        print("orjson is not installed (pip install orjson)")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -0,0 +1,281 @@
+import asyncio
+import sys
+import os
+import json
+import argparse
+import platform
+import random
+import tempfile
+import time
+
+#
+# Load / latency benchmark for the Unity MCP endpoint.
+#
+#   target tcp    : N direct TCP clients (UnityMcpClient) -> Unity (or mock)
+#   target bridge : N stdio bridges (ai_unia_mcp_server.py) -> Unity (or mock)
+#
+#   workload echo  : echo only
+#   workload mixed : ai-unia-smile / ai-unia-speak / echo
+#
+#   transport tcp|http : what the bridge speaks to Unity (UNIA_TRANSPORT) and,
+#                        with --mock, what the mock serves (bridge target only for http)
+#
+#   mode burst  : each client keeps --inflight calls outstanding until --requests are done
+#   mode steady : open-loop, --rate calls/sec in total spread over the clients
+#
+# examples:
+#   python bench_mcp_load.py --mock --workload echo --clients 4 --requests 2000
+#   python bench_mcp_load.py --mock --target bridge --workload mixed --mode steady --rate 200
+#   python bench_mcp_load.py --mock --out new.json --compare baseline.json
+#   python bench_mcp_load.py --mock --target bridge --transport http --compare bridge_tcp.json
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+BRIDGE_SCRIPT = os.path.abspath(os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb", "ai_unia_mcp_server.py"))
+sys.path.insert(0, TEST_PY_DIR)
+
+from test_mcp_client_direct_connect_to_tcp import UnityMcpClient
+from mock_unity_server import start_mock_server
+
+SPEAK_TEXTS = [
+    "こんにちは",
+    "えっと…みくるです。",
+    "禁則事項です。",
+    "あ、あの…こんにちは、みくるです…♪",
+]
+
+
+# ------------------------------------------------------------------------------
+# Clients
+# ------------------------------------------------------------------------------
+class BridgeMcpClient(UnityMcpClient):
+    """UnityMcpClient over a bridge subprocess's stdin/stdout."""
+
+    def __init__(self, work_dir, bridge_script=BRIDGE_SCRIPT, transport="tcp", **kwargs):
+        super().__init__(**kwargs)
+        self.work_dir = work_dir
+        self.bridge_script = bridge_script
+        self.transport = transport
+        self.process = None
+
+    async def connect(self):
+        env = dict(os.environ, PYTHONUTF8="1", UNIA_DAEMON="1", UNIA_TRANSPORT=self.transport)
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, self.bridge_script, self.work_dir,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=env, limit=16 * 1024 * 1024)
+        self.reader, self.writer = self.process.stdout, self.process.stdin
+        self._reader_task = asyncio.create_task(self._read_loop())
+        init_result = await self._send_request("initialize", {
+            "protocolVersion": "2024-11-05", "capabilities": {},
+            "clientInfo": {"name": "bench", "version": "1.0"}})
+        await self._send_notification("notifications/initialized")
+        return init_result
+
+    async def close(self):
+        if self.process:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=10.0)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if self._reader_task:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+
+def pick_call(workload, rnd):
+    if workload == "echo":
+        return "echo", {"message": "bench"}
+    roll = rnd.random()
+    if roll < 0.5:
+        return "ai-unia-smile", {}
+    if roll < 0.8:
+        return "ai-unia-speak", {"text": rnd.choice(SPEAK_TEXTS)}
+    return "echo", {"message": "bench"}
+
+
+# ------------------------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # tool -> [ms]
+        self.errors = 0
+
+    async def timed_call(self, client, name, arguments, timeout):
+        start = time.perf_counter()
+        try:
+            result = await client.call_tool(name, arguments, timeout=timeout)
+            if result.get("isError"):
+                self.errors += 1
+                return
+        except Exception:
+            self.errors += 1
+            return
+        self.samples.setdefault(name, []).append((time.perf_counter() - start) * 1000.0)
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+    return {"count": len(ordered),
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": round(pct(50), 3), "p95": round(pct(95), 3),
+            "p99": round(pct(99), 3), "max": round(ordered[-1], 3)}
+
+
+async def run_burst(clients, opts, recorder):
+    per_client = opts.requests // len(clients)
+
+    async def drive(index, client):
+        rnd = random.Random(index)
+        sem = asyncio.Semaphore(opts.inflight)
+
+        async def one():
+            async with sem:
+                name, arguments = pick_call(opts.workload, rnd)
+                await recorder.timed_call(client, name, arguments, opts.timeout)
+        await asyncio.gather(*(one() for _ in range(per_client)))
+
+    await asyncio.gather(*(drive(i, c) for i, c in enumerate(clients)))
+
+
+async def run_steady(clients, opts, recorder):
+    interval = len(clients) / opts.rate
+    deadline = time.perf_counter() + opts.duration
+
+    async def drive(index, client):
+        rnd = random.Random(index)
+        tasks = []
+        next_at = time.perf_counter() + interval * index / len(clients)
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            name, arguments = pick_call(opts.workload, rnd)
+            tasks.append(asyncio.create_task(recorder.timed_call(client, name, arguments, opts.timeout)))
+            next_at += interval
+        await asyncio.gather(*tasks)
+
+    await asyncio.gather(*(drive(i, c) for i, c in enumerate(clients)))
+
+
+async def run(opts):
+    server = None
+    if opts.mock:
+        server, _ = await start_mock_server(port=opts.port, transport=opts.transport,
+                                            http_response=opts.http_response)
+        print(f"🧪 mock Unity server ({opts.transport}) on 127.0.0.1:{opts.port}")
+
+    work_dir = tempfile.mkdtemp(prefix="unia-bench-") if opts.target == "bridge" else None
+    clients = []
+    try:
+        for _ in range(opts.clients):
+            if opts.target == "bridge":
+                client = BridgeMcpClient(work_dir, port=opts.port, transport=opts.transport, verbose=False)
+            else:
+                client = UnityMcpClient(port=opts.port, verbose=False)
+            await client.connect()
+            clients.append(client)
+        print(f"🔌 {len(clients)} {opts.target} client(s) connected")
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        if opts.mode == "burst":
+            await run_burst(clients, opts, recorder)
+        else:
+            await run_steady(clients, opts, recorder)
+        elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+        if server:
+            server.close()
+
+    all_samples = [ms for values in recorder.samples.values() for ms in values]
+    return {
+        "target": opts.target, "transport": opts.transport, "workload": opts.workload, "mode": opts.mode,
+        "clients": opts.clients, "inflight": opts.inflight,
+        "rate": opts.rate if opts.mode == "steady" else None,
+        "completed": len(all_samples), "errors": recorder.errors,
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_per_sec": round(len(all_samples) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": percentiles(all_samples),
+        "per_tool": {name: percentiles(values) for name, values in sorted(recorder.samples.items())},
+        "mock": opts.mock,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# ------------------------------------------------------------------------------
+# Report
+# ------------------------------------------------------------------------------
+def print_report(result):
+    lat = result["latency_ms"]
+    print(f"\n📊 {result['target']} ({result.get('transport', 'tcp')}) / {result['workload']} / {result['mode']} "
+          f"x{result['clients']} clients")
+    print(f"   completed {result['completed']}  errors {result['errors']}  "
+          f"in {result['elapsed_sec']}s  -> {result['throughput_per_sec']} calls/sec")
+    if lat["count"]:
+        print(f"   latency p50={lat['p50']:.2f}ms p95={lat['p95']:.2f}ms "
+              f"p99={lat['p99']:.2f}ms max={lat['max']:.2f}ms")
+    for name, s in result["per_tool"].items():
+        print(f"     {name:<14} n={s['count']:<6} p50={s['p50']:.2f}ms p95={s['p95']:.2f}ms p99={s['p99']:.2f}ms")
+
+
+def print_comparison(result, baseline):
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+    print(f"\n🔍 vs baseline ({baseline.get('timestamp', '?')})")
+    print(f"   throughput {baseline['throughput_per_sec']} -> {result['throughput_per_sec']} "
+          f"({delta(result['throughput_per_sec'], baseline['throughput_per_sec'])})")
+    for key in ("p50", "p95", "p99"):
+        old = baseline["latency_ms"].get(key, 0)
+        new = result["latency_ms"].get(key, 0)
+        print(f"   {key} {old}ms -> {new}ms ({delta(new, old)})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Unity MCP load benchmark")
+    parser.add_argument("--target", choices=["tcp", "bridge"], default="tcp")
+    parser.add_argument("--workload", choices=["echo", "mixed"], default="echo")
+    parser.add_argument("--mode", choices=["burst", "steady"], default="burst")
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1000, help="burst: total calls")
+    parser.add_argument("--inflight", type=int, default=8, help="burst: outstanding calls per client")
+    parser.add_argument("--rate", type=float, default=100.0, help="steady: calls/sec in total")
+    parser.add_argument("--duration", type=float, default=10.0, help="steady: seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--transport", choices=["tcp", "http"], default="tcp")
+    parser.add_argument("--http-response", choices=["sse", "json"], default="sse",
+                        help="--mock --transport http: how the mock answers")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mock", action="store_true", help="start the local mock Unity server")
+    parser.add_argument("--out", help="write the result JSON here")
+    parser.add_argument("--compare", help="baseline result JSON to compare against")
+    opts = parser.parse_args()
+    if opts.transport == "http" and opts.target == "tcp":
+        parser.error("--transport http needs --target bridge (the direct client speaks TCP only)")
+    return opts
+
+
+def main():
+    opts = parse_args()
+    result = asyncio.run(run(opts))
+    print_report(result)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"💾 saved {opts.out}")
+    if opts.compare:
+        with open(opts.compare, "r", encoding="utf-8") as f:
+            print_comparison(result, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
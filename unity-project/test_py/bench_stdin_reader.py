@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import os
+import json
+import time
+
+#
+# Micro-benchmark: stdin -> bridge reading throughput.
+#   executor : old path (run_in_executor(sys.stdin.readline) + encode per line)
+#   native   : unia_bridge.stdio.open_stdin (connect_read_pipe / reader thread)
+#
+# usage: python bench_stdin_reader.py [messages] [payload_bytes]
+#
+BRIDGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ai-unia-mcpb"))
+sys.path.insert(0, BRIDGE_DIR)
+
+from unia_bridge.stdio import open_stdin
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) >= 2 and sys.argv[1] != "--child" else 50000
+PAYLOAD = int(sys.argv[2]) if len(sys.argv) >= 3 and sys.argv[1] != "--child" else 200
+
+
+# ------------------------------------------------------------------------------
+# Child side: read every line from stdin with the selected reader
+# ------------------------------------------------------------------------------
+async def child_executor():
+    loop = asyncio.get_running_loop()
+    count = 0
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        line.encode('utf-8')
+        count += 1
+    return count
+
+async def child_native():
+    stdin = await open_stdin()
+    count = 0
+    while True:
+        line = await stdin.readline()
+        if not line:
+            break
+        count += 1
+    return count
+
+def run_child(mode):
+    start = time.perf_counter()
+    count = asyncio.run(child_executor() if mode == "executor" else child_native())
+    elapsed = time.perf_counter() - start
+    sys.stdout.write(json.dumps({"count": count, "elapsed": elapsed}) + "\n")
+
+
+# ------------------------------------------------------------------------------
+# Parent side: feed the same burst of tools/call frames to each reader
+# ------------------------------------------------------------------------------
+async def bench(mode, data):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--child", mode,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    out, _ = await process.communicate(data)
+    result = json.loads(out)
+    return result["count"], result["elapsed"]
+
+async def main():
+    text = "あ" * (PAYLOAD // 3)
+    frames = []
+    for i in range(MESSAGES):
+        msg = {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+               "params": {"name": "ai-unia-speak", "arguments": {"text": text}}}
+        frames.append(json.dumps(msg, ensure_ascii=False).encode('utf-8') + b"\n")
+    data = b"".join(frames)
+
+    print(f"📏 {MESSAGES} messages, {len(data) / MESSAGES:.0f} bytes/message")
+    results = {}
+    for mode in ("executor", "native"):
+        count, elapsed = await bench(mode, data)
+        results[mode] = count / elapsed
+        print(f"  {mode:<9}: {count} msgs in {elapsed:.3f}s -> {results[mode]:,.0f} msgs/sec")
+
+    print(f"⚡ native / executor = {results['native'] / results['executor']:.1f}x")
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--child":
+        run_child(sys.argv[2])
+    else:
+        asyncio.run(main())
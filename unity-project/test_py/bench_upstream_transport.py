@@ -0,0 +1,202 @@
+import asyncio
+import sys
+import os
+import json
+import argparse
+import platform
+import tempfile
+import time
+
+#
+# Round-trip latency of the bridge's upstream transports against a local stand-in:
+#
+#   tcp   : loopback TCP (127.0.0.1:port), the fallback
+#   local : AF_UNIX socket (Linux/macOS) or named pipe (Windows), UNIA_LOCAL_ENDPOINT
+#   http  : MCP Streamable HTTP (UNIA_TRANSPORT=http), --server mock only
+#
+#   server echo : returns every line as is (transport cost only)
+#   server mock : mock_unity_server.py answering tools/call echo (adds JSON-RPC handling)
+#
+# Connections are opened with the bridge's own code (unia_bridge.local_socket,
+# unia_bridge.http_upstream). Per transport it reports the sequential round trip
+# (one message in flight) and the pipelined rate with --window messages in flight.
+#
+# examples:
+#   python bench_upstream_transport.py
+#   python bench_upstream_transport.py --server mock --transports tcp,local,http --payload 4096
+#   python bench_upstream_transport.py --out new.json
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEST_PY_DIR)
+sys.path.insert(0, os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb"))
+
+from bench_mcp_load import percentiles
+from mock_unity_server import start_local_server, start_mock_server
+from unia_bridge.http_upstream import HttpUpstream
+from unia_bridge.local_socket import open_local_connection
+
+LIMIT = 64 * 1024 * 1024
+
+
+class LineEcho:
+    """Writes every received line straight back."""
+
+    async def handle_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                writer.write(line)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+def local_endpoint():
+    if sys.platform == "win32":
+        return f"\\\\.\\pipe\\unia-bench-{os.getpid()}"
+    return os.path.join(tempfile.mkdtemp(prefix="unia-bench-"), "mcp.sock")
+
+
+async def start_servers(opts, endpoint):
+    """Returns the servers to close."""
+    if opts.server == "echo":
+        echo = LineEcho()
+        return [await asyncio.start_server(echo.handle_client, "127.0.0.1", opts.port, limit=LIMIT),
+                await start_local_server(echo, endpoint)]
+    servers = []
+    if "tcp" in opts.transports or "local" in opts.transports:
+        server, mock = await start_mock_server(port=opts.port, local=endpoint)
+        servers += [server, mock.local_server]
+    if "http" in opts.transports:
+        server, _ = await start_mock_server(port=opts.port + 1, transport="http",
+                                            http_response=opts.http_response)
+        servers.append(server)
+    return servers
+
+
+async def connect(transport, opts, endpoint):
+    if transport == "tcp":
+        return await asyncio.open_connection("127.0.0.1", opts.port, limit=LIMIT)
+    if transport == "local":
+        return await open_local_connection(endpoint, limit=LIMIT)
+    upstream = HttpUpstream("127.0.0.1", opts.port + 1)
+    reader, writer = upstream.reader, upstream.writer
+    writer.write(json.dumps({"jsonrpc": "2.0", "id": "init", "method": "initialize",
+                             "params": {"protocolVersion": "2025-03-26", "capabilities": {},
+                                        "clientInfo": {"name": "bench", "version": "1.0"}}}).encode() + b"\n")
+    await reader.readline()
+    writer.write(b'{"jsonrpc":"2.0","method":"notifications/initialized"}\n')
+    return reader, writer
+
+
+def message(request_id, payload):
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                       "params": {"name": "echo", "arguments": {"message": payload}}}).encode() + b"\n"
+
+
+async def round_trips(reader, writer, count, payload):
+    samples = []
+    for i in range(count):
+        frame = message(i, payload)
+        start = time.perf_counter()
+        writer.write(frame)
+        await writer.drain()
+        if not await reader.readline():
+            raise ConnectionError("closed by the server")
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def pipelined(reader, writer, count, window, payload):
+    """Keep `window` messages outstanding; returns messages/sec."""
+    frames = [message(i, payload) for i in range(count)]
+    sent = min(window, count)
+    start = time.perf_counter()
+    writer.write(b"".join(frames[:sent]))
+    await writer.drain()
+    for _ in range(count):
+        if not await reader.readline():
+            raise ConnectionError("closed by the server")
+        if sent < count:
+            writer.write(frames[sent])
+            sent += 1
+    return count / (time.perf_counter() - start)
+
+
+async def run(opts):
+    endpoint = local_endpoint()
+    servers = await start_servers(opts, endpoint)
+    payload = "x" * opts.payload
+    results = {}
+    try:
+        for transport in opts.transports:
+            reader, writer = await connect(transport, opts, endpoint)
+            try:
+                await round_trips(reader, writer, opts.warmup, payload)
+                samples = await round_trips(reader, writer, opts.count, payload)
+                rate = await pipelined(reader, writer, opts.count, opts.window, payload)
+            finally:
+                writer.close()
+                await asyncio.gather(writer.wait_closed(), return_exceptions=True)
+            results[transport] = {"round_trip_us": percentiles(samples),
+                                  "pipelined_per_sec": round(rate, 1)}
+            print(f"   {transport:<6} done")
+    finally:
+        for server in servers:
+            server.close()
+        await asyncio.sleep(0.1)   # let the handlers see their connections close
+    return {"server": opts.server, "payload": opts.payload, "count": opts.count,
+            "window": opts.window, "endpoint": endpoint, "transports": results,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def print_report(result):
+    print(f"\n📊 {result['server']} server, {result['payload']} byte payload, "
+          f"{result['count']} messages (local endpoint {result['endpoint']})")
+    print(f"   {'transport':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  pipelined (x{result['window']})")
+    base = result["transports"].get("tcp")
+    for name, r in result["transports"].items():
+        rt = r["round_trip_us"]
+        vs = ""
+        if base and name != "tcp":
+            vs = f"  ({(rt['p50'] - base['round_trip_us']['p50']) / base['round_trip_us']['p50'] * 100:+.1f}% p50 vs tcp)"
+        print(f"   {name:<10} {rt['p50']:>7.1f}us {rt['p95']:>7.1f}us {rt['p99']:>7.1f}us {rt['max']:>7.1f}us"
+              f"  {r['pipelined_per_sec']:>10.1f}/s{vs}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upstream transport round-trip benchmark")
+    parser.add_argument("--server", choices=["echo", "mock"], default="echo")
+    parser.add_argument("--transports", default="tcp,local",
+                        type=lambda text: [t for t in text.split(",") if t])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--window", type=int, default=32, help="pipelined: messages in flight")
+    parser.add_argument("--payload", type=int, default=64, help="echo message size in bytes")
+    parser.add_argument("--http-response", choices=["sse", "json"], default="sse")
+    parser.add_argument("--port", type=int, default=8090, help="tcp; http uses port + 1")
+    parser.add_argument("--out", help="write the result JSON here")
+    opts = parser.parse_args()
+    unknown = set(opts.transports) - {"tcp", "local", "http"}
+    if unknown:
+        parser.error(f"unknown transport(s): {', '.join(sorted(unknown))}")
+    if "http" in opts.transports and opts.server != "mock":
+        parser.error("http needs --server mock (the echo server does not speak HTTP)")
+    return opts
+
+
+def main():
+    opts = parse_args()
+    result = asyncio.run(run(opts))
+    print_report(result)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"💾 saved {opts.out}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
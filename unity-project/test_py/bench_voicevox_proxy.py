@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from urllib.parse import quote
+
+#
+# Caching VOICEVOX proxy check: stub engine <- unia_bridge.voicevox_proxy <- this script,
+# doing the same two calls as VoicevoxClient.cs (audio_query, then synthesis).
+#
+#   python bench_voicevox_proxy.py [--synthesis-ms 200]
+#
+# Prints cold / warm (memory) / warm (disk, new proxy) timings and shows that
+# concurrent identical misses reach the engine once.
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEST_PY_DIR)
+sys.path.insert(0, os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb"))
+
+from mock_voicevox_server import start_stub_voicevox
+from unia_bridge.voicevox_proxy import start_proxy
+
+ENGINE_PORT = 50121
+PROXY_PORT = 50122
+
+
+async def post(port, target, body=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"POST {target} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, payload = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    cache = next((line.split(b":")[1].strip().decode() for line in head.split(b"\r\n")
+                  if line.lower().startswith(b"x-unia-cache")), "-")
+    return status, payload, cache
+
+
+async def speak(port, text, speaker=0):
+    start = time.perf_counter()
+    status, query, c1 = await post(port, f"/audio_query?text={quote(text)}&speaker={speaker}")
+    assert status == 200, status
+    status, wav, c2 = await post(port, f"/synthesis?speaker={speaker}", query)
+    assert status == 200 and wav[:4] == b"RIFF", status
+    return (time.perf_counter() - start) * 1000.0, f"{c1}/{c2}"
+
+
+async def main():
+    synthesis_ms = float(sys.argv[sys.argv.index("--synthesis-ms") + 1]) if "--synthesis-ms" in sys.argv else 200.0
+    server, stub = start_stub_voicevox(port=ENGINE_PORT, synthesis_ms=synthesis_ms)
+    work_dir = tempfile.mkdtemp(prefix="unia-voicevox-")
+    upstream = f"http://127.0.0.1:{ENGINE_PORT}"
+    listen = f"127.0.0.1:{PROXY_PORT}"
+    text = "こんにちは、みくるです。"
+
+    proxy = await start_proxy(work_dir, listen, upstream)
+    ms, cache = await speak(PROXY_PORT, text)
+    print(f"cold          {ms:7.1f}ms  ({cache})")
+    ms, cache = await speak(PROXY_PORT, text)
+    print(f"warm (memory) {ms:7.1f}ms  ({cache})")
+
+    before = dict(stub.counts)
+    results = await asyncio.gather(*(speak(PROXY_PORT, "禁則事項です。") for _ in range(10)))
+    synth = stub.counts["synthesis"] - before["synthesis"]
+    print(f"10 concurrent identical misses -> {synth} synthesis call(s), "
+          f"slowest {max(ms for ms, _ in results):.1f}ms")
+    proxy.close()
+    await proxy.wait_closed()
+
+    proxy = await start_proxy(work_dir, listen, upstream)
+    ms, cache = await speak(PROXY_PORT, text)
+    print(f"warm (disk)   {ms:7.1f}ms  ({cache})")
+    proxy.close()
+    await proxy.wait_closed()
+
+    print(f"engine calls: {stub.counts}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    asyncio.run(main())
@@ -83,7 +83,8 @@ async def main():
         # ---------------------------------------------------------
 
         # 1. Initialize (初期化)
-        # Unityが起動してTCP接続が確立されるまで、ここの応答は返ってこない
+        # initialize のスナップショットがあればブリッジが即座に応答する。
+        # 初回 (スナップショット無し) は Unity の TCP 接続確立後に応答が返る
         await send_request("initialize", {
             "protocolVersion": "2024-11-05",
             "capabilities": {},
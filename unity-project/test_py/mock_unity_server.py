@@ -0,0 +1,420 @@
+import asyncio
+import base64
+import hashlib
+import os
+import sys
+import json
+import argparse
+import time
+import uuid
+
+#
+# Stand-in for the Unity player's MCP TCP server (TestMcpStreamServer.cs):
+# newline-delimited JSON-RPC on 127.0.0.1:8080, same tools and prompts.
+# Lets the bridge and the benchmarks run on Linux CI without the player.
+#
+#   python mock_unity_server.py [--port 8080] [--startup-delay 0] [-logFile path]
+#   (-mcpPort is accepted for --port, as the player takes it)
+#   python mock_unity_server.py --transport http [--http-response sse|json]
+#
+# --transport http serves MCP Streamable HTTP on the same port instead
+# (POST /mcp per message, Mcp-Session-Id, SSE or JSON responses, a GET
+# stream for server messages, DELETE to end the session), for the
+# bridge's UNIA_TRANSPORT=http.
+#
+# It can also be copied/wrapped as WORK_DIR/ai-unity-avatar.exe: it accepts
+# Unity's "-logFile" argument and writes the same "TCP Listener started"
+# line the bridge's readiness probe looks for. Like the player, it also
+# serves the TCP framing on "-mcpPipe <path or \\.\pipe\name>" (an AF_UNIX
+# socket, or a named pipe on Windows), opened before the TCP port.
+# With "-blobDir <dir>" large results go through the bridge's blob spool,
+# as BlobSpool.cs writes them.
+#
+
+SERVER_INFO = {"name": "UnityMcpServer", "version": "0.1.0"}
+
+TOOLS = [
+    {"name": "echo", "description": "Echoes a message",
+     "inputSchema": {"type": "object", "properties": {"message": {"type": "string"}},
+                     "required": ["message"]}},
+    {"name": "ai-unia-smile", "description": "Makes the avatar smile",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "ai-unia-speak", "description": "Makes the avatar speak a given text using AI voice.",
+     "inputSchema": {"type": "object", "properties": {"text": {"type": "string",
+                     "description": "The text for the avatar to speak."},
+                     "interrupt": {"type": "boolean",
+                                   "description": "Drop the speech still waiting in the bridge and say this right away."},
+                     "returnAudio": {"type": "boolean",
+                                     "description": "Also return the synthesized speech as audio/wav."}},
+                     "required": ["text"]}},
+]
+
+WAV_BYTES_PER_MS = 48   # VOICEVOX: 24 kHz 16-bit mono
+
+PROMPTS = [{"name": "prompt_ai_mikuru", "description": "Persona prompt for Asuka Langley."}]
+
+
+class MockUnityServer:
+    """
+    Each request is handled in its own task (like the C# SDK), so slow
+    speak calls do not block echo. Simulated costs:
+      ai-unia-smile : smile_ms
+      ai-unia-speak : speak_base_ms + speak_ms_per_char * len(text)  (VOICEVOX)
+    notifications/cancelled cancels the matching in-flight request.
+    echo with {"hang": seconds} blocks the whole server (even ping),
+    like a hung player, to exercise the bridge's supervisor.
+    Over HTTP, echo with {"broadcast": true} also sends a
+    notifications/message on the session's GET stream.
+    echo with {"blob": n} also returns n bytes of audio/wav: a unia-blob:
+    resource_link when blob_dir is set (and "spool" is not false),
+    otherwise inline base64 audio content. So does ai-unia-speak with
+    {"returnAudio": true}, sized like the WAV VOICEVOX would return.
+    """
+
+    def __init__(self, smile_ms=1.0, speak_base_ms=30.0, speak_ms_per_char=2.0, verbose=False,
+                 http_response="sse", blob_dir=None):
+        self.smile_ms = smile_ms
+        self.speak_base_ms = speak_base_ms
+        self.speak_ms_per_char = speak_ms_per_char
+        self.verbose = verbose
+        self.http_response = http_response
+        self.blob_dir = blob_dir
+        self._blob_fill = b""
+        self.calls = {}
+        self.connections = 0
+        self.sessions = {}   # Mcp-Session-Id -> {"inflight": {id: task}, "streams": [queue]}
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        inflight = {}
+        lock = asyncio.Lock()
+
+        async def send(msg):
+            async with lock:
+                writer.write(json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        async def run(msg):
+            try:
+                result = await self.dispatch(msg)
+                await send({"jsonrpc": "2.0", "id": msg["id"], "result": result})
+            except asyncio.CancelledError:
+                pass
+            except KeyError as e:
+                await send({"jsonrpc": "2.0", "id": msg["id"],
+                            "error": {"code": -32601, "message": f"Method not found: {e}"}})
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                inflight.pop(msg["id"], None)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    await send({"jsonrpc": "2.0", "id": None,
+                                "error": {"code": -32700, "message": "Parse error"}})
+                    continue
+                if self.verbose:
+                    print(f"[MockUnity] <- {line[:200]!r}", file=sys.stderr)
+
+                if "id" not in msg:
+                    if msg.get("method") == "notifications/cancelled":
+                        task = inflight.get((msg.get("params") or {}).get("requestId"))
+                        if task:
+                            task.cancel()
+                    continue
+                inflight[msg["id"]] = asyncio.create_task(run(msg))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for task in inflight.values():
+                task.cancel()
+            writer.close()
+            self.connections -= 1
+
+    # --- MCP Streamable HTTP ---
+    async def handle_http(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                if self.verbose:
+                    print(f"[MockUnity] <- {method} {path} {body[:200]!r}", file=sys.stderr)
+                if path.split("?")[0] != "/mcp":
+                    await self.http_reply(writer, 404, b"")
+                elif not await self.http_request(method, headers, body, writer):
+                    break
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+            self.connections -= 1
+
+    async def http_reply(self, writer, status, body, content_type="application/json", extra=None):
+        reason = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                  405: "Method Not Allowed"}.get(status, "Error")
+        head = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}"]
+        if body:
+            head.append(f"Content-Type: {content_type}")
+        head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def http_request(self, method, headers, body, writer):
+        """One request on a keep-alive connection; False closes the connection."""
+        session_id = headers.get("mcp-session-id")
+        session = self.sessions.get(session_id)
+        if method == "DELETE":
+            if session:
+                self.end_session(session_id)
+            await self.http_reply(writer, 200 if session else 404, b"")
+            return True
+        if method == "GET":
+            if session is None:
+                await self.http_reply(writer, 404 if session_id else 400, b"")
+                return True
+            return await self.http_stream(writer, session)
+        if method != "POST":
+            await self.http_reply(writer, 405, b"", extra={"Allow": "GET, POST, DELETE"})
+            return True
+
+        try:
+            msg = json.loads(body)
+        except ValueError:
+            await self.http_reply(writer, 400, json.dumps(
+                {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}).encode())
+            return True
+        extra = {}
+        if msg.get("method") == "initialize":
+            session_id = uuid.uuid4().hex
+            session = self.sessions[session_id] = {"inflight": {}, "streams": []}
+            extra["Mcp-Session-Id"] = session_id
+        elif session is None:
+            # missing header: bad request; unknown (expired) session: 404, the client starts over
+            await self.http_reply(writer, 404 if session_id else 400, b"")
+            return True
+
+        if "id" not in msg or "method" not in msg:
+            # notification or a response to the server: accepted, no body
+            if msg.get("method") == "notifications/cancelled":
+                task = session["inflight"].get((msg.get("params") or {}).get("requestId"))
+                if task:
+                    task.cancel()
+            await self.http_reply(writer, 202, b"")
+            return True
+
+        task = session["inflight"][msg["id"]] = asyncio.create_task(self.dispatch_http(msg, session))
+        try:
+            reply = await task
+        except asyncio.CancelledError:
+            reply = None   # cancelled by the client: the stream ends without a response
+        finally:
+            session["inflight"].pop(msg["id"], None)
+        if self.http_response == "json" and reply is not None:
+            await self.http_reply(writer, 200, json.dumps(reply, ensure_ascii=False).encode("utf-8"),
+                                  extra=extra)
+            return True
+        head = ["HTTP/1.1 200 OK", "Content-Type: text/event-stream", "Cache-Control: no-cache",
+                "Transfer-Encoding: chunked"] + [f"{k}: {v}" for k, v in extra.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if reply is not None:
+            writer.write(sse_chunk(reply))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+    async def dispatch_http(self, msg, session):
+        try:
+            result = await self.dispatch(msg)
+        except KeyError as e:
+            return {"jsonrpc": "2.0", "id": msg["id"],
+                    "error": {"code": -32601, "message": f"Method not found: {e}"}}
+        params = msg.get("params") or {}
+        if msg["method"] == "tools/call" and (params.get("arguments") or {}).get("broadcast"):
+            note = {"jsonrpc": "2.0", "method": "notifications/message",
+                    "params": {"level": "info", "data": f"broadcast from {params.get('name')}"}}
+            for stream in session["streams"]:
+                stream.put_nowait(note)
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": result}
+
+    async def http_stream(self, writer, session):
+        """GET: server messages as SSE until the session or the connection ends."""
+        stream = asyncio.Queue()
+        session["streams"].append(stream)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n")
+        try:
+            while (msg := await stream.get()) is not None:
+                writer.write(sse_chunk(msg))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return True
+        finally:
+            if stream in session["streams"]:
+                session["streams"].remove(stream)
+
+    def end_session(self, session_id):
+        session = self.sessions.pop(session_id)
+        for task in session["inflight"].values():
+            task.cancel()
+        for stream in session["streams"]:
+            stream.put_nowait(None)
+
+    async def dispatch(self, msg):
+        method = msg["method"]
+        params = msg.get("params") or {}
+        if method == "initialize":
+            return {"protocolVersion": params.get("protocolVersion", "2024-11-05"),
+                    "capabilities": {"tools": {"listChanged": True}, "prompts": {"listChanged": True}},
+                    "serverInfo": SERVER_INFO}
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": TOOLS}
+        if method == "prompts/list":
+            return {"prompts": PROMPTS}
+        if method == "prompts/get":
+            return {"messages": [{"role": "assistant",
+                                  "content": {"type": "text", "text": "# AIペルソナ (mock)"}}]}
+        if method == "tools/call":
+            return await self.call_tool(params.get("name"), params.get("arguments") or {})
+        raise KeyError(method)
+
+    async def call_tool(self, name, arguments):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if name == "echo":
+            if "hang" in arguments:
+                time.sleep(float(arguments["hang"]))
+            text = f"hello {arguments.get('message', '')}"
+            if arguments.get("blob"):
+                return {"content": [{"type": "text", "text": text},
+                                    self.audio_content(int(arguments["blob"]), arguments.get("spool", True))],
+                        "isError": False}
+        elif name == "ai-unia-smile":
+            await asyncio.sleep(self.smile_ms / 1000.0)
+            text = "Avatar smile command sent! 😊"
+        elif name == "ai-unia-speak":
+            speech = arguments.get("text", "")
+            if not speech.strip():
+                return {"content": [{"type": "text",
+                                     "text": "Error: 'text' argument for ai-unia-speak cannot be empty."}],
+                        "isError": True}
+            speak_ms = self.speak_base_ms + self.speak_ms_per_char * len(speech)
+            await asyncio.sleep(speak_ms / 1000.0)
+            text = f'Avatar speaking: "{speech}"'
+            if arguments.get("returnAudio"):
+                return {"content": [{"type": "text", "text": text},
+                                    self.audio_content(WAV_BYTES_PER_MS * max(speak_ms, 1))],
+                        "isError": False}
+        else:
+            return {"content": [{"type": "text", "text": "Invalid call"}], "isError": True}
+        return {"content": [{"type": "text", "text": text}], "isError": False}
+
+
+    def audio_content(self, size, spool=True):
+        """size bytes, different on every call (no help from content addressing)."""
+        if len(self._blob_fill) < size:
+            self._blob_fill = os.urandom(size)
+        data = sum(self.calls.values()).to_bytes(8, "little") + self._blob_fill[:max(size - 8, 0)]
+        if not (self.blob_dir and spool):
+            return {"type": "audio", "data": base64.b64encode(data).decode("ascii"), "mimeType": "audio/wav"}
+        return spool_blob(self.blob_dir, data, "audio/wav", ".wav")
+
+
+def spool_blob(directory, data, mime_type, suffix):
+    """BlobSpool.cs: <sha256[:32]><suffix> via tmp + rename, answered with a resource_link."""
+    digest = hashlib.sha256(data).hexdigest()
+    name = digest[:32] + suffix
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+    uri = f"unia-blob:{name}?offset=0&length={len(data)}&sha256={digest}&type={mime_type.replace('/', '%2F')}"
+    return {"type": "resource_link", "uri": uri, "name": name, "mimeType": mime_type, "size": len(data)}
+
+
+def sse_chunk(msg):
+    event = b"event: message\ndata: " + json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n\n"
+    return f"{len(event):x}\r\n".encode("latin-1") + event + b"\r\n"
+
+
+async def start_local_server(mock, endpoint):
+    """Serve the TCP framing on a named pipe (Windows) or an AF_UNIX socket. Returns the server."""
+    if endpoint.startswith("\\\\.\\pipe\\"):
+        loop = asyncio.get_running_loop()
+
+        def protocol():
+            return asyncio.StreamReaderProtocol(asyncio.StreamReader(limit=64 * 1024 * 1024),
+                                                mock.handle_client)
+        [server] = await loop.start_serving_pipe(protocol, endpoint)
+        return server
+    if os.path.exists(endpoint):
+        os.unlink(endpoint)   # left over from the previous run
+    return await asyncio.start_unix_server(mock.handle_client, endpoint, limit=64 * 1024 * 1024)
+
+
+async def start_mock_server(host="127.0.0.1", port=8080, transport="tcp", local=None, **kwargs):
+    """
+    Start the mock in the current loop. Returns (server, mock).
+    local: also serve on that pipe / socket path (mock.local_server), opened first.
+    """
+    mock = MockUnityServer(**kwargs)
+    mock.local_server = await start_local_server(mock, local) if local else None
+    handler = mock.handle_http if transport == "http" else mock.handle_client
+    server = await asyncio.start_server(handler, host, port, limit=64 * 1024 * 1024)
+    return server, mock
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Mock Unity MCP TCP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", "-mcpPort", type=int, default=8080)
+    parser.add_argument("--startup-delay", type=float, default=0.0,
+                        help="seconds to wait before listening (simulates Unity boot)")
+    parser.add_argument("--speak-ms-per-char", type=float, default=2.0)
+    parser.add_argument("--transport", choices=["tcp", "http"], default="tcp")
+    parser.add_argument("--http-response", choices=["sse", "json"], default="sse",
+                        help="http: answer requests with an SSE stream or a JSON body")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("-logFile", dest="log_file")
+    parser.add_argument("-mcpPipe", dest="local_endpoint")
+    parser.add_argument("-blobDir", dest="blob_dir")
+    args, _ = parser.parse_known_args()
+
+    await asyncio.sleep(args.startup_delay)
+    local = args.local_endpoint if args.transport == "tcp" else None
+    server, _ = await start_mock_server(args.host, args.port, transport=args.transport, local=local,
+                                        speak_ms_per_char=args.speak_ms_per_char,
+                                        verbose=args.verbose, http_response=args.http_response,
+                                        blob_dir=args.blob_dir)
+    if local:
+        print(f"[MockUnity] Local MCP endpoint started on {local}", file=sys.stderr)
+    message = f"TCP Listener started on port {args.port}"
+    if args.log_file:
+        with open(args.log_file, "a", encoding="utf-8") as f:
+            f.write(f"{time.strftime('%H:%M:%S')} {message}\n")
+    print(f"[MockUnity] {message}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
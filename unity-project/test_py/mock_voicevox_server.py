@@ -0,0 +1,130 @@
+import sys
+import json
+import argparse
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+#
+# Stub VOICEVOX engine (127.0.0.1:50021) for offline tests.
+# Implements just what VoicevoxClient.cs uses:
+#   POST /audio_query?text=...&speaker=N   -> audio query JSON
+#   POST /synthesis?speaker=N  (query JSON) -> WAV (silence, ~0.1s per char)
+# plus GET /version and GET /speakers. Synthesis sleeps like a real engine.
+#
+#   python mock_voicevox_server.py [--port 50021] [--synthesis-ms 200]
+#
+
+SAMPLE_RATE = 24000
+
+
+def make_wav(seconds: float) -> bytes:
+    frames = int(SAMPLE_RATE * seconds)
+    data = b"\x00\x00" * frames
+    header = b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+    return header + b"data" + struct.pack("<I", len(data)) + data
+
+
+class StubVoicevox:
+    def __init__(self, query_ms=10.0, synthesis_ms=200.0):
+        self.query_ms = query_ms
+        self.synthesis_ms = synthesis_ms
+        self.counts = {"audio_query": 0, "synthesis": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+
+def make_handler(stub: StubVoicevox):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, obj, status=200):
+            self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json")
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/version":
+                self._json("0.0.0-stub")
+            elif path == "/speakers":
+                self._json([{"name": "stub", "speaker_uuid": "stub",
+                             "styles": [{"name": "ノーマル", "id": 0}]}])
+            else:
+                self._json({"detail": "Not Found"}, 404)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length", "0"))
+            body = self.rfile.read(length) if length else b""
+
+            if url.path == "/audio_query":
+                if "text" not in params or "speaker" not in params:
+                    self._json({"detail": "text and speaker are required"}, 422)
+                    return
+                stub.count("audio_query")
+                time.sleep(stub.query_ms / 1000.0)
+                self._json({"accent_phrases": [], "speedScale": 1.0, "pitchScale": 0.0,
+                            "intonationScale": 1.0, "volumeScale": 1.0,
+                            "prePhonemeLength": 0.1, "postPhonemeLength": 0.1,
+                            "outputSamplingRate": SAMPLE_RATE, "outputStereo": False,
+                            "kana": params["text"]})
+            elif url.path == "/synthesis":
+                try:
+                    query = json.loads(body)
+                except ValueError:
+                    self._json({"detail": "invalid audio query"}, 422)
+                    return
+                stub.count("synthesis")
+                time.sleep(stub.synthesis_ms / 1000.0)
+                seconds = 0.1 * max(1, len(query.get("kana", ""))) / float(query.get("speedScale", 1.0))
+                self._send(200, make_wav(seconds), "audio/wav")
+            else:
+                self._json({"detail": "Not Found"}, 404)
+
+    return Handler
+
+
+def start_stub_voicevox(host="127.0.0.1", port=50021, **kwargs):
+    """Serve in a background thread. Returns (server, stub); server.shutdown() stops it."""
+    stub = StubVoicevox(**kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-voicevox", daemon=True).start()
+    return server, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub VOICEVOX engine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50021)
+    parser.add_argument("--synthesis-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    server, stub = start_stub_voicevox(args.host, args.port, synthesis_ms=args.synthesis_ms)
+    print(f"[StubVoicevox] listening on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"[StubVoicevox] {stub.counts}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import sys
+import os
+import json
+import argparse
+import tempfile
+import time
+
+#
+# Avatar pool smoke test on Linux/macOS/Windows without Unity:
+# runs the bridge with UNIA_POOL=1 UNIA_POOL_MOCK=1 (replicas are
+# mock_unity_server.py processes) and checks, over the bridge's stdio:
+#
+#   1. routing by params._meta.avatar (and -32602 for an unknown avatar)
+#   2. load on one avatar scales it up to its max
+#   3. calls spread over the replicas ("least") or stay on one ("sticky")
+#   4. a killed replica is restarted and its in-flight call gets an error
+#
+# Replica state is read from <work dir>/pool/pool.json; the bridge's
+# summary (stderr) is printed at the end.
+#
+#   python pool_smoke.py [--routing least|sticky] [--keep]
+#
+BRIDGE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "..", "..", "ai-unia-mcpb", "ai_unia_mcp_server.py")
+SLOW_TEXT = "あ" * 500   # mock speak: ~1s
+
+
+class Session:
+    def __init__(self, process):
+        self.process = process
+        self.next_id = 0
+        self.waiters = {}
+        self.reader = asyncio.create_task(self.read())
+
+    async def read(self):
+        while line := await self.process.stdout.readline():
+            msg = json.loads(line)
+            future = self.waiters.pop(msg.get("id"), None)
+            if future:
+                future.set_result(msg)
+
+    async def call(self, method, params=None, avatar=None, timeout=30):
+        self.next_id += 1
+        params = dict(params or {})
+        if avatar:
+            params["_meta"] = {"avatar": avatar}
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[self.next_id] = future
+        self.send({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params})
+        return await asyncio.wait_for(future, timeout)
+
+    def tool(self, name, arguments, avatar=None):
+        return self.call("tools/call", {"name": name, "arguments": arguments}, avatar)
+
+    def send(self, msg):
+        self.process.stdin.write(json.dumps(msg).encode() + b"\n")
+
+
+def pool_state(work_dir):
+    """The pool rewrites pool.json at most every second (SCALE_CHECK_SEC)."""
+    with open(os.path.join(work_dir, "pool", "pool.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def wait_for(work_dir, predicate, what, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            state = pool_state(work_dir)
+            if predicate(state["replicas"]):
+                return state
+        except (OSError, ValueError):
+            pass
+        await asyncio.sleep(0.2)
+    raise AssertionError(f"timed out waiting for {what}")
+
+
+def ready(replicas, avatar):
+    return [name for name, r in replicas.items() if r["avatar"] == avatar and r["state"] == "ready"]
+
+
+def check(ok, text):
+    print(f"   {'✅' if ok else '❌'} {text}")
+    return ok
+
+
+async def run(opts, work_dir):
+    env = dict(os.environ, UNIA_POOL="1", UNIA_POOL_MOCK="1", UNIA_POOL_ROUTING=opts.routing,
+               UNIA_POOL_AVATARS="mikuru=1-2,asuka=1", UNIA_SCHEDULE="0", UNIA_VOICEVOX_PROXY="0")
+    log_path = os.path.join(work_dir, "bridge-stderr.log")
+    with open(log_path, "wb") as log:
+        process = await asyncio.create_subprocess_exec(sys.executable, BRIDGE, work_dir,
+                                                       stdin=asyncio.subprocess.PIPE,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=log, env=env)
+    session = Session(process)
+    results = []
+    try:
+        print("🚀 initialize")
+        init = await session.call("initialize", {"protocolVersion": "2025-03-26", "capabilities": {},
+                                                 "clientInfo": {"name": "pool-smoke", "version": "1.0"}},
+                                  timeout=60)
+        session.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        results.append(check("result" in init, f"initialize: {init.get('result', init)}"[:100]))
+        await wait_for(work_dir, lambda r: ready(r, "mikuru") and ready(r, "asuka"), "both avatars")
+
+        print("1. routing by avatar")
+        for avatar in ("mikuru", "asuka", None):
+            reply = await session.tool("echo", {"message": avatar or "default"}, avatar)
+            results.append(check("result" in reply, f"echo on {avatar or '(default)'}: "
+                                                    f"{reply.get('result', reply.get('error'))}"[:100]))
+        reply = await session.tool("echo", {"message": "x"}, "nobody")
+        results.append(check(reply.get("error", {}).get("code") == -32602,
+                             f"unknown avatar: {reply.get('error')}"))
+        await asyncio.sleep(1.5)
+        state = pool_state(work_dir)["replicas"]
+        results.append(check(all(r["requests"] for r in state.values()),
+                             "every replica served a call: "
+                             + ", ".join(f"{n}={r['requests']}" for n, r in state.items())))
+
+        print("2. scale up under load")
+        load = [asyncio.create_task(session.tool("ai-unia-speak", {"text": SLOW_TEXT}, "mikuru"))
+                for _ in range(8)]
+        state = await wait_for(work_dir, lambda r: len(ready(r, "mikuru")) == 2, "a second mikuru replica")
+        results.append(check(True, f"mikuru replicas: {', '.join(ready(state['replicas'], 'mikuru'))}"))
+        await asyncio.gather(*load)
+
+        print(f"3. routing policy {opts.routing}")
+        await asyncio.sleep(1.5)
+        before = {n: r["requests"] for n, r in pool_state(work_dir)["replicas"].items()}
+        await asyncio.gather(*(session.tool("ai-unia-speak", {"text": "あいうえお"}, "mikuru")
+                               for _ in range(10)))
+        await asyncio.sleep(1.5)
+        after = pool_state(work_dir)["replicas"]
+        served = {n: r["requests"] - before.get(n, 0) for n, r in after.items() if r["avatar"] == "mikuru"}
+        used = [n for n, count in served.items() if count]
+        expected = 1 if opts.routing == "sticky" else 2
+        results.append(check(len(used) == expected, f"10 calls went to {served}"))
+
+        print("4. replica killed mid-call")
+        victim_name = ready(after, "asuka")[0]
+        victim = after[victim_name]
+        pending = asyncio.create_task(session.tool("ai-unia-speak", {"text": SLOW_TEXT}, "asuka"))
+        await asyncio.sleep(0.3)
+        os.kill(victim["pid"], 9)
+        reply = await pending
+        results.append(check(reply.get("error", {}).get("code") == -32000,
+                             f"in-flight call: {reply.get('error')}"[:100]))
+        state = await wait_for(work_dir, lambda r: r[victim_name]["restarts"] == 1
+                               and r[victim_name]["state"] == "ready", "the restart")
+        results.append(check(state["replicas"][victim_name]["pid"] != victim["pid"],
+                             f"{victim_name} restarted (pid {victim['pid']} -> "
+                             f"{state['replicas'][victim_name]['pid']})"))
+        reply = await session.tool("echo", {"message": "again"}, "asuka")
+        results.append(check("result" in reply, "asuka answers again"))
+
+        print("\n📄 pool.json")
+        print(json.dumps(pool_state(work_dir), indent=1))
+    finally:
+        process.stdin.close()
+        await session.reader
+        await process.wait()
+        print("\n📊 bridge summary")
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        start = next((i for i, line in enumerate(lines) if "Stats:" in line), max(len(lines) - 20, 0))
+        for line in lines[start:]:
+            print("   " + line)
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avatar pool smoke test (mock Unity)")
+    parser.add_argument("--routing", choices=["least", "sticky"], default="least")
+    parser.add_argument("--keep", action="store_true", help="keep the work dir")
+    opts = parser.parse_args()
+    work_dir = tempfile.mkdtemp(prefix="unia-pool-")
+    ok = asyncio.run(run(opts, work_dir))
+    if opts.keep:
+        print(f"📁 {work_dir}")
+    print("\n" + ("✅ pool OK" if ok else "❌ pool checks failed"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -0,0 +1,235 @@
+import asyncio
+import sys
+import os
+import glob
+import json
+import argparse
+import tempfile
+import time
+
+#
+# Replays a bridge traffic capture (UNIA_CAPTURE=1, WORK_DIR/captures) and
+# compares the response latencies with the ones in the recording.
+#
+#   target tcp    : the frames the bridge sent to Unity, replayed to Unity (or --mock)
+#   target bridge : the lines the host wrote to stdin, replayed into a new bridge
+#
+# Frames keep their recorded inter-arrival times, divided by --speed
+# (2 = twice as fast, 0 = no waiting at all).
+#
+# examples:
+#   python replay_capture.py C:\...\build\captures\ai-unia-capture-20250101-120000-1234-*
+#   python replay_capture.py capture.cap.gz --mock --speed 4 --out replay.json
+#   python replay_capture.py capture.cap.gz --mock --target bridge
+#
+TEST_PY_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEST_PY_DIR)
+sys.path.insert(0, os.path.join(TEST_PY_DIR, "..", "..", "ai-unia-mcpb"))
+
+from bench_mcp_load import BRIDGE_SCRIPT, percentiles
+from mock_unity_server import start_mock_server
+from unia_bridge.capture import DIRECTIONS, HOST_IN, HOST_OUT, UNITY_IN, UNITY_OUT, read_capture
+
+
+# ------------------------------------------------------------------------------
+# Capture
+# ------------------------------------------------------------------------------
+def load(patterns):
+    """All records of the given files (rotated parts in order)."""
+    paths = sorted(path for pattern in patterns for path in glob.glob(pattern))
+    if not paths:
+        raise SystemExit(f"no capture files match {patterns}")
+    records = []
+    for path in paths:
+        records.extend(read_capture(path))
+    records.sort(key=lambda record: record[1])
+    return paths, records
+
+
+def parse(frame):
+    try:
+        msg = json.loads(frame)
+    except ValueError:
+        return None
+    return msg if isinstance(msg, dict) else None
+
+
+def key_of(msg):
+    method = msg.get("method", "?")
+    if method == "tools/call":
+        return f"tools/call:{(msg.get('params') or {}).get('name', '?')}"
+    return method
+
+
+def recorded_latencies(records, sent, received):
+    """{key: [ms]} for requests in direction `sent` answered in direction `received`."""
+    pending, samples = {}, {}
+    for direction, stamp, frame in records:
+        if direction not in (sent, received):
+            continue
+        msg = parse(frame)
+        if msg is None or msg.get("id") is None:
+            continue
+        if direction == sent and "method" in msg:
+            pending[json.dumps(msg["id"])] = (stamp, key_of(msg))
+        elif direction == received and "method" not in msg:
+            entry = pending.pop(json.dumps(msg["id"]), None)
+            if entry:
+                samples.setdefault(entry[1], []).append((stamp - entry[0]) * 1000.0)
+    return samples
+
+
+# ------------------------------------------------------------------------------
+# Replay
+# ------------------------------------------------------------------------------
+async def open_target(opts):
+    """(reader, writer, close) for the replay target."""
+    if opts.target == "tcp":
+        reader, writer = await asyncio.open_connection(opts.host, opts.port, limit=64 * 1024 * 1024)
+
+        async def close():
+            writer.close()
+        return reader, writer, close
+
+    env = dict(os.environ, PYTHONUTF8="1", UNIA_DAEMON="1", UNIA_CAPTURE="0")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, BRIDGE_SCRIPT, tempfile.mkdtemp(prefix="unia-replay-"),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL, env=env, limit=64 * 1024 * 1024)
+
+    async def close():
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), 10.0)
+        except asyncio.TimeoutError:
+            process.kill()
+    return process.stdout, process.stdin, close
+
+
+async def replay(records, opts):
+    sent_dir = UNITY_OUT if opts.target == "tcp" else HOST_IN
+    frames = [(stamp, frame) for direction, stamp, frame in records if direction == sent_dir]
+    if opts.target == "tcp":
+        # responses the bridge gave to Unity's own requests have no one to answer
+        frames = [(stamp, frame) for stamp, frame in frames if b'"method"' in frame]
+    reader, writer, close = await open_target(opts)
+
+    pending, samples, done = {}, {}, asyncio.Event()
+
+    async def read_loop():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            for msg in (lambda m: m if isinstance(m, list) else [m])(json.loads(line)):
+                if isinstance(msg, dict) and "method" not in msg and "id" in msg:
+                    entry = pending.pop(json.dumps(msg["id"]), None)
+                    if entry:
+                        samples.setdefault(entry[1], []).append((time.perf_counter() - entry[0]) * 1000.0)
+            if sending_done and not pending:
+                done.set()
+
+    sending_done = False
+    task_read = asyncio.create_task(read_loop())
+    start, first = time.perf_counter(), frames[0][0] if frames else 0.0
+    for stamp, frame in frames:
+        if opts.speed > 0:
+            await asyncio.sleep(max(0.0, start + (stamp - first) / opts.speed - time.perf_counter()))
+        msg = parse(frame)
+        if msg and "method" in msg and msg.get("id") is not None:
+            pending[json.dumps(msg["id"])] = (time.perf_counter(), key_of(msg))
+        writer.write(frame)
+        await writer.drain()
+    sending_done = True
+    if pending:
+        try:
+            await asyncio.wait_for(done.wait(), opts.timeout)
+        except asyncio.TimeoutError:
+            pass
+    missing = len(pending)
+    await close()
+    task_read.cancel()
+    await asyncio.gather(task_read, return_exceptions=True)
+    return samples, missing, time.perf_counter() - start
+
+
+# ------------------------------------------------------------------------------
+# Report
+# ------------------------------------------------------------------------------
+def compare(recorded, replayed):
+    rows = {}
+    for key in sorted(set(recorded) | set(replayed)):
+        old, new = percentiles(recorded.get(key, [])), percentiles(replayed.get(key, []))
+        ratio = round(new["p50"] / old["p50"], 2) if old.get("p50") and new.get("p50") else None
+        rows[key] = {"recorded": old, "replay": new, "p50_ratio": ratio}
+    return rows
+
+
+def print_report(result):
+    print(f"\n📼 {result['frames']} frame(s) replayed to {result['target']} at x{result['speed']} "
+          f"in {result['elapsed_sec']}s ({result['missing']} unanswered)")
+    print(f"   {'request':<24}{'n':>6}{'rec p50':>10}{'rec p95':>10}{'n':>6}{'p50':>10}{'p95':>10}  ratio")
+    for key, row in result["per_key"].items():
+        old, new = row["recorded"], row["replay"]
+        fmt = lambda s, k: f"{s[k]:.2f}" if s.get("count") else "-"
+        ratio = f"x{row['p50_ratio']}" if row["p50_ratio"] else ""
+        print(f"   {key:<24}{old['count']:>6}{fmt(old, 'p50'):>10}{fmt(old, 'p95'):>10}"
+              f"{new['count']:>6}{fmt(new, 'p50'):>10}{fmt(new, 'p95'):>10}  {ratio}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a bridge traffic capture")
+    parser.add_argument("capture", nargs="+", help="capture file(s) or glob(s)")
+    parser.add_argument("--target", choices=["tcp", "bridge"], default="tcp")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mock", action="store_true", help="start the local mock Unity server")
+    parser.add_argument("--speed", type=float, default=1.0, help="timing scale; 0 = as fast as possible")
+    parser.add_argument("--timeout", type=float, default=30.0, help="wait for responses after the last frame")
+    parser.add_argument("--dump", action="store_true", help="print the capture instead of replaying it")
+    parser.add_argument("--out", help="write the result JSON here")
+    return parser.parse_args()
+
+
+async def run(opts, records):
+    server = None
+    if opts.mock:
+        server, _ = await start_mock_server(opts.host, opts.port)
+        print(f"🧪 mock Unity server on {opts.host}:{opts.port}")
+    try:
+        return await replay(records, opts)
+    finally:
+        if server:
+            server.close()
+
+
+def main():
+    opts = parse_args()
+    paths, records = load(opts.capture)
+    print(f"📂 {len(records)} record(s) from {len(paths)} file(s)")
+    if opts.dump:
+        for direction, stamp, frame in records:
+            print(f"{stamp:10.3f} {DIRECTIONS.get(direction, direction):<7} "
+                  f"{frame[:200].decode('utf-8', 'replace').rstrip()}")
+        return
+
+    sent, received = (UNITY_OUT, UNITY_IN) if opts.target == "tcp" else (HOST_IN, HOST_OUT)
+    recorded = recorded_latencies(records, sent, received)
+    replayed, missing, elapsed = asyncio.run(run(opts, records))
+    result = {
+        "target": opts.target, "speed": opts.speed, "captures": paths,
+        "frames": sum(1 for record in records if record[0] == sent),
+        "missing": missing, "elapsed_sec": round(elapsed, 3),
+        "per_key": compare(recorded, replayed),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print_report(result)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"💾 saved {opts.out}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -3,13 +3,27 @@ import json
 import sys
 
 class UnityMcpClient:
-    def __init__(self, host="127.0.0.1", port=8080):
+    """
+    Unity MCP サーバー (TCP / 改行区切り JSON-RPC) 用の非同期クライアント。
+    受信はバックグラウンドの reader タスク1本で行い、応答は id をキーにした
+    Future に振り分けるので、1本の接続で複数の call_tool を同時に投げられる。
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, timeout=30.0, verbose=True):
         self.host = host
         self.port = port
+        self.timeout = timeout          # call ごとのデフォルトタイムアウト(秒)
+        self.verbose = verbose
         self.reader = None
         self.writer = None
         self._msg_id = 0
         self._connected = False
+        self._pending = {}              # id -> Future
+        self._subscribers = {}          # method -> [callback]  ("*" は全通知)
+        self._reader_task = None
+        self._reader_error = None       # reader が終わった理由 (以後のリクエストにも返す)
+        self._write_lock = asyncio.Lock()
+        self.server_info = None
 
     async def __aenter__(self):
         await self.connect()
@@ -18,52 +32,86 @@ class UnityMcpClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+    def _print(self, msg):
+        if self.verbose:
+            print(msg)
+
     async def connect(self):
         """Unityサーバーに接続し、初期化ハンドシェイクを行う"""
-        print(f"🔌 Connecting to {self.host}:{self.port}...")
+        self._print(f"🔌 Connecting to {self.host}:{self.port}...")
         try:
-            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, limit=16 * 1024 * 1024)
         except ConnectionRefusedError:
-            print(f"❌ Error: Could not connect to {self.host}:{self.port}. Check if Unity is playing.")
+            self._print(f"❌ Error: Could not connect to {self.host}:{self.port}. Check if Unity is playing.")
             raise
 
+        self._reader_task = asyncio.create_task(self._read_loop())
+
         # 1. Initialize Request
-        print("🤝 Initializing MCP session...")
+        self._print("🤝 Initializing MCP session...")
         init_result = await self._send_request("initialize", {
             "protocolVersion": "2024-11-05",
             "capabilities": {},
             "clientInfo": {"name": "SimplePythonClient", "version": "1.0"}
         })
-        
+        self.server_info = init_result.get("serverInfo")
+
         # 2. Initialized Notification
         await self._send_notification("notifications/initialized")
         self._connected = True
-        print("✅ Connected and Initialized!")
+        self._print("✅ Connected and Initialized!")
         return init_result
 
-    async def list_tools(self):
+    async def list_tools(self, timeout=None):
         """ツール一覧を取得する"""
-        result = await self._send_request("tools/list")
+        result = await self._send_request("tools/list", timeout=timeout)
         return result.get("tools", [])
 
-    async def call_tool(self, name, arguments=None):
+    async def call_tool(self, name, arguments=None, timeout=None):
         """ツールを実行する"""
         params = {"name": name, "arguments": arguments or {}}
-        result = await self._send_request("tools/call", params)
+        result = await self._send_request("tools/call", params, timeout=timeout)
         return result
 
+    async def ping(self, timeout=None):
+        """疎通確認"""
+        return await self._send_request("ping", timeout=timeout)
+
+    def subscribe(self, method, callback):
+        """
+        通知を購読する。method="*" で全通知。
+        callback(msg) は通常関数でもコルーチン関数でもよい。
+        """
+        self._subscribers.setdefault(method, []).append(callback)
+
+    def unsubscribe(self, method, callback):
+        if callback in self._subscribers.get(method, []):
+            self._subscribers[method].remove(callback)
+
     async def close(self):
         """接続を閉じる"""
         if self.writer:
             self.writer.close()
-            await self.writer.wait_closed()
-            print("🔌 Connection closed.")
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+        if self._reader_task:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._connected = False
+        self._print("🔌 Connection closed.")
 
-    async def _send_request(self, method, params=None):
+    async def _send_request(self, method, params=None, timeout=None):
         """リクエストを送信し、対応するIDのレスポンスを待つ"""
+        # reader が終わっていたら応答は二度と届かないので、待たずに失敗させる
+        if self._reader_task is None or self._reader_task.done():
+            raise ConnectionError(str(self._reader_error or "Not connected"))
         self._msg_id += 1
         current_id = self._msg_id
-        
+
         msg = {
             "jsonrpc": "2.0",
             "method": method,
@@ -72,24 +120,25 @@ class UnityMcpClient:
         if params:
             msg["params"] = params
 
-        await self._send_json(msg)
-
-        # レスポンス待ちループ (通知やログを無視して、自分のIDの応答を探す)
-        while True:
-            response = await self._read_json()
-            if not response:
-                raise ConnectionError("Connection closed by server")
-            
-            # エラー判定
-            if "error" in response and response.get("id") == current_id:
-                raise Exception(f"RPC Error: {response['error']}")
-
-            # 正常応答判定
-            if "result" in response and response.get("id") == current_id:
-                return response["result"]
-            
-            # それ以外のメッセージ（通知など）は一旦無視するかログに出す
-            # print(f"[Log] Ignore message: {response}")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[current_id] = future
+        try:
+            await self._send_json(msg)
+            response = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            # 待つのをやめたことをサーバーに伝える
+            await self._send_notification("notifications/cancelled", {
+                "requestId": current_id, "reason": "client timeout"})
+            raise TimeoutError(f"{method} (id={current_id}) timed out")
+        finally:
+            self._pending.pop(current_id, None)
+
+        # エラー判定
+        if "error" in response:
+            raise Exception(f"RPC Error: {response['error']}")
+
+        # 正常応答
+        return response.get("result")
 
     async def _send_notification(self, method, params=None):
         """通知（レスポンス不要）を送信する"""
@@ -99,9 +148,12 @@ class UnityMcpClient:
         await self._send_json(msg)
 
     async def _send_json(self, data):
-        json_str = json.dumps(data)
-        self.writer.write(json_str.encode("utf-8") + b"\n")
-        await self.writer.drain()
+        if self.writer is None:
+            raise ConnectionError("Not connected")
+        json_str = json.dumps(data, ensure_ascii=False)
+        async with self._write_lock:
+            self.writer.write(json_str.encode("utf-8") + b"\n")
+            await self.writer.drain()
 
     async def _read_json(self):
         line = await self.reader.readline()
@@ -109,6 +161,50 @@ class UnityMcpClient:
             return None
         return json.loads(line.decode("utf-8"))
 
+    async def _read_loop(self):
+        """受信専用タスク: 応答は Future へ、通知は購読者へ振り分ける"""
+        error = ConnectionError("Connection closed by server")
+        try:
+            while True:
+                response = await self._read_json()
+                if response is None:
+                    break
+
+                if "method" in response:
+                    if "id" in response:
+                        # サーバーからのリクエスト (ping など) には空の結果で答える
+                        await self._send_json({"jsonrpc": "2.0", "id": response["id"], "result": {}})
+                    else:
+                        await self._dispatch_notification(response)
+                    continue
+
+                future = self._pending.get(response.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(response)
+                # それ以外 (タイムアウト済みの応答など) は捨てる
+
+        except (ConnectionError, OSError, ValueError) as e:
+            error = ConnectionError(f"Connection error: {e}")
+        except Exception as e:
+            error = ConnectionError(f"Reader stopped: {e!r}")
+            raise
+        finally:
+            # 待っている呼び出しをすべて失敗させる (タイムアウトまで待たせない)
+            self._reader_error = error
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _dispatch_notification(self, msg):
+        callbacks = self._subscribers.get(msg["method"], []) + self._subscribers.get("*", [])
+        for callback in callbacks:
+            try:
+                result = callback(msg)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self._print(f"[Log] Notification handler error: {e}")
+
 # =================================================================
 # 実行部分
 # =================================================================
@@ -137,6 +233,15 @@ async def main():
                 else:
                     print(f"Unknown content: {item}")
 
+            # 3. 1本の接続で echo を並列実行 (パイプライン)
+            print("\n--- 🚀 Pipelined 'echo' x 5 ---")
+            responses = await asyncio.gather(*(
+                client.call_tool("echo", {"message": f"pipelined #{i}"}, timeout=10.0)
+                for i in range(5)
+            ))
+            for response in responses:
+                print(f"Server Response: {response['content'][0].get('text')}")
+
     except Exception as e:
         print(f"\n❌ Error occurred: {e}")
 